@@ -0,0 +1,277 @@
+"""
+Batch Row I/O
+
+Shared plumbing for running the calculators over CSV/JSONL files of deals: reading
+and coercing rows, turning them into batch calculator columns, writing results
+incrementally, and optionally fanning chunks of rows out to a process pool.
+
+Used by landed_cost.py and margin_calculator.py (--input mode), deal_pipeline.py and
+the catalog-level scripts. Not meant to be run directly.
+"""
+
+import csv
+import functools
+import inspect
+import io
+import json
+import sys
+from itertools import chain, islice
+
+# NumPy is imported inside batch_columns(), the one function that needs it
+
+
+FORMATS = ("csv", "jsonl")
+
+DEFAULT_CHUNK_SIZE = 5000  # Rows per work unit handed to a worker process
+
+# Errors a bad input row can raise; these are reported in the "error" column
+ROW_ERRORS = (TypeError, ValueError, KeyError, ZeroDivisionError)
+
+
+def infer_format(path: str, default: str) -> str:
+    """Guess csv/jsonl from a file extension, falling back to default (e.g. for stdin)."""
+    if path and path != "-":
+        for fmt in FORMATS:
+            if path.lower().endswith("." + fmt):
+                return fmt
+    return default
+
+
+def coerce(value, kind):
+    """Convert a raw CSV/JSON value to a calculator argument type."""
+    if kind == "bool":
+        if isinstance(value, str):
+            return value.strip().lower() in ("1", "true", "yes", "y")
+        return bool(value)
+    if kind is int and isinstance(value, str):
+        return int(float(value))
+    return kind(value)
+
+
+def calculator_kwargs(row: dict, fields: dict) -> dict:
+    """Pick and coerce the arguments for one calculator; blank values use its defaults."""
+    kwargs = {}
+    for name, kind in fields.items():
+        value = row.get(name)
+        if value is None or value == "":
+            continue
+        kwargs[name] = coerce(value, kind)
+    return kwargs
+
+
+@functools.lru_cache(maxsize=None)
+def _defaults(calculator) -> dict:
+    """Argument name -> default of a calculator (inspect.Parameter.empty if required)."""
+    return {name: p.default for name, p in inspect.signature(calculator).parameters.items()}
+
+
+def missing_arguments(kwargs: dict, calculator) -> list:
+    """Names of calculator's required arguments that kwargs doesn't supply."""
+    return [name for name, default in _defaults(calculator).items()
+            if default is inspect.Parameter.empty and name not in kwargs]
+
+
+def batch_columns(kwargs_rows: list, calculator) -> dict:
+    """
+    Column arrays for a *_batch calculator from per-row calculator_kwargs() dicts.
+
+    Only arguments that some row sets become columns; the calculator's own defaults
+    cover the rest. A row that leaves a column blank gets the default too, with None
+    defaults (the "not given" overrides) as NaN. Requires NumPy.
+    """
+    import numpy as np
+
+    defaults = _defaults(calculator)
+    columns = {}
+    for name in dict.fromkeys(name for kwargs in kwargs_rows for name in kwargs):
+        values = [kwargs.get(name, defaults[name]) for kwargs in kwargs_rows]
+        if any(isinstance(v, str) for v in values):
+            # Keep None (e.g. a blank as_of) as a missing entry rather than the string "None"
+            columns[name] = np.array(values, dtype=object if None in values else str)
+        elif all(isinstance(v, bool) for v in values):
+            columns[name] = np.array(values, dtype=bool)
+        else:
+            columns[name] = np.array([np.nan if v is None else v for v in values], dtype=float)
+    return columns
+
+
+def apply_row(process_row, row: dict, output_fields: list) -> dict:
+    """
+    Run process_row on one input row and merge its result fields into a copy of it.
+
+    A row that cannot be scored gets an "error" message instead of results, so one
+    bad line doesn't stop a whole catalog.
+    """
+    out = dict(row)
+    try:
+        out.update(process_row(row))
+        out["error"] = None
+    except ROW_ERRORS as e:
+        out.update(dict.fromkeys(output_fields, None))
+        out["error"] = str(e)
+    return out
+
+
+def read_rows(stream, fmt: str):
+    """Yield input rows as dicts from a CSV or JSONL text stream."""
+    if fmt == "csv":
+        yield from csv.DictReader(stream)
+    else:
+        for line in stream:
+            if line.strip():
+                yield json.loads(line)
+
+
+def write_rows(rows, stream, fmt: str, fieldnames: list = None, header: bool = True) -> int:
+    """
+    Write rows to a text stream as they arrive.
+
+    For CSV, the columns are fieldnames if given, else the first row's keys, and
+    header=False skips the header line. Returns the number of rows written.
+    """
+    count = 0
+    writer = None
+    for row in rows:
+        if fmt == "csv":
+            if writer is None:
+                writer = csv.DictWriter(stream, fieldnames=fieldnames or list(row.keys()), extrasaction="ignore")
+                if header:
+                    writer.writeheader()
+            writer.writerow(row)
+        else:
+            stream.write(json.dumps(row) + "\n")
+        count += 1
+    return count
+
+
+def _output_fieldnames(input_fields: list, output_fields: list) -> list:
+    return list(input_fields) + [f for f in list(output_fields) + ["error"] if f not in input_fields]
+
+
+def _csv_row(fields: list, values: list) -> dict:
+    """One CSV record as csv.DictReader builds it: missing trailing values are None, extras go under None."""
+    row = dict(zip(fields, values))
+    if len(values) > len(fields):
+        row[None] = values[len(fields):]
+    elif len(values) < len(fields):
+        for key in fields[len(values):]:
+            row[key] = None
+    return row
+
+
+def _process_chunk(task) -> tuple:
+    """
+    Worker entry point: score one chunk and return it already serialized.
+
+    Returning a single text block per chunk (instead of one dict per row) keeps the
+    inter-process traffic to one string per few thousand rows.
+    """
+    process_row, output_fields, input_fields, rows, output_format, fieldnames = task
+    if input_fields is not None:
+        # Same rows as read_rows() gives the unsharded path (which skips blank lines too)
+        rows = (_csv_row(input_fields, values) for values in rows if values)
+    else:
+        rows = (json.loads(line) for line in rows)
+    buf = io.StringIO(newline="")
+    # The parent process writes the CSV header once, before any chunk
+    count = write_rows((apply_row(process_row, row, output_fields) for row in rows), buf, output_format,
+                       fieldnames=fieldnames, header=False)
+    return count, buf.getvalue()
+
+
+def _chunks(stream, input_format: str, chunk_size: int):
+    """Yield (input_fields, raw_rows) chunks: CSV value lists, or raw JSONL lines."""
+    if input_format == "csv":
+        reader = csv.reader(stream)
+        header = next(reader, None)
+        if header is None:
+            return
+        while True:
+            chunk = list(islice(reader, chunk_size))
+            if not chunk:
+                return
+            yield header, chunk
+    else:
+        lines = (line for line in stream if line.strip())
+        while True:
+            chunk = list(islice(lines, chunk_size))
+            if not chunk:
+                return
+            yield None, chunk
+
+
+def run_rows(
+    process_row,
+    output_fields: list,
+    input_path: str = "-",
+    output_path: str = "-",
+    input_format: str = None,
+    output_format: str = None,
+    workers: int = 1,
+    chunk_size: int = DEFAULT_CHUNK_SIZE,
+) -> int:
+    """
+    Score every row of a CSV/JSONL file and write the enriched rows.
+
+    Args:
+        process_row: Function taking an input row dict and returning a dict of result
+            fields. Must be a module-level function (or functools.partial of one) when
+            workers > 1 so it can be sent to worker processes.
+        output_fields: Names of the result fields process_row produces
+        input_path / output_path: File paths, or "-" for stdin/stdout
+        input_format / output_format: "csv" or "jsonl" (default: from extension)
+        workers: Number of worker processes (1 = stream in this process)
+        chunk_size: Rows per work unit when workers > 1
+
+    Returns:
+        Number of rows written. Output row order always matches input order.
+    """
+    input_format = input_format or infer_format(input_path, "csv")
+    output_format = output_format or infer_format(output_path, input_format)
+
+    infile = sys.stdin if input_path == "-" else open(input_path, newline="", encoding="utf-8")
+    outfile = sys.stdout if output_path == "-" else open(output_path, "w", newline="", encoding="utf-8")
+    try:
+        if workers <= 1:
+            rows = (apply_row(process_row, row, output_fields) for row in read_rows(infile, input_format))
+            return write_rows(rows, outfile, output_format)
+        return _run_sharded(process_row, output_fields, infile, outfile, input_format, output_format,
+                            workers, chunk_size)
+    finally:
+        if infile is not sys.stdin:
+            infile.close()
+        if outfile is not sys.stdout:
+            outfile.close()
+
+
+def _run_sharded(process_row, output_fields, infile, outfile, input_format, output_format, workers, chunk_size):
+    from concurrent.futures import ProcessPoolExecutor
+
+    chunks = _chunks(infile, input_format, chunk_size)
+    first = next(chunks, None)
+    if first is None:
+        return 0
+
+    # The CSV header is fixed up front so every worker writes the same columns
+    fieldnames = None
+    if output_format == "csv":
+        input_fields = first[0] if first[0] is not None else list(json.loads(first[1][0]).keys())
+        fieldnames = _output_fieldnames(input_fields, output_fields)
+        csv.DictWriter(outfile, fieldnames=fieldnames).writeheader()
+
+    total = 0
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        # Keep a bounded window of chunks in flight; results are consumed in input order
+        pending = []
+        for input_fields, rows in chain([first], chunks):
+            task = (process_row, output_fields, input_fields, rows, output_format, fieldnames)
+            pending.append(pool.submit(_process_chunk, task))
+            if len(pending) >= workers * 2:
+                count, text = pending.pop(0).result()
+                outfile.write(text)
+                total += count
+        for future in pending:
+            count, text = future.result()
+            outfile.write(text)
+            total += count
+    return total
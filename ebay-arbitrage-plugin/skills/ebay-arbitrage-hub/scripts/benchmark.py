@@ -0,0 +1,437 @@
+#!/usr/bin/env python3
+"""
+Calculator Benchmarks
+
+Times the landed cost and margin hot paths so a slowdown shows up before it hits the
+nightly jobs:
+    - scalar calls (calculate_* dict API and the *_record API)
+    - JSON serialization of results (json.dumps indent=2, as --json does)
+    - print_report rendering
+    - vectorized batch calls and incremental DealGraph updates (if NumPy is installed)
+    - CLI cold start (fresh interpreter per run)
+
+Batch and DealGraph cases hold a whole synthetic catalog in memory — 1k, 100k and 1M
+rows by default — built by cycling through a seeded pool of realistic inputs. The
+per-row paths handle one row at a time, as --input streams them, so neither their
+speed nor their memory depends on catalog size: they are measured once, over the
+pool, and carry no size in their name.
+
+Every case runs in its own fresh interpreter, so its peak RSS is that case's alone
+(for cold start cases, the CLI process's). Timings follow timeit: each timed run
+repeats the case until it lasts at least 0.2 s, and the median of --repeat runs
+counts, so one noisy run can't pass or fail the gate. Each timed run is paired with
+a fixed reference workload of the same kind (an interpreter loop for the per-row and
+CLI cases, a memory-bound NumPy loop for the array cases), and the gate compares
+speed relative to it, so a shared or throttled machine running slower for a while
+doesn't read as a regression. Results are reported as ops/sec and peak RSS.
+
+Save a baseline on a known-good tree, then compare later runs against it; any case
+slower than the baseline, or using more memory, by more than --tolerance fails the
+run (exit code 1).
+
+Usage:
+    python benchmark.py                                   # 1k, 100k and 1M rows
+    python benchmark.py --sizes 1000,100000               # skip the 1M-row catalog
+    python benchmark.py --save-baseline bench_baseline.json
+    python benchmark.py --baseline bench_baseline.json --tolerance 0.15
+    python benchmark.py --repeat 15                       # steadier timings, slower run
+"""
+
+import argparse
+import contextlib
+import io
+import json
+import os
+import random
+import statistics
+import subprocess
+import sys
+import timeit
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+import deal_graph
+import landed_cost
+import margin_calculator
+
+
+DEFAULT_SIZES = (1000, 100000, 1000000)
+POOL_SIZE = 10000  # Distinct synthetic rows; larger catalogs cycle through them
+ROW_BLOCK = 1000  # Rows per timed call of a per-row case
+ARRAY_REFERENCE_SIZE = 2_000_000  # Elements in the NumPy reference workload; well past CPU caches
+COLD_START_RUNS = 7
+GRAPH_UPDATES = 5  # Slider moves timed per DealGraph case
+DEFAULT_REPEAT = 7  # Timed runs per case; the median counts
+DEFAULT_TOLERANCE = 0.20  # Allowed ops/sec drop (or peak RSS rise) vs. baseline before failing
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+
+
+def synthetic_landed_rows(n: int, seed: int = 1) -> list:
+    """Representative calculate_landed_cost kwargs: small test orders through container loads."""
+    rng = random.Random(seed)
+    methods = list(landed_cost.SHIPPING_RATES)
+    rows = []
+    for _ in range(n):
+        rows.append({
+            "product_cost": round(rng.uniform(0.5, 40.0), 2),
+            "quantity": rng.choice([10, 50, 100, 200, 500, 1000, 5000]),
+            "weight_per_unit_kg": round(rng.uniform(0.05, 2.0), 2),
+            "shipping_method": rng.choice(methods),
+            "duty_rate": rng.choice([0.0, 3.9, 6.5, 11.4]),
+            "section_301_rate": rng.choice([0.0, 7.5, 25.0]),
+            "defect_rate": rng.choice([2.0, 4.0, 8.0]),
+            "quiet": True,
+        })
+    return rows
+
+
+def synthetic_margin_rows(n: int, seed: int = 2) -> list:
+    """Representative calculate_margin kwargs across categories and fee options."""
+    rng = random.Random(seed)
+    categories = list(margin_calculator.FVF_RATES)
+    rows = []
+    for _ in range(n):
+        rows.append({
+            "sale_price": round(rng.uniform(8.0, 150.0), 2),
+            "cogs": round(rng.uniform(1.0, 50.0), 2),
+            "shipping_cost": round(rng.uniform(0.0, 9.0), 2),
+            "category": rng.choice(categories),
+            "promoted_rate": rng.choice([0.0, 2.0, 5.0]),
+            "return_rate": rng.choice([4.0, 8.0, 12.0]),
+            "international": rng.random() < 0.2,
+        })
+    return rows
+
+
+def peak_rss_mb(children: bool = False) -> float:
+    """Peak resident set size in MB of this process, or of its largest child (0 where unsupported)."""
+    if resource is None:
+        return 0.0
+    peak = resource.getrusage(resource.RUSAGE_CHILDREN if children else resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is KB on Linux, bytes on macOS
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+def _reference():
+    """Fixed interpreter workload (dict building, float math, formatting) for the per-row and CLI cases."""
+    total = 0.0
+    for i in range(2000):
+        row = {"price": i * 1.5, "qty": i % 7}
+        total += row["price"] / (row["qty"] + 1)
+        f"{total:.2f}"
+    return total
+
+
+def _array_reference():
+    """A fixed memory-bound NumPy workload for the batch and DealGraph cases."""
+    arrays = []
+
+    def run():
+        if not arrays:  # Allocated on first call, after the case's own peak RSS is taken
+            arrays.extend((np.linspace(0.0, 2.0, ARRAY_REFERENCE_SIZE), np.empty(ARRAY_REFERENCE_SIZE)))
+        values, out = arrays
+        np.multiply(values, 1.5, out=out)
+        np.add(out, values, out=out)
+        np.sqrt(out, out=out)
+        return np.where(out > 1, out, values).sum()
+
+    return run
+
+
+def _time_case(run, repeat: int = DEFAULT_REPEAT, reference=_reference) -> tuple:
+    """
+    Time run() like timeit: autorange (which doubles as the warmup) picks enough calls
+    per timed run to last at least 0.2 s, and the median of `repeat` runs counts.
+
+    Each timed run is paired with one of reference(), a fixed workload of the same
+    kind, so a machine that slows down or speeds up for a while (CPU steal, memory
+    bandwidth taken by neighbours, frequency scaling) moves both alike.
+
+    Returns:
+        (median seconds per run() call, median run() time in reference() calls, peak
+        RSS in MB after one run() call, before reference() has allocated anything)
+    """
+    run()
+    peak_mb = peak_rss_mb()
+    timer, reference = timeit.Timer(run), timeit.Timer(reference)
+    number, _ = timer.autorange()
+    reference_number, _ = reference.autorange()
+    seconds, ratios = [], []
+    for _ in range(repeat):
+        elapsed = timer.timeit(number) / number
+        seconds.append(elapsed)
+        ratios.append(elapsed / (reference.timeit(reference_number) / reference_number))
+    return statistics.median(seconds), statistics.median(ratios), peak_mb
+
+
+def _result(ops: float, timing: tuple, peak_mb: float = None) -> dict:
+    """A case's result from the ops one run() call performs and its _time_case() timing."""
+    seconds, ratio, case_peak_mb = timing
+    return {"ops_per_sec": round(ops / seconds, 1), "relative_speed": float(f"{ops / ratio:.4g}"),
+            "peak_rss_mb": round(case_peak_mb if peak_mb is None else peak_mb, 1)}
+
+
+def _row_loop(fn, pool: list):
+    """A run() that calls fn(row) once for each of the first ROW_BLOCK rows of pool."""
+    block = pool[:ROW_BLOCK]
+
+    def run():
+        for row in block:
+            fn(row)
+
+    return run
+
+
+def _columns(rows: list, n: int) -> dict:
+    """Column arrays for the batch API, n rows cycling through the pool."""
+    reps = -(-n // len(rows))
+    columns = {}
+    for key in rows[0]:
+        if key == "quiet":
+            continue
+        values = [r[key] for r in rows]
+        columns[key] = np.tile(np.asarray(values), reps)[:n]
+    return columns
+
+
+def scalar_case(path: str, module, calc, record, rows: list, repeat: int) -> tuple:
+    """_time_case() timing of ROW_BLOCK rows through one path of a calculator: scalar, record, json or print_report."""
+    if path == "scalar":
+        run = _row_loop(lambda row: calc(**row), rows)
+    elif path == "record":
+        run = _row_loop(lambda row: record(**row), rows)
+    else:
+        results = [calc(**row) for row in rows[:ROW_BLOCK]]
+        if path == "json":
+            run = _row_loop(lambda r: json.dumps(r, indent=2), results)
+        else:
+            sink = io.StringIO()
+
+            def report(result):
+                sink.seek(0)
+                with contextlib.redirect_stdout(sink):
+                    module.print_report(result)
+
+            run = _row_loop(report, results)
+    return _time_case(run, repeat)
+
+
+def cli_cold_start(script: str, args: list, runs: int = COLD_START_RUNS) -> tuple:
+    """_time_case() timing of a fresh `python script ... --json` run."""
+    cmd = [sys.executable, os.path.join(SCRIPT_DIR, script)] + args + ["--json"]
+    return _time_case(lambda: subprocess.run(cmd, check=True, stdout=subprocess.DEVNULL), runs)
+
+
+COLD_START_ARGS = {
+    "landed_cost": ("landed_cost.py", ["--product-cost", "4.20", "--quantity", "200", "--weight-kg", "0.5"]),
+    "margin": ("margin_calculator.py", ["--sale-price", "29.99", "--cogs", "8.50"]),
+}
+
+SCALAR_PATHS = ("scalar", "record", "json", "print_report")
+
+
+def case_names(sizes=DEFAULT_SIZES, cold_start: bool = True) -> list:
+    """
+    Every benchmark case name. Batch and DealGraph cases carry their catalog size,
+    e.g. "landed_cost.batch@100000"; per-row cases don't depend on one.
+    """
+    names = [f"{name}.{path}" for name in ("landed_cost", "margin") for path in SCALAR_PATHS]
+    if np is not None:
+        for n in sizes:
+            names += [f"landed_cost.batch@{n}", f"margin.batch@{n}",
+                      f"deal_graph.update_duty_rate@{n}", f"deal_graph.update_promoted_rate@{n}"]
+    if cold_start:
+        names += [f"{name}.cli_cold_start" for name in COLD_START_ARGS]
+    return names
+
+
+def run_case(case: str, repeat: int = DEFAULT_REPEAT) -> dict:
+    """
+    Run one benchmark case in this process.
+
+    Returns:
+        {"ops_per_sec": float, "relative_speed": float, "peak_rss_mb": float};
+        relative_speed is ops per reference workload call's worth of time, and the RSS is
+        this process's peak, or the CLI's for a cold start case
+    """
+    name, _, size = case.partition("@")
+    group, _, path = name.partition(".")
+    if path == "cli_cold_start":
+        timing = cli_cold_start(*COLD_START_ARGS[group], runs=max(repeat, COLD_START_RUNS))
+        return _result(1, timing, peak_rss_mb(children=True))
+    if group == "landed_cost" and path in SCALAR_PATHS and not size:
+        timing = scalar_case(path, landed_cost, landed_cost.calculate_landed_cost,
+                             landed_cost.calculate_landed_cost_record, synthetic_landed_rows(POOL_SIZE), repeat)
+        return _result(ROW_BLOCK, timing)
+    if group == "margin" and path in SCALAR_PATHS and not size:
+        timing = scalar_case(path, margin_calculator, margin_calculator.calculate_margin,
+                             margin_calculator.calculate_margin_record, synthetic_margin_rows(POOL_SIZE), repeat)
+        return _result(ROW_BLOCK, timing)
+
+    if not size.isdigit() or np is None:
+        raise ValueError(f"Unknown benchmark case: {case}")
+    n = int(size)
+    ops = n
+    if path == "batch":
+        calc = landed_cost.calculate_landed_cost_batch if group == "landed_cost" else margin_calculator.calculate_margin_batch
+        rows = synthetic_landed_rows(POOL_SIZE) if group == "landed_cost" else synthetic_margin_rows(POOL_SIZE)
+        columns = _columns(rows, n)
+        timing = _time_case(lambda: calc(**columns), repeat, _array_reference())
+    elif group == "deal_graph":
+        # One slider move = one update over the whole cached batch
+        margin_columns = _columns(synthetic_margin_rows(POOL_SIZE), n)
+        del margin_columns["cogs"]
+        graph = deal_graph.DealGraph(**_columns(synthetic_landed_rows(POOL_SIZE), n), **margin_columns)
+        field = path[len("update_"):]
+        values = {"duty_rate": (3.9, 6.5, 11.4), "promoted_rate": (2.0, 5.0, 8.0)}[field]
+
+        def moves():
+            for i in range(GRAPH_UPDATES):
+                graph.update(**{field: values[i % len(values)]})
+
+        timing = _time_case(moves, repeat, _array_reference())
+        ops = n * GRAPH_UPDATES
+    else:
+        raise ValueError(f"Unknown benchmark case: {case}")
+    return _result(ops, timing)
+
+
+def run_benchmarks(sizes=DEFAULT_SIZES, cold_start: bool = True, repeat: int = DEFAULT_REPEAT) -> dict:
+    """
+    Run every benchmark case, each in a fresh interpreter.
+
+    Returns:
+        {case_name: {"ops_per_sec": float, "peak_rss_mb": float}} (see case_names())
+    """
+    results = {}
+    for case in case_names(sizes, cold_start):
+        cmd = [sys.executable, os.path.abspath(__file__), "--case", case, "--repeat", str(repeat)]
+        out = subprocess.run(cmd, check=True, stdout=subprocess.PIPE, text=True).stdout
+        results[case] = json.loads(out)
+    return results
+
+
+def _speed_metric(current: dict, base: dict) -> str:
+    """The speed to compare: relative_speed, or ops_per_sec for a baseline saved without it."""
+    return "relative_speed" if "relative_speed" in base and "relative_speed" in current else "ops_per_sec"
+
+
+def compare(results: dict, baseline: dict, tolerance: float = DEFAULT_TOLERANCE) -> list:
+    """
+    Return (case, metric, baseline, current) for every case slower, or with a higher
+    peak RSS, than the baseline allows. Speed is compared as relative_speed, which
+    cancels out how fast the machine happened to be running.
+    """
+    regressions = []
+    for case, current in results.items():
+        base = baseline.get(case)
+        if not base:
+            continue
+        metric = _speed_metric(current, base)
+        if current[metric] < base[metric] * (1 - tolerance):
+            regressions.append((case, metric, base[metric], current[metric]))
+        if base.get("peak_rss_mb") and current["peak_rss_mb"] > base["peak_rss_mb"] * (1 + tolerance):
+            regressions.append((case, "peak_rss_mb", base["peak_rss_mb"], current["peak_rss_mb"]))
+    return regressions
+
+
+def print_report(results: dict, baseline: dict = None):
+    """Print a benchmark table, with change vs. baseline where available."""
+    print("\n" + "=" * 78)
+    print("  CALCULATOR BENCHMARKS")
+    print("=" * 78)
+    print(f"\n  {'Case':<42}{'ops/sec':>14}{'peak RSS':>11}{'vs base':>10}")
+    for case, r in results.items():
+        change = ""
+        if baseline and case in baseline:
+            metric = _speed_metric(r, baseline[case])
+            change = f"{(r[metric] / baseline[case][metric] - 1) * 100:+.1f}%"
+        print(f"  {case:<42}{r['ops_per_sec']:>14,.1f}{r['peak_rss_mb']:>9.1f}MB{change:>10}")
+    print("=" * 78 + "\n")
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Benchmark the landed cost and margin calculators",
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        epilog="""
+Examples:
+  Default run (1k, 100k and 1M rows):
+    %(prog)s
+
+  Quicker run without the 1M-row catalog:
+    %(prog)s --sizes 1000,100000
+
+  Record a baseline, then check a later change against it:
+    %(prog)s --save-baseline bench_baseline.json
+    %(prog)s --baseline bench_baseline.json --tolerance 0.15
+        """,
+    )
+
+    parser.add_argument("--sizes", type=str, default=",".join(str(n) for n in DEFAULT_SIZES),
+                       help="Comma-separated catalog sizes for the batch and DealGraph cases "
+                            f"(default: {','.join(str(n) for n in DEFAULT_SIZES)})")
+    parser.add_argument("--no-cold-start", action="store_true", help="Skip the CLI cold start cases")
+    parser.add_argument("--baseline", type=str, default=None, help="Baseline JSON to compare against")
+    parser.add_argument("--save-baseline", type=str, default=None, help="Write results as a new baseline")
+    parser.add_argument("--tolerance", type=float, default=DEFAULT_TOLERANCE,
+                       help=f"Allowed slowdown or peak RSS growth vs. baseline as a fraction "
+                            f"(default: {DEFAULT_TOLERANCE})")
+    parser.add_argument("--repeat", type=int, default=DEFAULT_REPEAT,
+                       help=f"Timed runs per case; the median counts (default: {DEFAULT_REPEAT})")
+    parser.add_argument("--json", action="store_true", help="Output as JSON")
+    # Internal: run one case in this process and print its result (used by run_benchmarks)
+    parser.add_argument("--case", type=str, default=None, help=argparse.SUPPRESS)
+
+    args = parser.parse_args()
+    if args.repeat < 1:
+        parser.error("--repeat must be at least 1")
+
+    if args.case:
+        try:
+            print(json.dumps(run_case(args.case, args.repeat)))
+        except ValueError as e:
+            parser.error(str(e))
+        return
+
+    sizes = [int(s) for s in args.sizes.split(",") if s]
+    results = run_benchmarks(sizes, cold_start=not args.no_cold_start, repeat=args.repeat)
+
+    baseline = None
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            baseline = json.load(f)
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+    else:
+        print_report(results, baseline)
+
+    if args.save_baseline:
+        with open(args.save_baseline, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+        print(f"Baseline saved to {args.save_baseline}", file=sys.stderr)
+
+    if baseline:
+        regressions = compare(results, baseline, args.tolerance)
+        if regressions:
+            print("PERFORMANCE REGRESSION", file=sys.stderr)
+            for case, metric, base, current in regressions:
+                unit = {"ops_per_sec": "ops/sec", "relative_speed": "ops per reference run",
+                        "peak_rss_mb": "MB peak RSS"}[metric]
+                print(f"  {case}: {current:,.1f} {unit} vs. baseline {base:,.1f} "
+                      f"({(current / base - 1) * 100:+.1f}%)", file=sys.stderr)
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,322 @@
+"""
+Incremental Deal Graph
+
+Holds a batch of deals (landed cost piped into margin) as a dependency graph of cost
+columns, so when one input changes only the columns downstream of it are recomputed.
+Built for dashboards: a user drags the duty_rate or promoted_rate slider and every
+SKU on screen updates without re-running the whole calculate_landed_cost →
+calculate_margin chain.
+
+    graph = DealGraph(product_cost=costs, quantity=qtys, weight_per_unit_kg=weights,
+                      sale_price=prices, category=categories)
+    graph.update(promoted_rate=5.0)   # recomputes fees → net profit → margin/ROI only
+    graph["net_profit"]
+
+Each node is one column: product_total, fx_spread_cost, total_weight_kg,
+chargeable_weight_kg, cartons, shipping, insurance,
+dutiable_value, customs_total, payment_fee_cost, defect_buffer, total_landed_cost,
+per_unit_landed, then the margin side (fvf_rate, total_ebay_fees,
+returns_drag_per_unit, net_profit, ...). Node arithmetic follows
+calculate_landed_cost_batch() and calculate_margin_batch() step for step, so every
+column equals what those functions return for the same inputs. COGS is the unrounded
+per-unit landed cost (or the defect-adjusted one, with defect_adjusted=True).
+
+Requires NumPy. Not meant to be run directly.
+"""
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+import packing
+import rate_tables
+from landed_cost import (
+    DEFAULT_CUSTOMS_BROKERAGE,
+    DEFAULT_DEFECT_RATE,
+    DEFAULT_DOMESTIC_DELIVERY,
+    DEFAULT_FX_SPREAD,
+    DEFAULT_INSURANCE_RATE,
+    DEFAULT_PAYMENT_FEE,
+)
+from margin_calculator import get_assessment_codes
+
+
+# Graph inputs: calculator argument -> (default, dtype). None defaults become NaN
+# ("not given") for the float columns that have a per-row fallback.
+INPUTS = {
+    "product_cost": (None, float),
+    "quantity": (None, float),
+    "weight_per_unit_kg": (None, float),
+    "length_cm": (np.nan if np else None, float),
+    "width_cm": (np.nan if np else None, float),
+    "height_cm": (np.nan if np else None, float),
+    "carton_length_cm": (np.nan if np else None, float),
+    "carton_width_cm": (np.nan if np else None, float),
+    "carton_height_cm": (np.nan if np else None, float),
+    "carton_weight_kg": (0.0, float),
+    "shipping_method": ("air_freight", str),
+    "duty_rate": (0.0, float),
+    "section_301_rate": (0.0, float),
+    "fx_spread": (DEFAULT_FX_SPREAD, float),
+    "payment_fee": (DEFAULT_PAYMENT_FEE, float),
+    "insurance_rate": (DEFAULT_INSURANCE_RATE, float),
+    "customs_brokerage": (DEFAULT_CUSTOMS_BROKERAGE, float),
+    "domestic_delivery": (DEFAULT_DOMESTIC_DELIVERY, float),
+    "defect_rate": (DEFAULT_DEFECT_RATE, float),
+    "shipping_cost_override": (np.nan if np else None, float),
+    "sale_price": (None, float),
+    "shipping_cost": (0.0, float),
+    "category": ("default", str),
+    "fvf_override": (np.nan if np else None, float),
+    "promoted_rate": (0.0, float),
+    "return_rate": (8.0, float),
+    "international": (False, bool),
+    "packaging_cost": (1.00, float),
+    "return_shipping_cost": (np.nan if np else None, float),
+    "as_of": (None, object),
+    "tables": (None, object),  # rate_tables.RateTables snapshot; defaults to active()
+}
+
+
+def _shipping_rates(tables, shipping_method, as_of):
+    return tables.shipping_columns(shipping_method, as_of.item() if as_of.ndim == 0 else as_of)
+
+
+def _fee_rates(tables, category, as_of):
+    return tables.fee_columns(category, as_of.item() if as_of.ndim == 0 else as_of)
+
+
+def _package_weights(shipping_rates, quantity, weight_per_unit_kg, length_cm, width_cm, height_cm,
+                     carton_length_cm, carton_width_cm, carton_height_cm, carton_weight_kg):
+    return packing.chargeable_weight_batch(quantity, weight_per_unit_kg, shipping_rates[3],
+                                           (length_cm, width_cm, height_cm),
+                                           (carton_length_cm, carton_width_cm, carton_height_cm), carton_weight_kg)
+
+
+def _shipping(shipping_rates, shipping_cost_override, chargeable_weight_kg, shipping_method, tables):
+    rate_per_kg, base_fee, _, _, known, _ = shipping_rates
+    has_override = ~np.isnan(shipping_cost_override)
+    invalid = ~(has_override | known)
+    if invalid.any():
+        unknown = np.broadcast_to(shipping_method, invalid.shape)[invalid][0]
+        raise ValueError(f"Unknown shipping method: {unknown}. Options: {', '.join(tables.shipping.methods)}")
+    return np.where(has_override, shipping_cost_override, base_fee + (chargeable_weight_kg * rate_per_kg))
+
+
+def _divide(numerator, denominator, guard):
+    with np.errstate(divide="ignore", invalid="ignore"):
+        return np.where(guard > 0, numerator / denominator, 0.0)
+
+
+def _breakeven(total_cogs, fee_rates, returns_drag_per_unit, fvf_rate, promoted_rate, international):
+    per_order_fee, international_fee_rate = fee_rates[1], fee_rates[2]
+    total_fee_rate_decimal = (fvf_rate + promoted_rate + np.where(international, international_fee_rate, 0)) / 100
+    with np.errstate(divide="ignore", invalid="ignore"):
+        return (total_cogs + per_order_fee + returns_drag_per_unit) / (1 - total_fee_rate_decimal)
+
+
+def _rate_table_version(fee_rates, shipping_rates):
+    fees, shipping = fee_rates[3], shipping_rates[5]
+    if np.ndim(fees) == 0 and np.ndim(shipping) == 0:
+        return f"{fees},{shipping}"
+    return np.char.add(np.char.add(fees, ","), shipping)
+
+
+# (node, dependencies, compute) in dependency order; compute takes the dependencies'
+# values positionally. Dependencies are INPUTS names or earlier nodes.
+NODES = (
+    # --- Landed cost ---
+    ("shipping_rates", ("tables", "shipping_method", "as_of"), _shipping_rates),
+    ("product_total", ("product_cost", "quantity"), lambda product_cost, quantity: product_cost * quantity),
+    ("fx_spread_cost", ("product_total", "fx_spread"), lambda total, fx_spread: total * (fx_spread / 100)),
+    ("package_weights",
+     ("shipping_rates", "quantity", "weight_per_unit_kg", "length_cm", "width_cm", "height_cm",
+      "carton_length_cm", "carton_width_cm", "carton_height_cm", "carton_weight_kg"),
+     _package_weights),
+    ("total_weight_kg", ("package_weights",), lambda weights: weights[0]),
+    ("chargeable_weight_kg", ("package_weights",), lambda weights: weights[2]),
+    ("cartons", ("package_weights",), lambda weights: weights[3]),
+    ("shipping", ("shipping_rates", "shipping_cost_override", "chargeable_weight_kg", "shipping_method", "tables"),
+     _shipping),
+    ("over_weight_limit", ("shipping_rates", "shipping_cost_override", "total_weight_kg"),
+     lambda rates, override, weight: np.isnan(override) & (weight > rates[2])),
+    ("insurance", ("product_total", "insurance_rate"), lambda total, rate: total * (rate / 100)),
+    ("dutiable_value", ("product_total", "shipping", "insurance"),
+     lambda total, shipping, insurance: total + shipping + insurance),
+    ("customs_base_duty", ("dutiable_value", "duty_rate"), lambda value, rate: value * (rate / 100)),
+    ("customs_section_301", ("dutiable_value", "section_301_rate"), lambda value, rate: value * (rate / 100)),
+    ("customs_total", ("customs_base_duty", "customs_section_301"), lambda base, s301: base + s301),
+    ("payment_fee_cost", ("product_total", "payment_fee"), lambda total, rate: total * (rate / 100)),
+    ("defect_buffer", ("product_total", "defect_rate"), lambda total, rate: total * (rate / 100)),
+    ("sellable_units", ("quantity", "defect_rate"),
+     lambda quantity, rate: np.trunc(quantity * (1 - rate / 100)).astype(np.int64)),
+    ("total_landed_cost",
+     ("product_total", "fx_spread_cost", "shipping", "customs_total", "customs_brokerage", "domestic_delivery",
+      "payment_fee_cost", "insurance", "defect_buffer"),
+     lambda total, fx, shipping, duties, brokerage, delivery, payment, insurance, defect:
+        total + fx + shipping + duties + brokerage + delivery + payment + insurance + defect),
+    ("per_unit_landed", ("total_landed_cost", "quantity"), lambda total, quantity: _divide(total, quantity, 1)),
+    ("per_unit_landed_defect_adjusted", ("total_landed_cost", "sellable_units"),
+     lambda total, units: _divide(total, units, units)),
+    # --- Margin ---
+    ("cogs", ("per_unit_landed", "per_unit_landed_defect_adjusted", "defect_adjusted"),
+     lambda landed, adjusted, defect_adjusted: adjusted if defect_adjusted else landed),
+    ("fee_rates", ("tables", "category", "as_of"), _fee_rates),
+    ("fvf_rate", ("fee_rates", "fvf_override"),
+     lambda rates, override: np.where(np.isnan(override), rates[0], override)),
+    ("final_value_fee", ("sale_price", "fvf_rate"), lambda price, rate: price * (rate / 100)),
+    ("promoted_listings_fee", ("sale_price", "promoted_rate"),
+     lambda price, rate: np.where(rate > 0, price * (rate / 100), 0.0)),
+    ("international_fee", ("sale_price", "international", "fee_rates"),
+     lambda price, international, rates: np.where(international, price * (rates[2] / 100), 0.0)),
+    ("total_ebay_fees", ("final_value_fee", "fee_rates", "promoted_listings_fee", "international_fee"),
+     lambda fvf, rates, promoted, international: fvf + rates[1] + promoted + international),
+    ("ebay_fee_percentage", ("total_ebay_fees", "sale_price"),
+     lambda fees, price: _divide(fees, price, 1) * 100),
+    ("net_revenue_after_fees", ("sale_price", "total_ebay_fees"), lambda price, fees: price - fees),
+    ("total_cogs", ("cogs", "shipping_cost", "packaging_cost"),
+     lambda cogs, shipping, packaging: cogs + shipping + packaging),
+    ("returns_drag_per_unit", ("return_rate", "return_shipping_cost", "shipping_cost", "cogs"),
+     lambda rate, return_shipping, shipping, cogs:
+        (rate / 100) * (np.where(np.isnan(return_shipping), shipping, return_shipping) + (0.25 * cogs))),
+    ("total_costs", ("total_cogs", "returns_drag_per_unit"), lambda cogs, drag: cogs + drag),
+    ("net_profit", ("net_revenue_after_fees", "total_cogs", "returns_drag_per_unit"),
+     lambda revenue, cogs, drag: revenue - cogs - drag),
+    ("net_margin_pct", ("net_profit", "sale_price"), lambda profit, price: _divide(profit, price, price) * 100),
+    ("roi_pct", ("net_profit", "total_cogs"), lambda profit, cogs: _divide(profit, cogs, cogs) * 100),
+    ("breakeven_price",
+     ("total_cogs", "fee_rates", "returns_drag_per_unit", "fvf_rate", "promoted_rate", "international"),
+     _breakeven),
+    ("assessment", ("net_margin_pct", "roi_pct"), get_assessment_codes),
+    ("rate_table_version", ("fee_rates", "shipping_rates"), _rate_table_version),
+)
+
+
+def _dependents() -> dict:
+    """For every input and node, the nodes that transitively depend on it, in NODES order."""
+    affected = {name: set() for name in list(INPUTS) + ["defect_adjusted"] + [n[0] for n in NODES]}
+    for name, deps, _ in NODES:
+        for dep in deps:
+            affected[dep].add(name)
+    order = {name: i for i, (name, _, _) in enumerate(NODES)}
+    result = {}
+    for name in affected:
+        seen, stack = set(), [name]
+        while stack:
+            for child in affected[stack.pop()]:
+                if child not in seen:
+                    seen.add(child)
+                    stack.append(child)
+        result[name] = tuple(sorted(seen, key=order.get))
+    return result
+
+
+DEPENDENTS = _dependents()
+INTERNAL_NODES = ("shipping_rates", "package_weights", "fee_rates")  # Tuples, not columns
+NODE_FUNCTIONS = {name: (deps, compute) for name, deps, compute in NODES}
+
+
+class DealGraph:
+    """
+    A cached batch of deals that recomputes only what an input change affects.
+
+    Construct with the same arguments as calculate_landed_cost_batch() plus
+    calculate_margin_batch() (minus cogs); scalars broadcast across the batch. NaN
+    in shipping_cost_override, fvf_override or return_shipping_cost means "not
+    given" for that row, as in the batch functions.
+    """
+
+    def __init__(self, defect_adjusted: bool = False, **inputs):
+        if np is None:
+            raise ImportError("DealGraph requires NumPy (pip install numpy)")
+        missing = [name for name, (default, _) in INPUTS.items()
+                   if default is None and name not in ("as_of", "tables") and name not in inputs]
+        if missing:
+            raise ValueError(f"Missing deal input: {missing[0]}")
+        self._inputs = {"defect_adjusted": defect_adjusted}
+        for name, (default, _) in INPUTS.items():
+            self._inputs[name] = self._convert(name, inputs.pop(name, default))
+        if inputs:
+            raise ValueError(f"Unknown deal input: {next(iter(inputs))}. Options: {', '.join(INPUTS)}")
+        self._values = {}
+        self.shape = self._shape(self._inputs)
+        self.last_recomputed = self._evaluate(self._values, [name for name, _, _ in NODES])
+
+    def _convert(self, name, value):
+        if name == "tables":
+            return rate_tables.active() if value is None else value
+        kind = INPUTS[name][1]
+        if kind is float:
+            return np.asarray(np.nan if value is None else value, dtype=float)
+        if kind is str:
+            return np.asarray(value, dtype=str)
+        if kind is bool:
+            return np.asarray(value, dtype=bool)
+        return np.asarray(value, dtype=object)
+
+    @staticmethod
+    def _shape(inputs: dict) -> tuple:
+        return np.broadcast_shapes(*(np.shape(value) for name, value in inputs.items()
+                                     if name not in ("tables", "defect_adjusted")))
+
+    def _evaluate(self, values: dict, nodes) -> tuple:
+        for name in nodes:
+            deps, compute = NODE_FUNCTIONS[name]
+            values[name] = compute(*(values[d] if d in values else self._inputs[d] for d in deps))
+        return tuple(nodes)
+
+    def update(self, **changes) -> tuple:
+        """
+        Change one or more inputs and recompute only the nodes downstream of them.
+
+        Pass tables=rate_tables.active() to pick up reloaded rate tables. If a
+        recomputation fails (e.g. an unknown shipping method) the graph is left as it was.
+
+        Returns:
+            the names of the recomputed nodes, in evaluation order
+        """
+        unknown = [name for name in changes if name not in INPUTS and name != "defect_adjusted"]
+        if unknown:
+            raise ValueError(f"Unknown deal input: {unknown[0]}. Options: {', '.join(INPUTS)}")
+
+        previous = self._inputs
+        self._inputs = dict(previous)
+        for name, value in changes.items():
+            self._inputs[name] = value if name == "defect_adjusted" else self._convert(name, value)
+        try:
+            shape = self._shape(self._inputs)
+            if shape != self.shape:
+                nodes = [name for name, _, _ in NODES]
+            else:
+                affected = set()
+                for name in changes:
+                    affected.update(DEPENDENTS[name])
+                nodes = [name for name, _, _ in NODES if name in affected]
+            values = dict(self._values)
+            recomputed = self._evaluate(values, nodes)
+        except Exception:
+            self._inputs = previous
+            raise
+        self._values = values
+        self.shape = shape
+        self.last_recomputed = recomputed
+        return recomputed
+
+    def __getitem__(self, name: str):
+        """One column, broadcast to the batch shape (read-only view)."""
+        if name not in NODE_FUNCTIONS or name in INTERNAL_NODES:
+            raise KeyError(name)
+        value = self._values[name]
+        if name == "rate_table_version" and np.ndim(value) == 0:
+            return value
+        return np.broadcast_to(value, self.shape)
+
+    def columns(self, names=None) -> dict:
+        """Several columns at once (default: every column)."""
+        names = names or [name for name, _, _ in NODES if name not in INTERNAL_NODES]
+        return {name: self[name] for name in names}
+
+    def input(self, name: str):
+        """Current value of one input, as given (not broadcast)."""
+        return self._inputs[name]
@@ -0,0 +1,388 @@
+#!/usr/bin/env python3
+"""
+Deal Scoring and Ranking
+
+Scores scored deals (deal_pipeline.py output, optionally with sold_comps.py and
+vero_screen.py columns joined in) on the five dimensions of the arbitrage-calculator
+SKILL's Phase 3, and keeps the best --top of them:
+
+    Dimension     Weight  Columns (each scored 0-10, then averaged)
+    margin         25%    net_margin_pct     <10 = 0, 10-15 = 3, 15-25 = 7, 25+ = 10
+    roi            20%    roi_pct            <30 = 0, 30-50 = 3, 50-100 = 7, 100+ = 10
+    demand         20%    sell_through_pct, monthly_sales, sales_trend_pct
+    competition    15%    active_listings, top_seller_share_pct, price_spread_pct
+    risk           20%    vero_risk, return_rate, fragile, supplier_rating
+
+deal_score is the weighted average (0-10) over the dimensions a row has data for, so a
+catalog without demand columns is scored on the rest. price_spread_pct, if missing, is
+taken from sold_comps.py's quartiles: (p75_price - p25_price) / median_price. Bands:
+8+ strong, 6-8 promising, 4-6 marginal, below 4 pass.
+
+Each row also gets the Phase 4 go/no-go call:
+    no-go  Net margin below 10%, or extreme VeRO risk
+    go     Net margin 15%+, ROI 50%+, 10+ sales a month (if known) and low VeRO risk (if known)
+    test   Anything in between: viable, but test a small order first
+
+Rows are read in chunks and each chunk is scored with a few NumPy operations. Only a
+chunk's own top --top rows can make the overall list, so they are picked with a
+partial sort and pushed through a --top-sized min-heap; every other row is dropped with
+its chunk. Ranking a 1M-row catalog for the best 500 keeps ~one chunk in memory and
+never sorts the catalog. Ties keep input order. Rows without net_margin_pct or roi_pct
+(or with an error from deal_pipeline.py) are skipped. Requires NumPy.
+
+Usage:
+    python deal_scoring.py scored.csv --top 500 --output best.csv
+    python deal_pipeline.py catalog.csv --vero-screen | python deal_scoring.py --top 50
+    python deal_scoring.py scored.jsonl --weight demand=30 --weight competition=5 --json
+"""
+
+import argparse
+import heapq
+import json
+import sys
+from itertools import islice
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+import batch_io
+
+
+DEFAULT_WEIGHTS = {"margin": 25.0, "roi": 20.0, "demand": 20.0, "competition": 15.0, "risk": 20.0}
+DEFAULT_TOP = 500
+DEFAULT_CHUNK_SIZE = 20000
+
+# Column -> (breakpoints, scores): a value below the first breakpoint scores scores[0],
+# one at or above breakpoint i (and below the next) scores scores[i + 1]
+SCORE_TABLES = {
+    "net_margin_pct": ((10, 15, 25), (0, 3, 7, 10)),
+    "roi_pct": ((30, 50, 100), (0, 3, 7, 10)),
+    "sell_through_pct": ((30, 50, 70), (0, 3, 7, 10)),  # Below 30% = oversaturated
+    "monthly_sales": ((10, 30, 100), (0, 3, 7, 10)),  # 10+ a month = confirmed demand
+    "sales_trend_pct": ((-10, 10), (0, 5, 10)),  # Change in monthly sales
+    "active_listings": ((50, 100, 200), (10, 7, 3, 0)),  # 200+ competing listings = warning
+    "top_seller_share_pct": ((20, 40, 60), (10, 7, 3, 0)),
+    "price_spread_pct": ((15, 30, 50), (10, 7, 3, 0)),  # Interquartile range / median
+    "return_rate": ((5, 10, 15), (10, 7, 3, 0)),
+    "supplier_rating": ((4.5, 4.7, 4.9), (0, 3, 7, 10)),
+}
+
+VERO_SCORES = {"low": 10.0, "moderate": 6.0, "high": 2.0, "extreme": 0.0}
+FRAGILE_SCORES = {True: 3.0, False: 10.0}
+
+DIMENSIONS = {
+    "margin": ("net_margin_pct",),
+    "roi": ("roi_pct",),
+    "demand": ("sell_through_pct", "monthly_sales", "sales_trend_pct"),
+    "competition": ("active_listings", "top_seller_share_pct", "price_spread_pct"),
+    "risk": ("vero_risk", "return_rate", "fragile", "supplier_rating"),
+}
+
+# (minimum deal_score, band), best first
+SCORE_BANDS = ((8.0, "strong"), (6.0, "promising"), (4.0, "marginal"), (float("-inf"), "pass"))
+
+# Phase 4 calls, indexed by decision code
+DECISIONS = ("no-go", "test", "go")
+
+# Columns appended to each ranked row
+SCORE_FIELDS = ["rank", "deal_score", "score_band", "decision",
+                "margin_score", "roi_score", "demand_score", "competition_score", "risk_score"]
+
+
+def parse_weights(items, base: dict = None) -> dict:
+    """Dimension weights from NAME=VALUE strings, on top of base (default: DEFAULT_WEIGHTS)."""
+    weights = dict(DEFAULT_WEIGHTS if base is None else base)
+    for item in items:
+        name, _, value = item.partition("=")
+        if name not in DIMENSIONS:
+            raise ValueError(f"Unknown score dimension: {name}. Options: {', '.join(DIMENSIONS)}")
+        weights[name] = float(value)
+        if weights[name] < 0:
+            raise ValueError(f"Weight for {name} must not be negative, got {value}")
+    if not any(weights.values()):
+        raise ValueError("At least one score weight must be positive")
+    return weights
+
+
+def _numbers(rows: list, name: str):
+    """Float column from row dicts; blank, missing or unparseable values are NaN."""
+    values = [row.get(name) for row in rows]
+    try:
+        return np.array(values, dtype=float)
+    except (TypeError, ValueError):
+        out = np.full(len(values), np.nan)
+        for i, v in enumerate(values):
+            try:
+                out[i] = float(v)
+            except (TypeError, ValueError):
+                pass
+        return out
+
+
+def _lookup(rows: list, name: str, scores: dict, kind=str):
+    """Score column for a categorical column via scores; unknown or blank values are NaN."""
+    out = np.full(len(rows), np.nan)
+    for i, row in enumerate(rows):
+        value = row.get(name)
+        if value is None or value == "":
+            continue
+        if kind is str:
+            value = str(value).strip().lower()
+        else:
+            value = batch_io.coerce(value, kind)
+        out[i] = scores.get(value, np.nan)
+    return out
+
+
+def _binned(values, breakpoints: tuple, scores: tuple):
+    """Table score for each value (NaN stays NaN)."""
+    codes = np.searchsorted(np.asarray(breakpoints, dtype=float), values, side="right")
+    return np.where(np.isnan(values), np.nan, np.asarray(scores, dtype=float)[np.minimum(codes, len(scores) - 1)])
+
+
+def _nanmean(columns: list):
+    """Row-wise mean over the non-NaN columns; NaN where every column is NaN."""
+    stacked = np.vstack(columns)
+    present = ~np.isnan(stacked)
+    n = present.sum(axis=0)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        return np.where(n > 0, np.where(present, stacked, 0.0).sum(axis=0) / n, np.nan)
+
+
+def score_columns(columns: dict, weights: dict = None) -> dict:
+    """
+    Vectorized Phase 3 scores and Phase 4 decisions. Requires NumPy.
+
+    Args:
+        columns: Arrays by column name (SCORE_TABLES columns as floats with NaN for
+            missing, vero_risk and fragile already turned into their 0-10 scores);
+            net_margin_pct and roi_pct are required, every other column is optional
+        weights: Dimension weights (default: DEFAULT_WEIGHTS)
+
+    Returns:
+        dict of arrays: one "<dimension>_score" per dimension (NaN where the row has no
+        data for it), "deal_score", "band_code" (index into SCORE_BANDS) and
+        "decision_code" (0 = no-go, 1 = test, 2 = go)
+    """
+    if np is None:
+        raise ImportError("score_columns requires NumPy (pip install numpy)")
+    weights = DEFAULT_WEIGHTS if weights is None else weights
+
+    net_margin = np.asarray(columns["net_margin_pct"], dtype=float)
+    roi = np.asarray(columns["roi_pct"], dtype=float)
+    n = len(net_margin)
+    missing = np.full(n, np.nan)
+
+    out = {}
+    total = np.zeros(n)
+    weight_sum = np.zeros(n)
+    for dimension, names in DIMENSIONS.items():
+        parts = []
+        for name in names:
+            column = columns.get(name)
+            if column is None:
+                continue
+            column = np.asarray(column, dtype=float)
+            parts.append(column if name in ("vero_risk", "fragile") else _binned(column, *SCORE_TABLES[name]))
+        score = _nanmean(parts) if parts else missing
+        out[f"{dimension}_score"] = score
+        present = ~np.isnan(score)
+        total += np.where(present, score, 0.0) * weights[dimension]
+        weight_sum += present * weights[dimension]
+
+    with np.errstate(invalid="ignore", divide="ignore"):
+        deal_score = np.where(weight_sum > 0, total / weight_sum, 0.0)
+    out["deal_score"] = deal_score
+    out["band_code"] = np.searchsorted(-np.array([b for b, _ in SCORE_BANDS[:-1]]), -deal_score, side="left")
+
+    vero = columns.get("vero_risk")
+    vero = missing if vero is None else np.asarray(vero, dtype=float)
+    monthly_sales = columns.get("monthly_sales")
+    monthly_sales = missing if monthly_sales is None else np.asarray(monthly_sales, dtype=float)
+    no_go = (net_margin < 10) | (vero == VERO_SCORES["extreme"])
+    go = ((net_margin >= 15) & (roi >= 50) & ~(monthly_sales < 10)
+          & (np.isnan(vero) | (vero == VERO_SCORES["low"])))
+    out["decision_code"] = np.where(no_go, 0, np.where(go, 2, 1))
+    return out
+
+
+def _chunk_columns(rows: list) -> dict:
+    """score_columns() inputs for a chunk of row dicts."""
+    present = set().union(*rows)
+    columns = {name: _numbers(rows, name) for name in SCORE_TABLES
+               if name in present or name in ("net_margin_pct", "roi_pct")}
+    if "price_spread_pct" not in columns and "median_price" in present:
+        median = _numbers(rows, "median_price")
+        with np.errstate(invalid="ignore", divide="ignore"):
+            columns["price_spread_pct"] = np.where(
+                median > 0, (_numbers(rows, "p75_price") - _numbers(rows, "p25_price")) / median * 100, np.nan)
+    if "vero_risk" in present:
+        columns["vero_risk"] = _lookup(rows, "vero_risk", VERO_SCORES)
+    if "fragile" in present:
+        columns["fragile"] = _lookup(rows, "fragile", FRAGILE_SCORES, "bool")
+    return columns
+
+
+def _top_positions(deal_score, top: int):
+    """Indices of the top best scores, ties to the earlier row, via a partial sort."""
+    threshold = np.partition(deal_score, len(deal_score) - top)[len(deal_score) - top]
+    # Rows tied at the threshold all compete, so the earliest of them win
+    candidates = np.flatnonzero(deal_score >= threshold)
+    return candidates[np.lexsort((candidates, -deal_score[candidates]))][:top]
+
+
+def rank_rows(rows, top: int = DEFAULT_TOP, weights: dict = None, chunk_size: int = DEFAULT_CHUNK_SIZE) -> dict:
+    """
+    Score every row and keep the top best, streaming.
+
+    Returns:
+        dict with "rows" (the best rows, best first, each input row plus SCORE_FIELDS),
+        "scored" (rows scored) and "skipped" (rows without margin and ROI or with an error)
+    """
+    if np is None:
+        raise ImportError("rank_rows requires NumPy (pip install numpy)")
+    if top < 1:
+        raise ValueError(f"--top must be at least 1, got {top}")
+
+    heap = []  # (deal_score, -input position, row, scores), worst on top
+    scored = skipped = 0
+    offset = 0  # Input position of the chunk's first row
+    rows = iter(rows)
+    while True:
+        chunk = list(islice(rows, chunk_size))
+        if not chunk:
+            break
+        start = offset
+        offset += len(chunk)
+
+        columns = _chunk_columns(chunk)
+        valid = ~(np.isnan(columns["net_margin_pct"]) | np.isnan(columns["roi_pct"]))
+        valid &= np.array([not row.get("error") for row in chunk])
+        skipped += int((~valid).sum())
+        keep = np.flatnonzero(valid)
+        if not len(keep):
+            continue
+        scored += len(keep)
+        result = score_columns({name: column[keep] for name, column in columns.items()}, weights)
+        deal_score = result["deal_score"]
+
+        # Only the chunk's own best `top` can make the list
+        order = _top_positions(deal_score, top) if len(keep) > top else np.arange(len(keep))
+        floor = heap[0][:2] if len(heap) == top else None
+        for i in order.tolist():
+            key = (float(deal_score[i]), -(start + int(keep[i])))
+            if floor is not None and key <= floor:
+                continue
+            item = key + (chunk[keep[i]], {name: result[name][i] for name in result})
+            if len(heap) < top:
+                heapq.heappush(heap, item)
+            else:
+                heapq.heappushpop(heap, item)
+            if len(heap) == top:
+                floor = heap[0][:2]
+
+    out = []
+    for rank, (deal_score, _, row, scores) in enumerate(sorted(heap, key=lambda item: item[:2], reverse=True),
+                                                        start=1):
+        out.append({
+            **row,
+            "rank": rank,
+            "deal_score": round(deal_score, 2),
+            "score_band": SCORE_BANDS[int(scores["band_code"])][1],
+            "decision": DECISIONS[int(scores["decision_code"])],
+            **{f"{d}_score": None if np.isnan(scores[f"{d}_score"]) else round(float(scores[f"{d}_score"]), 1)
+               for d in DIMENSIONS},
+        })
+    return {"rows": out, "scored": scored, "skipped": skipped}
+
+
+def print_report(result: dict, weights: dict, top: int):
+    """Print a human-readable ranking."""
+    print("\n" + "=" * 78)
+    print("  DEAL SCORING")
+    print("=" * 78)
+
+    print(f"\n  Deals Scored:         {result['scored']:,}")
+    print(f"  Skipped:              {result['skipped']:,}")
+    total = sum(weights.values())
+    print("  Weights:              " + ", ".join(f"{d} {w / total * 100:.0f}%" for d, w in weights.items()))
+
+    rows = result["rows"]
+    if not rows:
+        print("\n  No deals to rank.")
+        print("=" * 78 + "\n")
+        return
+
+    print(f"\n--- Top {min(top, len(rows))} Deals ---")
+    print(f"  {'#':>4} {'SKU':<16} {'Score':>6} {'Band':<10} {'Call':<6} {'Margin%':>8} {'ROI%':>8}")
+    for row in rows[:top]:
+        sku = str(row.get("sku") or row.get("key") or "")[:16]
+        print(f"  {row['rank']:>4} {sku:<16} {row['deal_score']:>6.2f} {row['score_band']:<10} "
+              f"{row['decision']:<6} {float(row['net_margin_pct']):>8.1f} {float(row['roi_pct']):>8.1f}")
+    print("=" * 78 + "\n")
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Score deals on margin, ROI, demand, competition and risk, and keep the best",
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        epilog="""
+Examples:
+  Best 500 of a scored catalog:
+    %(prog)s scored.csv --top 500 --output best.csv
+
+  Straight from the pipeline, with VeRO risk:
+    deal_pipeline.py catalog.csv --vero-screen | %(prog)s --top 50
+
+  Weight demand over competition:
+    %(prog)s scored.jsonl --weight demand=30 --weight competition=5 --json
+        """,
+    )
+
+    parser.add_argument("input", nargs="?", default="-", help="Scored deals file (default: stdin)")
+    parser.add_argument("--top", type=int, default=DEFAULT_TOP, help=f"Deals to keep (default: {DEFAULT_TOP})")
+    parser.add_argument("--weight", type=str, action="append", default=[], metavar="DIMENSION=WEIGHT",
+                       help="Dimension weight, e.g. demand=30 (repeatable; default: "
+                            + ", ".join(f"{d}={w:g}" for d, w in DEFAULT_WEIGHTS.items()) + ")")
+    parser.add_argument("--output", type=str, default=None, help="Write the ranked deals to this file (CSV/JSONL)")
+    parser.add_argument("--input-format", type=str, choices=batch_io.FORMATS, default=None,
+                       help="Input format (default: from file extension, else csv)")
+    parser.add_argument("--output-format", type=str, choices=batch_io.FORMATS, default=None,
+                       help="Output format (default: from file extension, else same as input)")
+    parser.add_argument("--chunk-size", type=int, default=DEFAULT_CHUNK_SIZE,
+                       help=f"Rows scored per NumPy batch (default: {DEFAULT_CHUNK_SIZE})")
+    parser.add_argument("--show", type=int, default=25, help="Deals shown in the report (default: 25)")
+    parser.add_argument("--json", action="store_true", help="Output as JSON")
+
+    args = parser.parse_args()
+
+    if np is None:
+        parser.error("deal_scoring.py requires NumPy (pip install numpy)")
+
+    input_format = args.input_format or batch_io.infer_format(args.input, "csv")
+    infile = sys.stdin if args.input == "-" else open(args.input, newline="", encoding="utf-8")
+    try:
+        weights = parse_weights(args.weight)
+        result = rank_rows(batch_io.read_rows(infile, input_format), args.top, weights, args.chunk_size)
+    except ValueError as e:
+        parser.error(str(e))
+    finally:
+        if infile is not sys.stdin:
+            infile.close()
+
+    if args.output:
+        output_format = args.output_format or batch_io.infer_format(args.output, input_format)
+        with open(args.output, "w", newline="", encoding="utf-8") as f:
+            batch_io.write_rows(result["rows"], f, output_format)
+        print(f"Wrote the top {len(result['rows'])} deals to {args.output}", file=sys.stderr)
+
+    if args.json:
+        print(json.dumps({**result, "weights": weights}, indent=2))
+    else:
+        print_report(result, weights, args.show)
+
+
+if __name__ == "__main__":
+    main()
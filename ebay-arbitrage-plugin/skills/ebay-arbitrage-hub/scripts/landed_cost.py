@@ -17,56 +17,59 @@ The script prints a detailed cost breakdown and the final per-unit landed cost.
 
 import argparse
 import json
+import os
 import sys
-
-
-# Shipping rate estimates per kg by method
-# These are rough averages — actual rates vary by route, season, and provider
-SHIPPING_RATES = {
-    "aliexpress_standard": {
-        "name": "AliExpress Standard / ePacket",
-        "rate_per_kg": 12.00,  # Approximate average for light parcels
-        "base_fee": 2.00,  # Minimum shipping charge
-        "max_weight_kg": 5.0,
-        "notes": "Best for 1-10 unit test orders from AliExpress",
-    },
-    "air_parcel": {
-        "name": "Air Parcel (small batch)",
-        "rate_per_kg": 8.00,
-        "base_fee": 15.00,
-        "max_weight_kg": 30.0,
-        "notes": "Good for 10-50 unit orders via freight forwarder",
-    },
-    "air_freight": {
-        "name": "Air Freight (cargo)",
-        "rate_per_kg": 5.50,
-        "base_fee": 50.00,  # Handling/documentation
-        "max_weight_kg": None,  # No practical limit
-        "notes": "Best for 50-500 unit orders — good balance of cost and speed",
-    },
-    "sea_lcl": {
-        "name": "Sea Freight (LCL)",
-        "rate_per_kg": 1.50,
-        "base_fee": 200.00,  # Minimum charges for LCL
-        "max_weight_kg": None,
-        "notes": "Less-than-container load. 45-70 days. Good for 200+ units if time allows",
-    },
-    "sea_fcl": {
-        "name": "Sea Freight (FCL - 20ft container)",
-        "rate_per_kg": 0.30,
-        "base_fee": 2500.00,  # Container booking + handling
-        "max_weight_kg": None,
-        "notes": "Full container. 40-60 days. Only for large-scale operations",
-    },
-    "express_dhl": {
-        "name": "Express (DHL/FedEx/UPS)",
-        "rate_per_kg": 25.00,
-        "base_fee": 10.00,
-        "max_weight_kg": None,
-        "notes": "3-7 days. Expensive but fast. Best for high-value or urgent shipments",
-    },
+import time
+from functools import partial
+
+import packing
+import profiling
+import rate_tables
+
+# NumPy, batch_io and result_cache are imported only where the batch API, --input and
+# --cache need them, so a single-deal run starts without them
+
+
+# Shipping rates in effect today, loaded from rates/shipping_rates.json (see rate_tables.py).
+# These are rough per-kg averages — actual rates vary by route, season, and provider.
+# SHIPPING_RATES is a snapshot taken at import; the calculators read rate_tables.active()
+# on every call, so a resident process picks up a new rate version without restarting.
+SHIPPING_RATES = rate_tables.active().shipping.methods
+
+# Row fields accepted in --input mode, with the type to coerce text values to
+LANDED_COST_FIELDS = {
+    "product_cost": float,
+    "quantity": int,
+    "weight_per_unit_kg": float,
+    "length_cm": float,
+    "width_cm": float,
+    "height_cm": float,
+    "carton_length_cm": float,
+    "carton_width_cm": float,
+    "carton_height_cm": float,
+    "carton_weight_kg": float,
+    "shipping_method": str,
+    "duty_rate": float,
+    "section_301_rate": float,
+    "fx_spread": float,
+    "payment_fee": float,
+    "insurance_rate": float,
+    "customs_brokerage": float,
+    "domestic_delivery": float,
+    "defect_rate": float,
+    "shipping_cost_override": float,
+    "as_of": str,
 }
 
+# Result columns appended to each row in --input mode. Cost lines whose names clash
+# with an input rate column (fx_spread, payment_fee, customs_brokerage) get a _cost suffix.
+LANDED_COST_OUTPUT_FIELDS = [
+    "product_total", "fx_spread_cost", "chargeable_weight_kg", "cartons", "shipping", "customs_total", "customs_brokerage_cost",
+    "payment_fee_cost", "insurance", "defect_buffer", "total_landed_cost", "per_unit_landed",
+    "per_unit_landed_defect_adjusted", "sellable_units", "multiplier_from_listing_price",
+    "multiplier_defect_adjusted", "de_minimis_applies", "rate_table_version",
+]
+
 # Default fee percentages
 DEFAULT_FX_SPREAD = 2.5  # Percentage
 DEFAULT_PAYMENT_FEE = 3.0  # Percentage
@@ -75,8 +78,115 @@ DEFAULT_CUSTOMS_BROKERAGE = 150.00  # Flat fee per shipment
 DEFAULT_DOMESTIC_DELIVERY = 0.0  # Often included in freight forwarder quote
 DEFAULT_DEFECT_RATE = 4.0  # Percentage of units
 
+DE_MINIMIS_THRESHOLD = 800.0  # US duty-free limit per shipment (USD)
 
-def calculate_landed_cost(
+
+class LandedCostResult:
+    """
+    Compact landed cost result.
+
+    Holds the raw (unrounded) cost components in slots; per-unit figures, multipliers
+    and the rounded report dict are only computed when asked for. to_dict() returns
+    exactly what calculate_landed_cost() does. shipping_table is the
+    rate_tables.ShippingTable used.
+    """
+
+    __slots__ = (
+        "product_cost", "quantity", "weight_per_unit_kg", "shipping_method", "duty_rate",
+        "section_301_rate", "defect_rate", "total_product_cost", "fx_cost", "total_weight_kg",
+        "volumetric_weight_kg", "chargeable_weight_kg", "cartons", "total_shipping", "base_duty",
+        "section_301_duty", "total_duties", "customs_brokerage", "domestic_delivery", "payment_cost",
+        "insurance_cost", "defect_cost", "sellable_units", "total_landed", "shipping_table",
+    )
+
+    def __init__(self, **fields):
+        for name in self.__slots__:
+            setattr(self, name, fields[name])
+
+    @property
+    def per_unit_landed(self) -> float:
+        return self.total_landed / self.quantity
+
+    @property
+    def per_unit_landed_adjusted(self) -> float:
+        return self.total_landed / self.sellable_units if self.sellable_units > 0 else 0
+
+    @property
+    def multiplier(self) -> float:
+        return self.per_unit_landed / self.product_cost if self.product_cost > 0 else 0
+
+    @property
+    def multiplier_adjusted(self) -> float:
+        return self.per_unit_landed_adjusted / self.product_cost if self.product_cost > 0 else 0
+
+    @property
+    def de_minimis(self) -> bool:
+        return self.total_product_cost < DE_MINIMIS_THRESHOLD
+
+    @property
+    def rate_table_version(self) -> str:
+        return self.shipping_table.stamp
+
+    def shipping_info(self) -> dict:
+        if self.shipping_method is None:
+            return {"method": "custom", "name": "Custom (user-provided)", "notes": "User provided actual shipping quote"}
+        method = self.shipping_table.methods[self.shipping_method]
+        info = {
+            "method": self.shipping_method,
+            "name": method["name"],
+            "total_weight_kg": round(self.total_weight_kg, 2),
+            "rate_per_kg": method["rate_per_kg"],
+            "base_fee": method["base_fee"],
+            "notes": method["notes"],
+        }
+        if self.volumetric_weight_kg or self.cartons:
+            # Dimensions given: show the weight the freight was billed on (see packing.py)
+            info["volumetric_weight_kg"] = round(self.volumetric_weight_kg, 2)
+            info["chargeable_weight_kg"] = round(self.chargeable_weight_kg, 2)
+            info["volumetric_divisor"] = method["volumetric_divisor"]
+            info["cartons"] = self.cartons
+        return info
+
+    def to_dict(self) -> dict:
+        """Rounded report dict (the calculate_landed_cost() / --json format)."""
+        return {
+            "input": {
+                "product_cost_per_unit": self.product_cost,
+                "quantity": self.quantity,
+                "weight_per_unit_kg": self.weight_per_unit_kg,
+                "total_weight_kg": round(self.total_weight_kg, 2),
+                "shipping_method": self.shipping_info(),
+                "duty_rate": self.duty_rate,
+                "section_301_rate": self.section_301_rate,
+                "defect_rate": self.defect_rate,
+            },
+            "cost_breakdown": {
+                "product_total": round(self.total_product_cost, 2),
+                "fx_spread": round(self.fx_cost, 2),
+                "shipping": round(self.total_shipping, 2),
+                "customs_base_duty": round(self.base_duty, 2),
+                "customs_section_301": round(self.section_301_duty, 2),
+                "customs_total": round(self.total_duties, 2),
+                "customs_brokerage": round(self.customs_brokerage, 2),
+                "domestic_delivery": round(self.domestic_delivery, 2),
+                "payment_fee": round(self.payment_cost, 2),
+                "insurance": round(self.insurance_cost, 2),
+                "defect_buffer": round(self.defect_cost, 2),
+            },
+            "summary": {
+                "total_landed_cost": round(self.total_landed, 2),
+                "per_unit_landed": round(self.per_unit_landed, 2),
+                "per_unit_landed_defect_adjusted": round(self.per_unit_landed_adjusted, 2),
+                "sellable_units": self.sellable_units,
+                "multiplier_from_listing_price": round(self.multiplier, 2),
+                "multiplier_defect_adjusted": round(self.multiplier_adjusted, 2),
+                "de_minimis_applies": self.de_minimis,
+            },
+            "rate_table_version": self.shipping_table.stamp,
+        }
+
+
+def calculate_landed_cost_record(
     product_cost: float,
     quantity: int,
     weight_per_unit_kg: float,
@@ -90,31 +200,29 @@ def calculate_landed_cost(
     domestic_delivery: float = DEFAULT_DOMESTIC_DELIVERY,
     defect_rate: float = DEFAULT_DEFECT_RATE,
     shipping_cost_override: float = None,
-) -> dict:
+    quiet: bool = False,
+    as_of=None,
+    length_cm: float = None,
+    width_cm: float = None,
+    height_cm: float = None,
+    carton_length_cm: float = None,
+    carton_width_cm: float = None,
+    carton_height_cm: float = None,
+    carton_weight_kg: float = 0.0,
+) -> LandedCostResult:
     """
-    Calculate full landed cost per unit.
+    Calculate full landed cost per unit as a LandedCostResult.
 
-    Args:
-        product_cost: Per-unit cost from supplier at the given quantity
-        quantity: Number of units ordered
-        weight_per_unit_kg: Weight per unit in kilograms
-        shipping_method: One of the SHIPPING_RATES keys
-        duty_rate: Base customs duty rate (percentage)
-        section_301_rate: Additional Section 301 tariff rate (percentage)
-        fx_spread: Foreign exchange conversion spread (percentage, default 2.5)
-        payment_fee: Payment platform fee (percentage, default 3.0)
-        insurance_rate: Cargo insurance rate (percentage of goods value, default 1.5)
-        customs_brokerage: Flat customs brokerage fee per shipment (default $150)
-        domestic_delivery: Domestic delivery cost (default $0 — often included in freight quote)
-        defect_rate: Expected defect rate (percentage, default 4)
-        shipping_cost_override: Override calculated shipping with actual quote (total, not per unit)
-
-    Returns:
-        dict with full cost breakdown
+    Same arguments and arithmetic as calculate_landed_cost(), without building the
+    nested report dict — use this in bulk loops and call to_dict() only if needed.
     """
+    shipping_table = rate_tables.active().shipping_on(as_of)
+    index = shipping_table.index
+
     # Validate shipping method
-    if shipping_method not in SHIPPING_RATES and shipping_cost_override is None:
-        raise ValueError(f"Unknown shipping method: {shipping_method}. Options: {', '.join(SHIPPING_RATES.keys())}")
+    method_code = index.code_of.get(shipping_method)
+    if method_code is None and shipping_cost_override is None:
+        raise ValueError(f"Unknown shipping method: {shipping_method}. Options: {', '.join(index.keys)}")
 
     # --- Product Cost ---
     total_product_cost = product_cost * quantity
@@ -123,27 +231,23 @@ def calculate_landed_cost(
     fx_cost = total_product_cost * (fx_spread / 100)
 
     # --- Shipping ---
-    total_weight_kg = weight_per_unit_kg * quantity
+    # Billed on the greater of actual and volumetric weight when dimensions are given
+    total_weight_kg, volumetric_weight_kg, chargeable_weight_kg, cartons = packing.chargeable_weight(
+        quantity, weight_per_unit_kg, index.volumetric_divisor[method_code] if method_code is not None else None,
+        (length_cm, width_cm, height_cm), (carton_length_cm, carton_width_cm, carton_height_cm), carton_weight_kg,
+    )
 
     if shipping_cost_override is not None:
         total_shipping = shipping_cost_override
-        shipping_info = {"method": "custom", "name": "Custom (user-provided)", "notes": "User provided actual shipping quote"}
+        shipping_method = None
     else:
-        method = SHIPPING_RATES[shipping_method]
+        max_weight_kg = index.max_weight_kg[method_code]
         # Check weight limit
-        if method["max_weight_kg"] and total_weight_kg > method["max_weight_kg"]:
-            print(f"Warning: Total weight ({total_weight_kg:.1f}kg) exceeds {method['name']} "
-                  f"limit of {method['max_weight_kg']}kg. Consider a different shipping method.")
+        if not quiet and max_weight_kg and total_weight_kg > max_weight_kg:
+            print(f"Warning: Total weight ({total_weight_kg:.1f}kg) exceeds {index.methods[method_code]['name']} "
+                  f"limit of {max_weight_kg}kg. Consider a different shipping method.")
 
-        total_shipping = method["base_fee"] + (total_weight_kg * method["rate_per_kg"])
-        shipping_info = {
-            "method": shipping_method,
-            "name": method["name"],
-            "total_weight_kg": round(total_weight_kg, 2),
-            "rate_per_kg": method["rate_per_kg"],
-            "base_fee": method["base_fee"],
-            "notes": method["notes"],
-        }
+        total_shipping = index.base_fee[method_code] + (chargeable_weight_kg * index.rate_per_kg[method_code])
 
     # --- Customs Duties ---
     # Dutiable value = product cost + freight + insurance
@@ -156,8 +260,7 @@ def calculate_landed_cost(
     total_duties = base_duty + section_301_duty
 
     # Check de minimis
-    de_minimis = total_product_cost < 800
-    if de_minimis and duty_rate > 0:
+    if not quiet and total_product_cost < DE_MINIMIS_THRESHOLD and duty_rate > 0:
         print(f"Note: Order value (${total_product_cost:.2f}) is under $800 de minimis threshold. "
               f"Duties may not apply for individual parcels, but will apply for consolidated freight shipments.")
 
@@ -181,49 +284,286 @@ def calculate_landed_cost(
         + defect_cost
     )
 
-    per_unit_landed = total_landed / quantity
-    per_unit_landed_adjusted = total_landed / sellable_units if sellable_units > 0 else 0
-
-    # Multiplier from listing price
-    multiplier = per_unit_landed / product_cost if product_cost > 0 else 0
-    multiplier_adjusted = per_unit_landed_adjusted / product_cost if product_cost > 0 else 0
-
-    result = {
-        "input": {
-            "product_cost_per_unit": product_cost,
-            "quantity": quantity,
-            "weight_per_unit_kg": weight_per_unit_kg,
-            "total_weight_kg": round(total_weight_kg, 2),
-            "shipping_method": shipping_info,
-            "duty_rate": duty_rate,
-            "section_301_rate": section_301_rate,
-            "defect_rate": defect_rate,
-        },
-        "cost_breakdown": {
-            "product_total": round(total_product_cost, 2),
-            "fx_spread": round(fx_cost, 2),
-            "shipping": round(total_shipping, 2),
-            "customs_base_duty": round(base_duty, 2),
-            "customs_section_301": round(section_301_duty, 2),
-            "customs_total": round(total_duties, 2),
-            "customs_brokerage": round(customs_brokerage, 2),
-            "domestic_delivery": round(domestic_delivery, 2),
-            "payment_fee": round(payment_cost, 2),
-            "insurance": round(insurance_cost, 2),
-            "defect_buffer": round(defect_cost, 2),
-        },
-        "summary": {
-            "total_landed_cost": round(total_landed, 2),
-            "per_unit_landed": round(per_unit_landed, 2),
-            "per_unit_landed_defect_adjusted": round(per_unit_landed_adjusted, 2),
-            "sellable_units": sellable_units,
-            "multiplier_from_listing_price": round(multiplier, 2),
-            "multiplier_defect_adjusted": round(multiplier_adjusted, 2),
-            "de_minimis_applies": de_minimis,
-        },
+    return LandedCostResult(
+        product_cost=product_cost,
+        quantity=quantity,
+        weight_per_unit_kg=weight_per_unit_kg,
+        shipping_method=shipping_method,
+        duty_rate=duty_rate,
+        section_301_rate=section_301_rate,
+        defect_rate=defect_rate,
+        total_product_cost=total_product_cost,
+        fx_cost=fx_cost,
+        total_weight_kg=total_weight_kg,
+        volumetric_weight_kg=volumetric_weight_kg,
+        chargeable_weight_kg=chargeable_weight_kg,
+        cartons=cartons,
+        total_shipping=total_shipping,
+        base_duty=base_duty,
+        section_301_duty=section_301_duty,
+        total_duties=total_duties,
+        customs_brokerage=customs_brokerage,
+        domestic_delivery=domestic_delivery,
+        payment_cost=payment_cost,
+        insurance_cost=insurance_cost,
+        defect_cost=defect_cost,
+        sellable_units=sellable_units,
+        total_landed=total_landed,
+        shipping_table=shipping_table,
+    )
+
+
+def calculate_landed_cost(
+    product_cost: float,
+    quantity: int,
+    weight_per_unit_kg: float,
+    shipping_method: str = "air_freight",
+    duty_rate: float = 0.0,
+    section_301_rate: float = 0.0,
+    fx_spread: float = DEFAULT_FX_SPREAD,
+    payment_fee: float = DEFAULT_PAYMENT_FEE,
+    insurance_rate: float = DEFAULT_INSURANCE_RATE,
+    customs_brokerage: float = DEFAULT_CUSTOMS_BROKERAGE,
+    domestic_delivery: float = DEFAULT_DOMESTIC_DELIVERY,
+    defect_rate: float = DEFAULT_DEFECT_RATE,
+    shipping_cost_override: float = None,
+    quiet: bool = False,
+    as_of=None,
+    length_cm: float = None,
+    width_cm: float = None,
+    height_cm: float = None,
+    carton_length_cm: float = None,
+    carton_width_cm: float = None,
+    carton_height_cm: float = None,
+    carton_weight_kg: float = 0.0,
+) -> dict:
+    """
+    Calculate full landed cost per unit.
+
+    Args:
+        product_cost: Per-unit cost from supplier at the given quantity
+        quantity: Number of units ordered
+        weight_per_unit_kg: Weight per unit in kilograms
+        shipping_method: One of the SHIPPING_RATES keys
+        duty_rate: Base customs duty rate (percentage)
+        section_301_rate: Additional Section 301 tariff rate (percentage)
+        fx_spread: Foreign exchange conversion spread (percentage, default 2.5)
+        payment_fee: Payment platform fee (percentage, default 3.0)
+        insurance_rate: Cargo insurance rate (percentage of goods value, default 1.5)
+        customs_brokerage: Flat customs brokerage fee per shipment (default $150)
+        domestic_delivery: Domestic delivery cost (default $0 — often included in freight quote)
+        defect_rate: Expected defect rate (percentage, default 4)
+        shipping_cost_override: Override calculated shipping with actual quote (total, not per unit)
+        quiet: Suppress the weight-limit and de minimis notes printed to stdout
+        as_of: Order date (date or "YYYY-MM-DD"); use the shipping rates in effect
+            then instead of today's
+        length_cm, width_cm, height_cm: Packaged unit dimensions; freight is billed on
+            the greater of actual and volumetric weight (see packing.py)
+        carton_length_cm, carton_width_cm, carton_height_cm: Shipping carton dimensions;
+            with these, freight is billed on whole cartons
+        carton_weight_kg: Tare weight of one empty carton
+
+    Returns:
+        dict with full cost breakdown
+    """
+    return calculate_landed_cost_record(
+        product_cost, quantity, weight_per_unit_kg, shipping_method, duty_rate, section_301_rate,
+        fx_spread, payment_fee, insurance_rate, customs_brokerage, domestic_delivery, defect_rate,
+        shipping_cost_override, quiet, as_of, length_cm, width_cm, height_cm,
+        carton_length_cm, carton_width_cm, carton_height_cm, carton_weight_kg,
+    ).to_dict()
+
+
+def landed_cost_row(row: dict) -> dict:
+    """Calculate landed cost for one --input row and return its LANDED_COST_OUTPUT_FIELDS."""
+    import batch_io
+
+    r = calculate_landed_cost_record(**batch_io.calculator_kwargs(row, LANDED_COST_FIELDS), quiet=True)
+    return {
+        "product_total": round(r.total_product_cost, 2),
+        "fx_spread_cost": round(r.fx_cost, 2),
+        "chargeable_weight_kg": round(r.chargeable_weight_kg, 2),
+        "cartons": r.cartons,
+        "shipping": round(r.total_shipping, 2),
+        "customs_total": round(r.total_duties, 2),
+        "customs_brokerage_cost": round(r.customs_brokerage, 2),
+        "payment_fee_cost": round(r.payment_cost, 2),
+        "insurance": round(r.insurance_cost, 2),
+        "defect_buffer": round(r.defect_cost, 2),
+        "total_landed_cost": round(r.total_landed, 2),
+        "per_unit_landed": round(r.per_unit_landed, 2),
+        "per_unit_landed_defect_adjusted": round(r.per_unit_landed_adjusted, 2),
+        "sellable_units": r.sellable_units,
+        "multiplier_from_listing_price": round(r.multiplier, 2),
+        "multiplier_defect_adjusted": round(r.multiplier_adjusted, 2),
+        "de_minimis_applies": r.de_minimis,
+        "rate_table_version": r.rate_table_version,
     }
 
-    return result
+
+def calculate_landed_cost_batch(
+    product_cost,
+    quantity,
+    weight_per_unit_kg,
+    shipping_method="air_freight",
+    duty_rate=0.0,
+    section_301_rate=0.0,
+    fx_spread=DEFAULT_FX_SPREAD,
+    payment_fee=DEFAULT_PAYMENT_FEE,
+    insurance_rate=DEFAULT_INSURANCE_RATE,
+    customs_brokerage=DEFAULT_CUSTOMS_BROKERAGE,
+    domestic_delivery=DEFAULT_DOMESTIC_DELIVERY,
+    defect_rate=DEFAULT_DEFECT_RATE,
+    shipping_cost_override=None,
+    as_of=None,
+    length_cm=None,
+    width_cm=None,
+    height_cm=None,
+    carton_length_cm=None,
+    carton_width_cm=None,
+    carton_height_cm=None,
+    carton_weight_kg=0.0,
+) -> dict:
+    """
+    Calculate landed cost for many orders at once over NumPy arrays.
+
+    Every argument accepts either a scalar or a 1-D array; scalars are broadcast
+    across the batch. Arithmetic follows calculate_landed_cost() step for step, so
+    round(column[i], 2) equals the matching field of the scalar result.
+
+    Args:
+        shipping_method: A SHIPPING_RATES key or an array of keys
+        shipping_cost_override: Total shipping quote per row; NaN (or None) means
+            use the calculated rate for that row
+        as_of: Order date per row (dates, ISO strings or datetime64; None/NaT means
+            today). Each row is costed under the shipping rates in effect on its date.
+        length_cm ... carton_height_cm: Package and carton dimensions; NaN (or None)
+            means not given for that row
+        (all other arguments as in calculate_landed_cost)
+
+    Returns:
+        dict of unrounded column arrays, keyed like the scalar cost_breakdown and
+        summary fields, plus total_weight_kg, volumetric_weight_kg,
+        chargeable_weight_kg, cartons, dutiable_value, over_weight_limit and
+        rate_table_version (one string, or a per-row array when as_of is an array).
+        The scalar function's weight-limit and de minimis notes are reported as the
+        boolean over_weight_limit and de_minimis_applies columns instead of printed.
+    """
+    try:
+        import numpy as np
+    except ImportError:
+        raise ImportError("calculate_landed_cost_batch requires NumPy (pip install numpy)") from None
+
+    product_cost = np.asarray(product_cost, dtype=float)
+    quantity = np.asarray(quantity, dtype=float)
+    weight_per_unit_kg = np.asarray(weight_per_unit_kg, dtype=float)
+    duty_rate = np.asarray(duty_rate, dtype=float)
+    section_301_rate = np.asarray(section_301_rate, dtype=float)
+    fx_spread = np.asarray(fx_spread, dtype=float)
+    payment_fee = np.asarray(payment_fee, dtype=float)
+    insurance_rate = np.asarray(insurance_rate, dtype=float)
+    customs_brokerage = np.asarray(customs_brokerage, dtype=float)
+    domestic_delivery = np.asarray(domestic_delivery, dtype=float)
+    defect_rate = np.asarray(defect_rate, dtype=float)
+
+    shape = np.broadcast_shapes(
+        product_cost.shape, quantity.shape, weight_per_unit_kg.shape, np.shape(shipping_method),
+        duty_rate.shape, section_301_rate.shape, fx_spread.shape, payment_fee.shape,
+        insurance_rate.shape, customs_brokerage.shape, domestic_delivery.shape,
+        defect_rate.shape, np.shape(shipping_cost_override), np.shape(as_of),
+        *(np.shape(d) for d in (length_cm, width_cm, height_cm, carton_length_cm, carton_width_cm,
+                                carton_height_cm, carton_weight_kg)),
+    )
+
+    if shipping_cost_override is None:
+        override = np.full(shape, np.nan)
+    else:
+        override = np.broadcast_to(np.asarray(shipping_cost_override, dtype=float), shape)
+    has_override = ~np.isnan(override)
+
+    # Resolve each distinct method (and rate version) once, then gather the rate columns
+    tables = rate_tables.active()
+    rate_per_kg, base_fee, max_weight_kg, volumetric_divisor, known, rate_table_version = (
+        tables.shipping_columns(shipping_method, as_of))
+    invalid = ~(has_override | np.broadcast_to(known, shape))
+    if invalid.any():
+        unknown = np.broadcast_to(np.asarray(shipping_method, dtype=str), shape)[invalid][0]
+        raise ValueError(f"Unknown shipping method: {unknown}. Options: {', '.join(tables.shipping.methods)}")
+
+    # --- Product Cost / FX Spread ---
+    total_product_cost = product_cost * quantity
+    fx_cost = total_product_cost * (fx_spread / 100)
+
+    # --- Shipping ---
+    total_weight_kg, volumetric_weight_kg, chargeable_weight_kg, cartons = packing.chargeable_weight_batch(
+        quantity, weight_per_unit_kg, volumetric_divisor, (length_cm, width_cm, height_cm),
+        (carton_length_cm, carton_width_cm, carton_height_cm), carton_weight_kg,
+    )
+    total_shipping = np.where(has_override, override, base_fee + (chargeable_weight_kg * rate_per_kg))
+    over_weight_limit = ~has_override & (total_weight_kg > max_weight_kg)
+
+    # --- Customs Duties ---
+    dutiable_value = total_product_cost + total_shipping
+    insurance_cost = total_product_cost * (insurance_rate / 100)
+    dutiable_value = dutiable_value + insurance_cost
+
+    base_duty = dutiable_value * (duty_rate / 100)
+    section_301_duty = dutiable_value * (section_301_rate / 100)
+    total_duties = base_duty + section_301_duty
+    de_minimis = total_product_cost < DE_MINIMIS_THRESHOLD
+
+    # --- Payment Fee / Defect Buffer ---
+    payment_cost = total_product_cost * (payment_fee / 100)
+    defect_cost = total_product_cost * (defect_rate / 100)
+    sellable_units = np.trunc(quantity * (1 - defect_rate / 100)).astype(np.int64)
+
+    # --- Total Landed Cost ---
+    total_landed = (
+        total_product_cost
+        + fx_cost
+        + total_shipping
+        + total_duties
+        + customs_brokerage
+        + domestic_delivery
+        + payment_cost
+        + insurance_cost
+        + defect_cost
+    )
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        per_unit_landed = total_landed / quantity
+        per_unit_landed_adjusted = np.where(sellable_units > 0, total_landed / sellable_units, 0.0)
+        multiplier = np.where(product_cost > 0, per_unit_landed / product_cost, 0.0)
+        multiplier_adjusted = np.where(product_cost > 0, per_unit_landed_adjusted / product_cost, 0.0)
+
+    return {
+        "total_weight_kg": np.broadcast_to(total_weight_kg, shape),
+        "volumetric_weight_kg": np.broadcast_to(volumetric_weight_kg, shape),
+        "chargeable_weight_kg": np.broadcast_to(chargeable_weight_kg, shape),
+        "cartons": np.broadcast_to(cartons, shape),
+        "product_total": np.broadcast_to(total_product_cost, shape),
+        "fx_spread": np.broadcast_to(fx_cost, shape),
+        "shipping": total_shipping,
+        "dutiable_value": dutiable_value,
+        "customs_base_duty": base_duty,
+        "customs_section_301": np.broadcast_to(section_301_duty, shape),
+        "customs_total": total_duties,
+        "customs_brokerage": np.broadcast_to(customs_brokerage, shape),
+        "domestic_delivery": np.broadcast_to(domestic_delivery, shape),
+        "payment_fee": np.broadcast_to(payment_cost, shape),
+        "insurance": np.broadcast_to(insurance_cost, shape),
+        "defect_buffer": np.broadcast_to(defect_cost, shape),
+        "total_landed_cost": total_landed,
+        "per_unit_landed": per_unit_landed,
+        "per_unit_landed_defect_adjusted": per_unit_landed_adjusted,
+        "sellable_units": np.broadcast_to(sellable_units, shape),
+        "multiplier_from_listing_price": multiplier,
+        "multiplier_defect_adjusted": multiplier_adjusted,
+        "de_minimis_applies": np.broadcast_to(de_minimis, shape),
+        "over_weight_limit": over_weight_limit,
+        "rate_table_version": (rate_table_version if np.ndim(rate_table_version) == 0
+                               else np.broadcast_to(rate_table_version, shape)),
+    }
 
 
 def print_report(result: dict):
@@ -240,6 +580,11 @@ def print_report(result: dict):
     print(f"  Quantity:             {inp['quantity']} units")
     print(f"  Weight/Unit:          {inp['weight_per_unit_kg']:.2f} kg ({inp['total_weight_kg']:.1f} kg total)")
     print(f"  Shipping Method:      {inp['shipping_method']['name']}")
+    shipping = inp["shipping_method"]
+    if "chargeable_weight_kg" in shipping:
+        cartons = f", {shipping['cartons']} cartons" if shipping["cartons"] else ""
+        print(f"  Chargeable Weight:    {shipping['chargeable_weight_kg']:.1f} kg "
+              f"(volumetric {shipping['volumetric_weight_kg']:.1f} kg{cartons})")
     if inp["duty_rate"] > 0:
         print(f"  Duty Rate:            {inp['duty_rate']}%")
     if inp["section_301_rate"] > 0:
@@ -271,10 +616,12 @@ def print_report(result: dict):
     if summary["de_minimis_applies"]:
         print(f"\n  Note: Order value under $800 — de minimis may apply (no duties on individual parcels)")
 
+    print(f"\n  Rate Tables: {result['rate_table_version']}")
     print("=" * 60 + "\n")
 
 
 def main():
+    started = time.perf_counter()
     parser = argparse.ArgumentParser(
         description="Calculate true landed cost for China-sourced products",
         formatter_class=argparse.RawDescriptionHelpFormatter,
@@ -291,6 +638,10 @@ Examples:
     %(prog)s --product-cost 2.50 --quantity 10 --weight-kg 0.1 \\
         --shipping-method aliexpress_standard --duty-rate 0
 
+  Bulky item billed on volumetric weight, packed 24 to a carton:
+    %(prog)s --product-cost 6.00 --quantity 200 --weight-kg 0.3 \\
+        --dims 40x30x12 --carton-dims 80x60x72 --carton-weight-kg 1.5
+
   With actual shipping quote:
     %(prog)s --product-cost 4.20 --quantity 200 --weight-kg 0.5 \\
         --shipping-override 580.00
@@ -298,6 +649,16 @@ Examples:
   JSON output:
     %(prog)s --product-cost 4.20 --quantity 200 --weight-kg 0.5 --json
 
+  Under the shipping rates in effect on an earlier order date:
+    %(prog)s --product-cost 4.20 --quantity 200 --weight-kg 0.5 --as-of 2025-03-14
+
+  Bulk file of orders (CSV/JSONL columns named like calculate_landed_cost args),
+  split across 8 worker processes:
+    %(prog)s --input orders.csv --output costed.csv --workers 8
+
+  Reuse results from earlier runs (unchanged orders aren't recalculated):
+    %(prog)s --input orders.csv --output costed.csv --cache ~/.cache/ebay-arbitrage.sqlite
+
 Shipping methods:
   aliexpress_standard  AliExpress Standard / ePacket (1-10 units)
   air_parcel           Air Parcel small batch (10-50 units)
@@ -308,9 +669,15 @@ Shipping methods:
         """,
     )
 
-    parser.add_argument("--product-cost", type=float, required=True, help="Per-unit cost from supplier")
-    parser.add_argument("--quantity", type=int, required=True, help="Number of units ordered")
-    parser.add_argument("--weight-kg", type=float, required=True, help="Weight per unit in kilograms")
+    parser.add_argument("--product-cost", type=float, help="Per-unit cost from supplier (required)")
+    parser.add_argument("--quantity", type=int, help="Number of units ordered (required)")
+    parser.add_argument("--weight-kg", type=float, help="Weight per unit in kilograms (required)")
+    parser.add_argument("--dims", type=str, default=None,
+                       help="Packaged unit dimensions LxWxH in cm, for volumetric weight (e.g. 40x30x12)")
+    parser.add_argument("--carton-dims", type=str, default=None,
+                       help="Shipping carton dimensions LxWxH in cm; bills freight on whole cartons")
+    parser.add_argument("--carton-weight-kg", type=float, default=0.0,
+                       help="Tare weight of one empty carton (default: 0)")
     parser.add_argument("--shipping-method", type=str, default="air_freight",
                        choices=list(SHIPPING_RATES.keys()),
                        help="Shipping method (default: air_freight)")
@@ -326,28 +693,105 @@ Shipping methods:
                        help=f"Expected defect rate (%%, default: {DEFAULT_DEFECT_RATE})")
     parser.add_argument("--customs-brokerage", type=float, default=DEFAULT_CUSTOMS_BROKERAGE,
                        help=f"Customs brokerage fee (flat, default: ${DEFAULT_CUSTOMS_BROKERAGE})")
+    parser.add_argument("--as-of", type=str, default=None,
+                       help="Use the shipping rates in effect on this date (YYYY-MM-DD, default: today)")
     parser.add_argument("--json", action="store_true", help="Output as JSON")
+    parser.add_argument("--input", type=str, default=None,
+                       help="CSV/JSONL file of orders to cost in bulk ('-' for stdin)")
+    parser.add_argument("--output", type=str, default="-", help="Output file for --input mode (default: stdout)")
+    parser.add_argument("--workers", type=int, default=1,
+                       help="Worker processes for --input mode (default: 1)")
+    parser.add_argument("--chunk-size", type=int, default=None,
+                       help="Rows per worker chunk in --input mode (default: 5000)")
+    parser.add_argument("--profile", nargs="?", const="json", choices=profiling.FORMATS, default=None,
+                       help="Report per-phase timings to stderr as json (default) or prometheus text")
+    parser.add_argument("--profile-output", type=str, default=None, help="Write the --profile report to this file")
+    parser.add_argument("--cache", type=str, default=None,
+                       help="Reuse results stored in this SQLite file (default: $EBAY_ARBITRAGE_CACHE, if set)")
 
     args = parser.parse_args()
-
-    result = calculate_landed_cost(
-        product_cost=args.product_cost,
-        quantity=args.quantity,
-        weight_per_unit_kg=args.weight_kg,
-        shipping_method=args.shipping_method,
-        duty_rate=args.duty_rate,
-        section_301_rate=args.section_301,
-        fx_spread=args.fx_spread,
-        payment_fee=args.payment_fee,
-        defect_rate=args.defect_rate,
-        customs_brokerage=args.customs_brokerage,
-        shipping_cost_override=args.shipping_override,
-    )
-
+    cache = None
+    try:
+        profiler = profiling.for_cli("landed_cost", args.profile, args.profile_output, started)
+        if args.cache or os.environ.get("EBAY_ARBITRAGE_CACHE"):  # result_cache.CACHE_ENV
+            import result_cache
+            cache = result_cache.for_cli(args.cache)
+    except ValueError as e:
+        parser.error(str(e))
+
+    if args.input is not None:
+        import batch_io
+
+        process_row = landed_cost_row
+        if cache is not None:
+            process_row = partial(result_cache.cached_row, landed_cost_row, "landed_cost_row",
+                                  LANDED_COST_FIELDS, cache.path)
+        with profiler.phase("run_rows"):
+            count = batch_io.run_rows(
+                process_row if args.workers > 1 else profiler.wrap("calculate_row", process_row),
+                LANDED_COST_OUTPUT_FIELDS,
+                input_path=args.input,
+                output_path=args.output,
+                output_format="jsonl" if args.json else None,
+                workers=args.workers,
+                chunk_size=batch_io.DEFAULT_CHUNK_SIZE if args.chunk_size is None else args.chunk_size,
+            )
+        print(f"Costed {count} orders", file=sys.stderr)
+        profiler.report()
+        return
+
+    if args.product_cost is None or args.quantity is None or args.weight_kg is None:
+        parser.error("the following arguments are required: --product-cost, --quantity, --weight-kg")
+
+    try:
+        dims = packing.parse_dims(args.dims) if args.dims else (None, None, None)
+        carton_dims = packing.parse_dims(args.carton_dims) if args.carton_dims else (None, None, None)
+        kwargs = dict(
+            product_cost=args.product_cost,
+            quantity=args.quantity,
+            weight_per_unit_kg=args.weight_kg,
+            shipping_method=args.shipping_method,
+            duty_rate=args.duty_rate,
+            section_301_rate=args.section_301,
+            fx_spread=args.fx_spread,
+            payment_fee=args.payment_fee,
+            defect_rate=args.defect_rate,
+            customs_brokerage=args.customs_brokerage,
+            shipping_cost_override=args.shipping_override,
+            as_of=args.as_of,
+            length_cm=dims[0],
+            width_cm=dims[1],
+            height_cm=dims[2],
+            carton_length_cm=carton_dims[0],
+            carton_width_cm=carton_dims[1],
+            carton_height_cm=carton_dims[2],
+            carton_weight_kg=args.carton_weight_kg,
+        )
+        result = None
+        if cache is not None:
+            with profiler.phase("cache_lookup"):
+                key = cache.key("landed_cost", kwargs, args.as_of)
+                result = cache.get(key)
+        if result is None:
+            with profiler.phase("calculate"):
+                record = calculate_landed_cost_record(**kwargs)
+    except ValueError as e:
+        parser.error(str(e))
+
+    if result is None:
+        with profiler.phase("build_dict"):
+            result = record.to_dict()
+        if cache is not None:
+            cache.put(key, result)
     if args.json:
-        print(json.dumps(result, indent=2))
+        with profiler.phase("json_dumps"):
+            text = json.dumps(result, indent=2)
+        with profiler.phase("write"):
+            print(text)
     else:
-        print_report(result)
+        with profiler.phase("print_report"):
+            print_report(result)
+    profiler.report()
 
 
 if __name__ == "__main__":
@@ -17,42 +17,168 @@ The script prints a detailed breakdown and a summary with net profit, net margin
 
 import argparse
 import json
+import os
 import sys
+import time
+from functools import partial
+
+import profiling
+import rate_tables
+
+# NumPy, batch_io and result_cache are imported only where the batch API, --input and
+# --cache need them, so a single-sale run starts without them
+
+
+# Fee schedule in effect today, loaded from rates/ebay_fees.json (see rate_tables.py).
+# FVF rates are percentages of the total sale amount. These names are a snapshot taken
+# at import; the calculators read rate_tables.active() on every call, so a resident
+# process picks up a new fee version without restarting.
+FVF_RATES = rate_tables.active().fees.fvf_rates
+PER_ORDER_FEE = rate_tables.active().fees.per_order_fee  # Fixed per-transaction fee
+INTERNATIONAL_FEE_RATE = rate_tables.active().fees.international_fee_rate  # Percentage for international sales
+
+# Row fields accepted in --input mode, with the type to coerce text values to
+MARGIN_FIELDS = {
+    "sale_price": float,
+    "cogs": float,
+    "shipping_cost": float,
+    "category": str,
+    "fvf_override": float,
+    "promoted_rate": float,
+    "return_rate": float,
+    "international": "bool",
+    "packaging_cost": float,
+    "return_shipping_cost": float,
+    "as_of": str,
+}
 
+# Result columns appended to each row in --input mode
+MARGIN_OUTPUT_FIELDS = [
+    "fvf_rate", "total_ebay_fees", "ebay_fee_percentage", "total_cogs", "returns_drag_per_unit",
+    "net_revenue_after_fees", "total_costs", "net_profit", "net_margin_pct", "roi_pct",
+    "breakeven_price", "assessment", "rate_table_version",
+]
 
-# Default FVF rates by category (percentage of total sale amount)
-# These are approximate — always verify current rates on eBay
-FVF_RATES = {
-    "default": 13.25,
-    "books": 14.95,
-    "dvds": 14.95,
-    "movies": 14.95,
-    "music": 14.95,
-    "business_industrial": 12.35,
-    "clothing": 12.35,
-    "shoes": 12.35,
-    "accessories": 12.35,
-    "collectibles": 13.25,
-    "computers": 12.35,
-    "tablets": 12.35,
-    "electronics": 12.35,
-    "cell_phones": 12.35,
-    "health_beauty": 13.25,
-    "home_garden": 13.25,
-    "jewelry": 13.25,
-    "watches": 13.25,
-    "musical_instruments": 12.35,
-    "auto_parts": 12.35,
-    "sporting_goods": 12.35,
-    "toys": 13.25,
-    "video_games": 13.25,
-}
+# Deal assessments, indexed by assessment code (0 = worst, 4 = best)
+ASSESSMENTS = (
+    "Not viable. The numbers don't work after real costs. Pass on this deal.",
+    "Weak. Margins are too thin — returns, shipping variance, or fee changes could wipe profit. Consider passing.",
+    "Marginal. Thin margins leave little room for error. Proceed only with tight cost control.",
+    "Good opportunity. Solid margins. Standard arbitrage territory.",
+    "Strong opportunity. Healthy margins with good ROI. Proceed with confidence.",
+)
 
-PER_ORDER_FEE = 0.30  # Fixed per-transaction fee
-INTERNATIONAL_FEE_RATE = 1.65  # Percentage for international sales
 
+class MarginResult:
+    """
+    Compact margin result.
 
-def calculate_margin(
+    Holds the raw (unrounded) fee and cost components in slots; totals, ratios,
+    breakeven and the assessment are only computed when asked for. to_dict() returns
+    exactly what calculate_margin() does. fees is the rate_tables.FeeTable used.
+    """
+
+    __slots__ = (
+        "sale_price", "cogs", "shipping_cost", "packaging_cost", "category", "fvf_rate",
+        "promoted_rate", "return_rate", "international", "fvf_amount", "promoted_amount",
+        "international_amount", "total_cogs", "returns_drag_per_unit", "fees",
+    )
+
+    def __init__(self, **fields):
+        for name in self.__slots__:
+            setattr(self, name, fields[name])
+
+    @property
+    def total_ebay_fees(self) -> float:
+        return self.fvf_amount + self.fees.per_order_fee + self.promoted_amount + self.international_amount
+
+    @property
+    def ebay_fee_percentage(self) -> float:
+        return (self.total_ebay_fees / self.sale_price) * 100
+
+    @property
+    def net_revenue(self) -> float:
+        return self.sale_price - self.total_ebay_fees
+
+    @property
+    def net_profit(self) -> float:
+        return self.net_revenue - self.total_cogs - self.returns_drag_per_unit
+
+    @property
+    def net_margin(self) -> float:
+        return (self.net_profit / self.sale_price) * 100 if self.sale_price > 0 else 0
+
+    @property
+    def roi(self) -> float:
+        return (self.net_profit / self.total_cogs) * 100 if self.total_cogs > 0 else 0
+
+    @property
+    def breakeven_price(self) -> float:
+        # What's the minimum sale price to break even?
+        # sale_price - (sale_price * total_fee_rate) - per_order - total_cogs - returns_drag = 0
+        total_fee_rate_decimal = (self.fvf_rate + self.promoted_rate
+                                  + (self.fees.international_fee_rate if self.international else 0)) / 100
+        # Approximate breakeven (ignoring the returns drag dependency on sale price)
+        return (self.total_cogs + self.fees.per_order_fee + self.returns_drag_per_unit) / (1 - total_fee_rate_decimal)
+
+    @property
+    def rate_table_version(self) -> str:
+        return self.fees.stamp
+
+    @property
+    def assessment_code(self) -> int:
+        return get_assessment_code(self.net_margin, self.roi)
+
+    def to_dict(self) -> dict:
+        """Rounded report dict (the calculate_margin() / --json format)."""
+        net_margin = self.net_margin
+        roi = self.roi
+        inputs = {
+            "sale_price": self.sale_price,
+            "cogs_landed": self.cogs,
+            "shipping_to_buyer": self.shipping_cost,
+            "packaging": self.packaging_cost,
+            "category": self.category,
+            "fvf_rate": self.fvf_rate,
+            "promoted_rate": self.promoted_rate,
+            "return_rate": self.return_rate,
+            "international": self.international,
+        }
+        if self.international:
+            # The rate this sale was charged, for the report; domestic output is unchanged
+            inputs["international_fee_rate"] = self.fees.international_fee_rate
+        return {
+            "input": inputs,
+            "fees": {
+                "final_value_fee": round(self.fvf_amount, 2),
+                "per_order_fee": self.fees.per_order_fee,
+                "promoted_listings_fee": round(self.promoted_amount, 2),
+                "international_fee": round(self.international_amount, 2),
+                "total_ebay_fees": round(self.total_ebay_fees, 2),
+                "ebay_fee_percentage": round(self.ebay_fee_percentage, 1),
+            },
+            "costs": {
+                "cogs_landed": self.cogs,
+                "shipping_to_buyer": self.shipping_cost,
+                "packaging": self.packaging_cost,
+                "total_cogs": round(self.total_cogs, 2),
+                "returns_drag_per_unit": round(self.returns_drag_per_unit, 2),
+            },
+            "summary": {
+                "gross_revenue": round(self.sale_price, 2),
+                "net_revenue_after_fees": round(self.net_revenue, 2),
+                "total_costs": round(self.total_cogs + self.returns_drag_per_unit, 2),
+                "net_profit": round(self.net_profit, 2),
+                "net_margin_pct": round(net_margin, 1),
+                "roi_pct": round(roi, 1),
+                "breakeven_price": round(self.breakeven_price, 2),
+            },
+            "assessment": get_assessment(net_margin, roi),
+            "rate_table_version": self.fees.stamp,
+        }
+
+
+def calculate_margin_record(
     sale_price: float,
     cogs: float,
     shipping_cost: float = 0.0,
@@ -63,140 +189,275 @@ def calculate_margin(
     international: bool = False,
     packaging_cost: float = 1.00,
     return_shipping_cost: float = None,
-) -> dict:
+    as_of=None,
+) -> MarginResult:
     """
-    Calculate full eBay margin with all fees.
-
-    Args:
-        sale_price: The price the item sells for on eBay
-        cogs: Cost of goods sold (landed cost — use landed_cost.py to calculate this)
-        shipping_cost: Cost to ship to the buyer (if offering free shipping, this is your cost)
-        category: eBay category for FVF rate lookup
-        fvf_override: Override the FVF rate directly (percentage)
-        promoted_rate: Promoted Listings ad rate (percentage, 0 if not using)
-        return_rate: Expected return rate (percentage of units, default 8%)
-        international: Whether this is an international sale (adds 1.65% fee)
-        packaging_cost: Cost of packaging materials per unit (default $1.00)
-        return_shipping_cost: Cost of return shipping per returned unit (default: same as shipping_cost)
+    Calculate full eBay margin as a MarginResult.
 
-    Returns:
-        dict with full breakdown and summary
+    Same arguments and arithmetic as calculate_margin(), without building the nested
+    report dict or assessment string — use this in bulk loops and call to_dict() only
+    if needed.
     """
+    fees = rate_tables.active().fees_on(as_of)
+
     # Determine FVF rate
     if fvf_override is not None:
         fvf_rate = fvf_override
     else:
-        fvf_rate = FVF_RATES.get(category.lower().replace(" ", "_"), FVF_RATES["default"])
+        fvf_rate = fees.categories.rate(category)
 
     # Default return shipping to outbound shipping cost
     if return_shipping_cost is None:
         return_shipping_cost = shipping_cost
 
     # --- Revenue Side ---
-    gross_revenue = sale_price
-
     # eBay Final Value Fee (on total sale amount including any shipping buyer pays)
     fvf_amount = sale_price * (fvf_rate / 100)
 
-    # Per-order fee
-    per_order = PER_ORDER_FEE
-
     # Promoted Listings fee (on sale price, only if using)
     promoted_amount = sale_price * (promoted_rate / 100) if promoted_rate > 0 else 0.0
 
     # International fee
-    international_amount = sale_price * (INTERNATIONAL_FEE_RATE / 100) if international else 0.0
-
-    total_ebay_fees = fvf_amount + per_order + promoted_amount + international_amount
-    ebay_fee_percentage = (total_ebay_fees / sale_price) * 100
-
-    net_revenue = gross_revenue - total_ebay_fees
+    international_amount = sale_price * (fees.international_fee_rate / 100) if international else 0.0
 
     # --- Cost Side ---
     total_cogs = cogs + shipping_cost + packaging_cost
 
     # --- Returns Drag ---
-    # For each returned unit: you lose the sale revenue, pay return shipping,
-    # and the item may not be resellable. Model as: return_rate% of units incur
-    # (return_shipping_cost + 25% chance item is unsellable)
+    # For each returned unit: you pay return shipping and the item may not be
+    # resellable (25% chance of total loss). eBay credits FVF on returns, so the
+    # lost sale itself nets out. Spread across all units by the return rate.
     return_fraction = return_rate / 100
-    # Cost per return: return shipping + 25% chance of total loss
-    cost_per_return = return_shipping_cost + (0.25 * cogs)
-    # Average returns cost spread across all units
-    returns_drag_per_unit = return_fraction * (cost_per_return + sale_price * (fvf_rate / 100))
-    # More accurate: the return refund means you lose the sale but get FVF credit
-    # eBay credits FVF on returns (for free returns). Simplify to:
     returns_drag_per_unit = return_fraction * (return_shipping_cost + (0.25 * cogs))
 
-    # --- Net Profit ---
-    net_profit = net_revenue - total_cogs - returns_drag_per_unit
+    return MarginResult(
+        sale_price=sale_price,
+        cogs=cogs,
+        shipping_cost=shipping_cost,
+        packaging_cost=packaging_cost,
+        category=category,
+        fvf_rate=fvf_rate,
+        promoted_rate=promoted_rate,
+        return_rate=return_rate,
+        international=international,
+        fvf_amount=fvf_amount,
+        promoted_amount=promoted_amount,
+        international_amount=international_amount,
+        total_cogs=total_cogs,
+        returns_drag_per_unit=returns_drag_per_unit,
+        fees=fees,
+    )
 
-    # --- Ratios ---
-    net_margin = (net_profit / sale_price) * 100 if sale_price > 0 else 0
-    roi = (net_profit / total_cogs) * 100 if total_cogs > 0 else 0
-
-    # --- Breakeven ---
-    # What's the minimum sale price to break even?
-    # net_revenue - total_cogs - returns_drag = 0
-    # sale_price - (sale_price * total_fee_rate) - per_order - total_cogs - returns_drag = 0
-    total_fee_rate_decimal = (fvf_rate + promoted_rate + (INTERNATIONAL_FEE_RATE if international else 0)) / 100
-    # Approximate breakeven (ignoring the returns drag dependency on sale price)
-    breakeven_price = (total_cogs + per_order + returns_drag_per_unit) / (1 - total_fee_rate_decimal)
-
-    result = {
-        "input": {
-            "sale_price": sale_price,
-            "cogs_landed": cogs,
-            "shipping_to_buyer": shipping_cost,
-            "packaging": packaging_cost,
-            "category": category,
-            "fvf_rate": fvf_rate,
-            "promoted_rate": promoted_rate,
-            "return_rate": return_rate,
-            "international": international,
-        },
-        "fees": {
-            "final_value_fee": round(fvf_amount, 2),
-            "per_order_fee": per_order,
-            "promoted_listings_fee": round(promoted_amount, 2),
-            "international_fee": round(international_amount, 2),
-            "total_ebay_fees": round(total_ebay_fees, 2),
-            "ebay_fee_percentage": round(ebay_fee_percentage, 1),
-        },
-        "costs": {
-            "cogs_landed": cogs,
-            "shipping_to_buyer": shipping_cost,
-            "packaging": packaging_cost,
-            "total_cogs": round(total_cogs, 2),
-            "returns_drag_per_unit": round(returns_drag_per_unit, 2),
-        },
-        "summary": {
-            "gross_revenue": round(gross_revenue, 2),
-            "net_revenue_after_fees": round(net_revenue, 2),
-            "total_costs": round(total_cogs + returns_drag_per_unit, 2),
-            "net_profit": round(net_profit, 2),
-            "net_margin_pct": round(net_margin, 1),
-            "roi_pct": round(roi, 1),
-            "breakeven_price": round(breakeven_price, 2),
-        },
-        "assessment": get_assessment(net_margin, roi),
-    }
 
-    return result
+def calculate_margin(
+    sale_price: float,
+    cogs: float,
+    shipping_cost: float = 0.0,
+    category: str = "default",
+    fvf_override: float = None,
+    promoted_rate: float = 0.0,
+    return_rate: float = 8.0,
+    international: bool = False,
+    packaging_cost: float = 1.00,
+    return_shipping_cost: float = None,
+    as_of=None,
+) -> dict:
+    """
+    Calculate full eBay margin with all fees.
 
+    Args:
+        sale_price: The price the item sells for on eBay
+        cogs: Cost of goods sold (landed cost — use landed_cost.py to calculate this)
+        shipping_cost: Cost to ship to the buyer (if offering free shipping, this is your cost)
+        category: eBay category for FVF rate lookup
+        fvf_override: Override the FVF rate directly (percentage)
+        promoted_rate: Promoted Listings ad rate (percentage, 0 if not using)
+        return_rate: Expected return rate (percentage of units, default 8%)
+        international: Whether this is an international sale (adds 1.65% fee)
+        packaging_cost: Cost of packaging materials per unit (default $1.00)
+        return_shipping_cost: Cost of return shipping per returned unit (default: same as shipping_cost)
+        as_of: Sale date (date or "YYYY-MM-DD"); use the eBay fees in effect then
+            instead of today's
 
-def get_assessment(net_margin: float, roi: float) -> str:
-    """Return a plain-English assessment of the deal quality."""
+    Returns:
+        dict with full breakdown and summary
+    """
+    return calculate_margin_record(
+        sale_price, cogs, shipping_cost, category, fvf_override, promoted_rate, return_rate,
+        international, packaging_cost, return_shipping_cost, as_of,
+    ).to_dict()
+
+
+def get_assessment_code(net_margin: float, roi: float) -> int:
+    """Return the ASSESSMENTS index for a deal's net margin and ROI."""
     if net_margin >= 25 and roi >= 80:
-        return "Strong opportunity. Healthy margins with good ROI. Proceed with confidence."
+        return 4
     elif net_margin >= 15 and roi >= 50:
-        return "Good opportunity. Solid margins. Standard arbitrage territory."
+        return 3
     elif net_margin >= 10 and roi >= 30:
-        return "Marginal. Thin margins leave little room for error. Proceed only with tight cost control."
+        return 2
     elif net_margin >= 5:
-        return "Weak. Margins are too thin — returns, shipping variance, or fee changes could wipe profit. Consider passing."
+        return 1
     else:
-        return "Not viable. The numbers don't work after real costs. Pass on this deal."
+        return 0
+
+
+def get_assessment_codes(net_margin, roi):
+    """Vectorized get_assessment_code() over NumPy arrays; returns an int8 array."""
+    # Same thresholds as get_assessment_code(). Each tier's condition implies every
+    # tier below it, so the code is just the number of tiers met.
+    import numpy as np
+
+    code = (net_margin >= 5).astype(np.int8)
+    code += (net_margin >= 10) & (roi >= 30)
+    code += (net_margin >= 15) & (roi >= 50)
+    code += (net_margin >= 25) & (roi >= 80)
+    return code
+
+
+def get_assessment(net_margin: float, roi: float) -> str:
+    """Return a plain-English assessment of the deal quality."""
+    return ASSESSMENTS[get_assessment_code(net_margin, roi)]
+
+
+def margin_row(row: dict) -> dict:
+    """Calculate margin for one --input row and return its MARGIN_OUTPUT_FIELDS."""
+    import batch_io
+
+    r = calculate_margin_record(**batch_io.calculator_kwargs(row, MARGIN_FIELDS))
+    net_margin = r.net_margin
+    roi = r.roi
+    return {
+        "fvf_rate": r.fvf_rate,
+        "total_ebay_fees": round(r.total_ebay_fees, 2),
+        "ebay_fee_percentage": round(r.ebay_fee_percentage, 1),
+        "total_cogs": round(r.total_cogs, 2),
+        "returns_drag_per_unit": round(r.returns_drag_per_unit, 2),
+        "net_revenue_after_fees": round(r.net_revenue, 2),
+        "total_costs": round(r.total_cogs + r.returns_drag_per_unit, 2),
+        "net_profit": round(r.net_profit, 2),
+        "net_margin_pct": round(net_margin, 1),
+        "roi_pct": round(roi, 1),
+        "breakeven_price": round(r.breakeven_price, 2),
+        "assessment": get_assessment(net_margin, roi),
+        "rate_table_version": r.rate_table_version,
+    }
+
+
+def calculate_margin_batch(
+    sale_price,
+    cogs,
+    shipping_cost=0.0,
+    category="default",
+    fvf_override=None,
+    promoted_rate=0.0,
+    return_rate=8.0,
+    international=False,
+    packaging_cost=1.00,
+    return_shipping_cost=None,
+    as_of=None,
+) -> dict:
+    """
+    Calculate eBay margins for many sales at once over NumPy arrays.
+
+    Every argument accepts either a scalar or a 1-D array; scalars are broadcast
+    across the batch. Each distinct category is resolved through the fee table's
+    CategoryIndex once, not once per row. Arithmetic follows calculate_margin() step
+    for step, so round(column[i], 2) equals the matching field of the scalar result.
+
+    Args:
+        category: An eBay category (FVF_RATES key or alias, see rate_tables) or an array of them
+        fvf_override: FVF rate per row; NaN (or None) means use the category rate
+        return_shipping_cost: Return shipping per row; NaN (or None) means use shipping_cost
+        as_of: Sale date per row (dates, ISO strings or datetime64; None/NaT means
+            today). Each row is scored under the fees in effect on its date.
+        (all other arguments as in calculate_margin)
+
+    Returns:
+        dict of unrounded column arrays keyed like the scalar fees, costs and summary
+        fields, plus fvf_rate, an integer "assessment" column indexing ASSESSMENTS and
+        rate_table_version (one string, or a per-row array when as_of is an array).
+    """
+    try:
+        import numpy as np
+    except ImportError:
+        raise ImportError("calculate_margin_batch requires NumPy (pip install numpy)") from None
+
+    sale_price = np.asarray(sale_price, dtype=float)
+    cogs = np.asarray(cogs, dtype=float)
+    shipping_cost = np.asarray(shipping_cost, dtype=float)
+    promoted_rate = np.asarray(promoted_rate, dtype=float)
+    return_rate = np.asarray(return_rate, dtype=float)
+    international = np.asarray(international, dtype=bool)
+    packaging_cost = np.asarray(packaging_cost, dtype=float)
+
+    shape = np.broadcast_shapes(
+        sale_price.shape, cogs.shape, shipping_cost.shape, np.shape(category), np.shape(fvf_override),
+        promoted_rate.shape, return_rate.shape, international.shape, packaging_cost.shape,
+        np.shape(return_shipping_cost), np.shape(as_of),
+    )
+
+    # Determine FVF rate: one lookup per distinct category (and fee version)
+    fvf_rate, per_order, international_fee_rate, rate_table_version = rate_tables.active().fee_columns(category, as_of)
+    fvf_rate = np.broadcast_to(fvf_rate, shape)
+    if fvf_override is not None:
+        fvf_override = np.broadcast_to(np.asarray(fvf_override, dtype=float), shape)
+        fvf_rate = np.where(np.isnan(fvf_override), fvf_rate, fvf_override)
+
+    if return_shipping_cost is None:
+        return_shipping_cost = shipping_cost
+    else:
+        return_shipping_cost = np.asarray(return_shipping_cost, dtype=float)
+        return_shipping_cost = np.where(np.isnan(return_shipping_cost), shipping_cost, return_shipping_cost)
+
+    # --- Revenue Side ---
+    fvf_amount = sale_price * (fvf_rate / 100)
+    promoted_amount = np.where(promoted_rate > 0, sale_price * (promoted_rate / 100), 0.0)
+    international_amount = np.where(international, sale_price * (international_fee_rate / 100), 0.0)
+
+    total_ebay_fees = fvf_amount + per_order + promoted_amount + international_amount
+    with np.errstate(divide="ignore", invalid="ignore"):
+        ebay_fee_percentage = (total_ebay_fees / sale_price) * 100
+
+    net_revenue = sale_price - total_ebay_fees
+
+    # --- Cost Side / Returns Drag ---
+    total_cogs = cogs + shipping_cost + packaging_cost
+    return_fraction = return_rate / 100
+    returns_drag_per_unit = return_fraction * (return_shipping_cost + (0.25 * cogs))
+
+    # --- Net Profit / Ratios ---
+    net_profit = net_revenue - total_cogs - returns_drag_per_unit
+    with np.errstate(divide="ignore", invalid="ignore"):
+        net_margin = np.where(sale_price > 0, (net_profit / sale_price) * 100, 0.0)
+        roi = np.where(total_cogs > 0, (net_profit / total_cogs) * 100, 0.0)
+
+    # --- Breakeven --- (same approximation as calculate_margin)
+    total_fee_rate_decimal = (fvf_rate + promoted_rate + np.where(international, international_fee_rate, 0)) / 100
+    with np.errstate(divide="ignore", invalid="ignore"):
+        breakeven_price = (total_cogs + per_order + returns_drag_per_unit) / (1 - total_fee_rate_decimal)
+
+    assessment = get_assessment_codes(net_margin, roi)
+
+    return {
+        "fvf_rate": fvf_rate,
+        "final_value_fee": np.broadcast_to(fvf_amount, shape),
+        "promoted_listings_fee": np.broadcast_to(promoted_amount, shape),
+        "international_fee": np.broadcast_to(international_amount, shape),
+        "total_ebay_fees": np.broadcast_to(total_ebay_fees, shape),
+        "ebay_fee_percentage": np.broadcast_to(ebay_fee_percentage, shape),
+        "net_revenue_after_fees": np.broadcast_to(net_revenue, shape),
+        "total_cogs": np.broadcast_to(total_cogs, shape),
+        "returns_drag_per_unit": np.broadcast_to(returns_drag_per_unit, shape),
+        "total_costs": np.broadcast_to(total_cogs + returns_drag_per_unit, shape),
+        "net_profit": np.broadcast_to(net_profit, shape),
+        "net_margin_pct": np.broadcast_to(net_margin, shape),
+        "roi_pct": np.broadcast_to(roi, shape),
+        "breakeven_price": np.broadcast_to(breakeven_price, shape),
+        "assessment": np.broadcast_to(assessment, shape),
+        "rate_table_version": (rate_table_version if np.ndim(rate_table_version) == 0
+                               else np.broadcast_to(rate_table_version, shape)),
+    }
 
 
 def print_report(result: dict):
@@ -215,7 +476,7 @@ def print_report(result: dict):
     if inp["promoted_rate"] > 0:
         print(f"  Promoted Listings:    {inp['promoted_rate']}%")
     if inp["international"]:
-        print(f"  International:        Yes (+{INTERNATIONAL_FEE_RATE}%)")
+        print(f"  International:        Yes (+{inp['international_fee_rate']}%)")
     print(f"  Expected Return Rate: {inp['return_rate']}%")
 
     print(f"\n--- eBay Fees ---")
@@ -243,10 +504,12 @@ def print_report(result: dict):
     print(f"  Breakeven Price:      ${summary['breakeven_price']:.2f}")
 
     print(f"\n  Assessment: {result['assessment']}")
+    print(f"  Rate Tables: {result['rate_table_version']}")
     print("=" * 60 + "\n")
 
 
 def main():
+    started = time.perf_counter()
     parser = argparse.ArgumentParser(
         description="Calculate eBay arbitrage margins with full fee stack",
         formatter_class=argparse.RawDescriptionHelpFormatter,
@@ -265,11 +528,21 @@ Examples:
 
   JSON output for programmatic use:
     %(prog)s --sale-price 29.99 --cogs 8.50 --shipping-cost 4.50 --json
+
+  Under the fees in effect on an earlier sale date:
+    %(prog)s --sale-price 29.99 --cogs 8.50 --shipping-cost 4.50 --as-of 2025-03-14
+
+  Bulk file of sales (CSV/JSONL columns named like calculate_margin args),
+  split across 8 worker processes:
+    %(prog)s --input comps.csv --output scored.csv --workers 8
+
+  Reuse results from earlier runs (unchanged sales aren't recalculated):
+    %(prog)s --input comps.csv --output scored.csv --cache ~/.cache/ebay-arbitrage.sqlite
         """,
     )
 
-    parser.add_argument("--sale-price", type=float, required=True, help="eBay sale price")
-    parser.add_argument("--cogs", type=float, required=True, help="Landed cost of goods (use landed_cost.py)")
+    parser.add_argument("--sale-price", type=float, help="eBay sale price (required)")
+    parser.add_argument("--cogs", type=float, help="Landed cost of goods (use landed_cost.py) (required)")
     parser.add_argument("--shipping-cost", type=float, default=0.0, help="Shipping cost to buyer (default: 0)")
     parser.add_argument("--category", type=str, default="default", help=f"eBay category. Options: {', '.join(FVF_RATES.keys())}")
     parser.add_argument("--fvf-override", type=float, default=None, help="Override FVF rate directly (percentage)")
@@ -277,26 +550,92 @@ Examples:
     parser.add_argument("--return-rate", type=float, default=8.0, help="Expected return rate (percentage, default: 8)")
     parser.add_argument("--international", action="store_true", help="International sale (adds 1.65%% fee)")
     parser.add_argument("--packaging-cost", type=float, default=1.00, help="Packaging materials cost (default: $1.00)")
+    parser.add_argument("--as-of", type=str, default=None,
+                        help="Use the eBay fees in effect on this date (YYYY-MM-DD, default: today)")
     parser.add_argument("--json", action="store_true", help="Output as JSON instead of formatted report")
+    parser.add_argument("--input", type=str, default=None,
+                        help="CSV/JSONL file of sales to score in bulk ('-' for stdin)")
+    parser.add_argument("--output", type=str, default="-", help="Output file for --input mode (default: stdout)")
+    parser.add_argument("--workers", type=int, default=1, help="Worker processes for --input mode (default: 1)")
+    parser.add_argument("--chunk-size", type=int, default=None,
+                        help="Rows per worker chunk in --input mode (default: 5000)")
+    parser.add_argument("--profile", nargs="?", const="json", choices=profiling.FORMATS, default=None,
+                        help="Report per-phase timings to stderr as json (default) or prometheus text")
+    parser.add_argument("--profile-output", type=str, default=None, help="Write the --profile report to this file")
+    parser.add_argument("--cache", type=str, default=None,
+                        help="Reuse results stored in this SQLite file (default: $EBAY_ARBITRAGE_CACHE, if set)")
 
     args = parser.parse_args()
-
-    result = calculate_margin(
-        sale_price=args.sale_price,
-        cogs=args.cogs,
-        shipping_cost=args.shipping_cost,
-        category=args.category,
-        fvf_override=args.fvf_override,
-        promoted_rate=args.promoted_rate,
-        return_rate=args.return_rate,
-        international=args.international,
-        packaging_cost=args.packaging_cost,
-    )
-
+    cache = None
+    try:
+        profiler = profiling.for_cli("margin_calculator", args.profile, args.profile_output, started)
+        if args.cache or os.environ.get("EBAY_ARBITRAGE_CACHE"):  # result_cache.CACHE_ENV
+            import result_cache
+            cache = result_cache.for_cli(args.cache)
+    except ValueError as e:
+        parser.error(str(e))
+
+    if args.input is not None:
+        import batch_io
+
+        process_row = margin_row
+        if cache is not None:
+            process_row = partial(result_cache.cached_row, margin_row, "margin_row", MARGIN_FIELDS, cache.path)
+        with profiler.phase("run_rows"):
+            count = batch_io.run_rows(
+                process_row if args.workers > 1 else profiler.wrap("calculate_row", process_row),
+                MARGIN_OUTPUT_FIELDS,
+                input_path=args.input,
+                output_path=args.output,
+                output_format="jsonl" if args.json else None,
+                workers=args.workers,
+                chunk_size=batch_io.DEFAULT_CHUNK_SIZE if args.chunk_size is None else args.chunk_size,
+            )
+        print(f"Scored {count} sales", file=sys.stderr)
+        profiler.report()
+        return
+
+    if args.sale_price is None or args.cogs is None:
+        parser.error("the following arguments are required: --sale-price, --cogs")
+
+    try:
+        kwargs = dict(
+            sale_price=args.sale_price,
+            cogs=args.cogs,
+            shipping_cost=args.shipping_cost,
+            category=args.category,
+            fvf_override=args.fvf_override,
+            promoted_rate=args.promoted_rate,
+            return_rate=args.return_rate,
+            international=args.international,
+            packaging_cost=args.packaging_cost,
+            as_of=args.as_of,
+        )
+        result = None
+        if cache is not None:
+            with profiler.phase("cache_lookup"):
+                key = cache.key("margin", kwargs, args.as_of)
+                result = cache.get(key)
+        if result is None:
+            with profiler.phase("calculate"):
+                record = calculate_margin_record(**kwargs)
+    except ValueError as e:
+        parser.error(str(e))
+
+    if result is None:
+        with profiler.phase("build_dict"):
+            result = record.to_dict()
+        if cache is not None:
+            cache.put(key, result)
     if args.json:
-        print(json.dumps(result, indent=2))
+        with profiler.phase("json_dumps"):
+            text = json.dumps(result, indent=2)
+        with profiler.phase("write"):
+            print(text)
     else:
-        print_report(result)
+        with profiler.phase("print_report"):
+            print_report(result)
+    profiler.report()
 
 
 if __name__ == "__main__":
@@ -0,0 +1,628 @@
+#!/usr/bin/env python3
+"""
+Portfolio Capital Allocation Optimizer
+
+Splits a purchasing budget across a list of candidate deals: how many units of each
+to order so the portfolio earns the most expected profit the budget can buy.
+
+Each candidate is costed at a handful of order quantities between its supplier MOQ and
+its demand cap. At every quantity, calculate_landed_cost() gives the cash tied up (the
+total landed cost), and calculate_margin() on the defect-adjusted per-unit landed cost
+gives the expected profit per unit sold, times the units you can actually sell. Larger
+orders spread the fixed freight and brokerage fees, so profit is not proportional to
+quantity; the candidate's options are reduced to their upper concave hull (capital vs.
+profit), which turns the choice into a multiple-choice knapsack over hull segments:
+
+    - LP relaxation: fund segments in order of marginal ROI (extra profit per extra
+      dollar) until the budget runs out, taking a fraction of the last one. This is
+      the exact LP optimum and an upper bound on any real allocation.
+    - Greedy allocation: the same pass taking only whole segments that fit, then one
+      sweep that upgrades each candidate to any costed quantity the leftover cash covers.
+      When this already meets the LP bound it is optimal and the solve stops here.
+    - Exact allocation: otherwise the knapsack is solved exactly. A bound at the LP's
+      critical marginal ROI rules out every order that can't beat the greedy allocation,
+      which usually settles most candidates; the rest are solved by dynamic programming
+      over Pareto-optimal (capital, profit) states (with NumPy), else by branch-and-bound.
+      A search that hits --max-nodes reports the best allocation found and says so.
+
+The report gives the LP bound next to the allocation, so the remaining gap to the
+bound is always visible.
+
+Objectives:
+    profit  Fund every segment with a positive marginal return until the budget is spent.
+    roi     Only fund orders that return at least --min-roi on their capital, up to the
+            quantity where extra units stop clearing it, and keep the rest as cash.
+
+Input columns (CSV header or JSONL keys) are the deal_pipeline.py columns, plus:
+    max_quantity  Demand cap: most units worth ordering this cycle (default: quantity)
+    min_quantity  Supplier MOQ: smallest order accepted (default: 1, or the first price tier)
+    price_tiers   Price breaks ("50:4.80,200:4.20") in place of product_cost; every tier
+                  start between MOQ and demand cap is costed too
+    sku           Optional label shown in the report
+The quantity column itself is only used as the demand cap fallback — the optimizer
+picks the order quantity.
+
+Usage:
+    python portfolio_optimizer.py candidates.csv --budget 5000
+    python portfolio_optimizer.py candidates.jsonl --budget 20000 --objective roi --min-roi 50
+    python portfolio_optimizer.py candidates.csv --budget 5000 --best-shipping --json
+"""
+
+import argparse
+import json
+import sys
+
+try:
+    import numpy as np
+except ImportError:  # Without NumPy every exact solve uses branch-and-bound
+    np = None
+
+import batch_io
+import rate_tables
+from deal_pipeline import DEAL_MARGIN_FIELDS
+from landed_cost import LANDED_COST_FIELDS, calculate_landed_cost_record
+from margin_calculator import calculate_margin_record
+from price_tiers import parse_price_tiers, unit_price
+from shipping_solver import cheapest_method
+
+
+OBJECTIVES = ("profit", "roi")
+
+DEFAULT_LEVELS = 6  # Order quantities costed per candidate
+DEFAULT_MIN_ROI = 30.0  # ROI hurdle for --objective roi (%, the "Marginal" assessment tier)
+DP_STATES = 2_000_000  # Most Pareto states per candidate before the DP gives way to branch-and-bound
+MAX_NODES = 200_000  # Branch-and-bound node limit
+
+# The optimizer chooses quantity, so it is not passed through from the row
+CANDIDATE_LANDED_FIELDS = {name: kind for name, kind in LANDED_COST_FIELDS.items() if name != "quantity"}
+
+
+def quantity_levels(min_quantity: int, max_quantity: int, levels: int = DEFAULT_LEVELS) -> list:
+    """Geometrically spaced order quantities from min_quantity to max_quantity inclusive."""
+    if min_quantity < 1 or max_quantity < min_quantity:
+        raise ValueError("Need 1 <= min_quantity <= max_quantity")
+    if levels < 2 or min_quantity == max_quantity:
+        return sorted({min_quantity, max_quantity})
+    ratio = (max_quantity / min_quantity) ** (1 / (levels - 1))
+    return sorted({min(max_quantity, round(min_quantity * ratio ** k)) for k in range(levels)} | {max_quantity})
+
+
+def candidate_options(row: dict, levels: int = DEFAULT_LEVELS, best_shipping: bool = False) -> list:
+    """
+    Cost one candidate deal at each of its order quantity levels.
+
+    Args:
+        row: Input row (see module docstring)
+        levels: Number of quantities to cost between MOQ and demand cap
+        best_shipping: Use the cheapest shipping method at each quantity instead of
+            the row's shipping_method
+
+    Returns:
+        list of option dicts (quantity, shipping_method, capital, expected_profit,
+        sellable_units, per_unit_landed, roi_pct, rate_table_version), in quantity order
+    """
+    cap = row.get("max_quantity") or row.get("quantity")
+    if cap is None or cap == "":
+        raise ValueError("Candidate needs max_quantity (or quantity) as its demand cap")
+    cap = batch_io.coerce(cap, int)
+    # With a price schedule, each quantity gets its tier's price, and the MOQ and price
+    # breaks become quantities worth costing
+    tiers = None
+    if row.get("product_cost") in (None, "") and row.get("price_tiers") not in (None, ""):
+        tiers = parse_price_tiers(row["price_tiers"])
+    moq = row.get("min_quantity")
+    if moq is None or moq == "":
+        moq = tiers[0][0] if tiers else 1
+    else:
+        moq = batch_io.coerce(moq, int)
+
+    landed_kwargs = batch_io.calculator_kwargs(row, CANDIDATE_LANDED_FIELDS)
+    margin_kwargs = batch_io.calculator_kwargs(row, DEAL_MARGIN_FIELDS)
+    methods = rate_tables.active().shipping_on(landed_kwargs.get("as_of")).methods
+
+    quantities = quantity_levels(moq, cap, levels)
+    if tiers:
+        quantities = sorted(set(quantities) | {q for q, _ in tiers if moq <= q <= cap})
+
+    options = []
+    for quantity in quantities:
+        if tiers:
+            landed_kwargs["product_cost"] = unit_price(tiers, quantity)
+        if best_shipping:
+            landed_kwargs["shipping_method"] = cheapest_method(quantity, landed_kwargs["weight_per_unit_kg"], methods)
+        landed = calculate_landed_cost_record(quantity=quantity, quiet=True, **landed_kwargs)
+        if landed.sellable_units <= 0:
+            continue
+        margin = calculate_margin_record(cogs=round(landed.per_unit_landed_adjusted, 2), **margin_kwargs)
+        capital = round(landed.total_landed, 2)
+        profit = round(margin.net_profit * landed.sellable_units, 2)
+        options.append({
+            "quantity": quantity,
+            "shipping_method": landed.shipping_method,
+            "capital": capital,
+            "expected_profit": profit,
+            "sellable_units": landed.sellable_units,
+            "per_unit_landed": round(landed.per_unit_landed, 2),
+            "roi_pct": round(profit / capital * 100, 1) if capital > 0 else 0.0,
+            "rate_table_version": f"{margin.rate_table_version},{landed.rate_table_version}",
+        })
+    return options
+
+
+def _hull(options: list, min_slope: float) -> list:
+    """
+    Indices of the options on the upper concave hull of (capital, profit), from (0, 0).
+
+    Only hull segments with marginal ROI above zero and at least min_slope are kept, so
+    the returned chain's slopes are strictly decreasing and all worth funding.
+    """
+    # (capital, profit, option index); starts from "order nothing" at the origin
+    hull = [(0.0, 0.0, None)]
+    for k in sorted(range(len(options)), key=lambda k: (options[k]["capital"], -options[k]["expected_profit"])):
+        x, y = options[k]["capital"], options[k]["expected_profit"]
+        if y <= hull[-1][1]:
+            continue  # Costs at least as much as the current end and earns no more
+        # Drop ends that sit on or below the line from their predecessor to this point
+        while len(hull) > 1:
+            (x0, y0, _), (x1, y1, _) = hull[-2], hull[-1]
+            if (y1 - y0) * (x - x0) > (y - y0) * (x1 - x0):
+                break
+            hull.pop()
+        hull.append((x, y, k))
+
+    chain = []
+    for (x0, y0, _), (x, y, k) in zip(hull, hull[1:]):
+        slope = (y - y0) / (x - x0)
+        if slope < min_slope:
+            break
+        chain.append(k)
+    return chain
+
+
+def _eligible(options: list, chain: list, min_slope: float) -> list:
+    """
+    Orders worth considering for one candidate, as (capital in cents, profit, option index).
+
+    An order qualifies when it earns a positive profit that clears the hurdle on its own
+    capital and costs no more than the end of the hull chain (past it, extra capital
+    returns less than the hurdle). Orders that cost more than a cheaper one and earn no
+    more are dropped. Sorted by capital.
+    """
+    if not chain:
+        return []
+    cap = options[chain[-1]]["capital"]
+    items = []
+    for k in sorted(range(len(options)), key=lambda k: (options[k]["capital"], -options[k]["expected_profit"])):
+        capital, profit = options[k]["capital"], options[k]["expected_profit"]
+        if capital > cap or profit <= 0 or profit < capital * min_slope:
+            continue
+        if items and profit <= items[-1][1]:
+            continue
+        items.append((round(capital * 100), profit, k))
+    return items
+
+
+def allocate(candidates: list, budget: float, min_roi: float = 0.0, max_nodes: int = MAX_NODES) -> dict:
+    """
+    Choose one order option (or nothing) per candidate within a budget.
+
+    Solves the multiple-choice knapsack exactly, starting from the greedy allocation
+    (see _solve_exact()). A search that hits max_nodes returns the best allocation
+    found.
+
+    Args:
+        candidates: One options list per candidate, as from candidate_options()
+        budget: Cash available for landed costs
+        min_roi: ROI hurdle (%); orders returning less on their capital stay unfunded
+        max_nodes: Branch-and-bound node limit
+
+    Returns:
+        dict with "choice" (option index per candidate, None = skip), "capital",
+        "expected_profit", "lp_bound" (LP relaxation optimum, an upper bound on
+        expected_profit for any allocation under the same hurdle) and "optimal"
+        (False only when the search stopped at max_nodes)
+    """
+    if budget <= 0:
+        raise ValueError("budget must be positive")
+    min_slope = min_roi / 100
+    budget_cents = int(round(budget * 100))
+
+    # Hull segments of every candidate, best marginal ROI first. Within a candidate the
+    # slopes strictly decrease, so its segments come out in chain order.
+    chains = [_hull(options, min_slope) for options in candidates]
+    segments = []
+    for i, (options, chain) in enumerate(zip(candidates, chains)):
+        prev_capital, prev_profit = 0.0, 0.0
+        for k in chain:
+            capital, profit = options[k]["capital"], options[k]["expected_profit"]
+            segments.append(((profit - prev_profit) / (capital - prev_capital), i, k,
+                             capital - prev_capital, profit - prev_profit))
+            prev_capital, prev_profit = capital, profit
+    segments.sort(key=lambda s: (-s[0], s[1]))
+    items = [_eligible(options, chain, min_slope) for options, chain in zip(candidates, chains)]
+
+    choice, lp_bound, slope = _fill(candidates, segments, budget)
+    choice, profit = _upgrade(items, budget_cents, choice, candidates)
+
+    optimal = True
+    if profit < lp_bound - 1e-9:
+        choice, profit, optimal = _solve_exact(items, budget_cents, slope, choice, profit, max_nodes)
+
+    spent = sum(candidates[i][k]["capital"] for i, k in enumerate(choice) if k is not None)
+    profit = sum(candidates[i][k]["expected_profit"] for i, k in enumerate(choice) if k is not None)
+    return {"choice": choice, "capital": spent, "expected_profit": profit,
+            "lp_bound": max(lp_bound, profit), "optimal": optimal}
+
+
+def _fill(candidates: list, segments: list, budget: float) -> tuple:
+    """
+    Fund whole hull segments in marginal ROI order while they fit the budget.
+
+    Returns:
+        (choice, lp_bound, slope): lp_bound is the LP relaxation value, which funds
+        the first segment that didn't fit fractionally, and slope that segment's
+        marginal ROI (0 if every segment fit)
+    """
+    choice = [None] * len(candidates)
+    blocked = set()
+    spent = profit = 0.0
+    lp_bound = None
+    critical = 0.0
+    for slope, i, k, d_capital, d_profit in segments:
+        if i in blocked:
+            continue
+        if spent + d_capital <= budget:
+            choice[i] = k
+            spent += d_capital
+            profit += d_profit
+            continue
+        # Later segments of this candidate build on this one, so they're out too
+        blocked.add(i)
+        if lp_bound is None:
+            lp_bound = profit + slope * (budget - spent)
+            critical = slope
+    return choice, profit if lp_bound is None else lp_bound, critical
+
+
+def _upgrade(items: list, budget_cents: int, choice: list, candidates: list) -> tuple:
+    """Leftover cash may cover a larger (or off-hull) order somewhere; take the best per candidate."""
+    current = {}
+    for i, k in enumerate(choice):
+        if k is not None:
+            current[i] = (round(candidates[i][k]["capital"] * 100), candidates[i][k]["expected_profit"])
+    left = budget_cents - sum(cents for cents, _ in current.values())
+    for i, options in enumerate(items):
+        cents_now, profit_now = current.get(i, (0, 0.0))
+        best = None
+        for cents, profit, k in options:
+            if cents - cents_now <= left and profit > profit_now and (best is None or profit > best[1]):
+                best = (cents, profit, k)
+        if best is not None:
+            left -= best[0] - cents_now
+            current[i] = best[:2]
+            choice[i] = best[2]
+    return choice, sum(profit for _, profit in current.values())
+
+
+def _solve_exact(items: list, budget_cents: int, slope: float, choice: list, profit: float,
+                 max_nodes: int) -> tuple:
+    """
+    Exact allocation, given an incumbent (choice, profit) and the LP's critical slope.
+
+    For any slope >= 0, no allocation earns more than slope * budget plus the sum over
+    candidates of their best "reduced profit" (profit - slope * capital, or 0 for
+    skipping). An option whose reduced profit falls short of its candidate's best by
+    more than that bound's gap over the incumbent can't be part of a better allocation,
+    so it is dropped; candidates left with one choice are fixed. The few candidates
+    still open are solved by _solve_dp(), or _branch_and_bound() without NumPy.
+
+    Returns:
+        (choice, profit, optimal): optimal is False if the search stopped at max_nodes
+    """
+    best = [max([0.0] + [gain - slope * cents / 100 for cents, gain, _ in options]) for options in items]
+    gap = slope * budget_cents / 100 + sum(best) - profit
+
+    fixed = [None] * len(items)
+    left, earned = budget_cents, 0.0
+    open_candidates = []
+    for i, options in enumerate(items):
+        allowed = [item for item in options if best[i] - (item[1] - slope * item[0] / 100) < gap + 1e-9]
+        skip = best[i] < gap + 1e-9
+        if len(allowed) == 1 and not skip:
+            fixed[i] = allowed[0][2]
+            left -= allowed[0][0]
+            earned += allowed[0][1]
+        elif allowed:
+            open_candidates.append((i, allowed, skip))
+    if left < 0:
+        return choice, profit, True  # The choices any better allocation needs don't fit together
+
+    found, optimal = None, False
+    if np is not None:
+        found, optimal = _solve_dp(open_candidates, left, slope, profit - earned)
+    if not optimal:
+        found, optimal = _branch_and_bound(open_candidates, left, slope, profit - earned, max_nodes)
+    if found is None or earned + found[1] <= profit:
+        return choice, profit, optimal
+    for i, k in found[0].items():
+        fixed[i] = k
+    return fixed, earned + found[1], optimal
+
+
+def _solve_dp(open_candidates: list, budget_cents: int, slope: float, incumbent: float) -> tuple:
+    """
+    Exact allocation of open candidates by dynamic programming over Pareto states.
+
+    After each candidate the states are the (capital in cents, profit) pairs its
+    choices and the earlier ones' reach, keeping only those no cheaper state earns as
+    much as, and dropping those whose slope bound can't beat the incumbent. Each layer
+    keeps a parent index and choice per state for the walk back.
+
+    Returns:
+        (({candidate: option index}, profit) or None if nothing beats incumbent,
+        complete): complete is False if a layer outgrew DP_STATES
+    """
+    best = [max([0.0 if skip else -np.inf] + [gain - slope * cents / 100 for cents, gain, _ in allowed])
+            for _, allowed, skip in open_candidates]
+    remaining = np.cumsum([0.0] + best[::-1])[::-1]
+
+    cost = np.zeros(1, dtype=np.int64)
+    profit = np.zeros(1)
+    layers = []
+    for d, (_, allowed, skip) in enumerate(open_candidates):
+        parents, costs, profits, picks = [], [], [], []
+        index = np.arange(len(cost))
+        if skip:
+            parents.append(index)
+            costs.append(cost)
+            profits.append(profit)
+            picks.append(np.full(len(cost), -1))
+        for n, (cents, gain, _) in enumerate(allowed):
+            fits = cost + cents <= budget_cents
+            parents.append(index[fits])
+            costs.append(cost[fits] + cents)
+            profits.append(profit[fits] + gain)
+            picks.append(np.full(int(fits.sum()), n))
+        parent, cost, profit, pick = (np.concatenate(parts) for parts in (parents, costs, profits, picks))
+
+        promising = profit + slope * (budget_cents - cost) / 100 + remaining[d + 1] > incumbent + 1e-9
+        order = np.flatnonzero(promising)
+        order = order[np.lexsort((-profit[order], cost[order]))]
+        parent, cost, profit, pick = parent[order], cost[order], profit[order], pick[order]
+        if len(cost) == 0:
+            return None, True
+        # Pareto front: each state must earn more than every cheaper one
+        front = np.ones(len(cost), dtype=bool)
+        front[1:] = profit[1:] > np.maximum.accumulate(profit)[:-1]
+        parent, cost, profit, pick = parent[front], cost[front], profit[front], pick[front]
+        if len(cost) > DP_STATES:
+            return None, False
+        layers.append((parent, pick))
+
+    state = int(np.argmax(profit))
+    found = float(profit[state])
+    chosen = {}
+    for (i, allowed, _), (parent, pick) in zip(reversed(open_candidates), reversed(layers)):
+        if pick[state] >= 0:
+            chosen[i] = allowed[pick[state]][2]
+        state = int(parent[state])
+    return (chosen, found), True
+
+
+def _branch_and_bound(open_candidates: list, budget_cents: int, slope: float, incumbent: float,
+                      max_nodes: int) -> tuple:
+    """
+    Exact allocation of open candidates by depth-first branch-and-bound.
+
+    Each candidate's choices are tried best reduced profit first. A node is pruned when
+    its profit plus the slope bound of the undecided candidates (slope * cash left +
+    their best reduced profits) can't beat the incumbent.
+
+    Returns:
+        (({candidate: option index}, profit) or None if nothing beats incumbent, optimal)
+    """
+    entries = []
+    for i, allowed, skip in open_candidates:
+        branches = [(gain - slope * cents / 100, cents, gain, k) for cents, gain, k in allowed]
+        if skip:
+            branches.append((0.0, 0, 0.0, None))
+        branches.sort(key=lambda branch: -branch[0])
+        entries.append((i, branches))
+    entries.sort(key=lambda entry: -entry[1][0][0])
+    # Best reduced profit of the candidates from each depth on
+    remaining = [0.0] * (len(entries) + 1)
+    for d in range(len(entries) - 1, -1, -1):
+        remaining[d] = remaining[d + 1] + entries[d][1][0][0]
+
+    found = None
+    path = [None] * len(entries)
+    nodes = 0
+    # (depth, cents left, profit so far, next branch)
+    stack = [(0, budget_cents, 0.0, 0)]
+    while stack:
+        nodes += 1
+        if nodes > max_nodes:
+            return found, False
+        d, left, earned, n = stack.pop()
+        if d == len(entries):
+            if earned > incumbent + 1e-9:
+                incumbent = earned
+                found = ({entries[j][0]: path[j] for j in range(d) if path[j] is not None}, earned)
+            continue
+        if earned + slope * left / 100 + remaining[d] <= incumbent + 1e-9:
+            continue
+        branches = entries[d][1]
+        while n < len(branches) and branches[n][1] > left:
+            n += 1
+        if n == len(branches):
+            continue
+        # Come back for the next branch after this one's subtree
+        stack.append((d, left, earned, n + 1))
+        _, cents, gain, k = branches[n]
+        path[d] = k
+        stack.append((d + 1, left - cents, earned + gain, 0))
+    return found, True
+
+
+def optimize(rows, budget: float, objective: str = "profit", min_roi: float = DEFAULT_MIN_ROI,
+             levels: int = DEFAULT_LEVELS, best_shipping: bool = False, max_nodes: int = MAX_NODES) -> dict:
+    """
+    Cost every candidate row and allocate the budget across them.
+
+    Rows that cannot be costed are listed under "skipped" with their error instead of
+    stopping the run.
+
+    Returns:
+        dict with "input", "allocations" (one per funded candidate, best ROI first),
+        "summary", "skipped" and rate_table_version
+    """
+    if objective not in OBJECTIVES:
+        raise ValueError(f"Unknown objective: {objective}. Options: {', '.join(OBJECTIVES)}")
+
+    labels, candidates, skipped = [], [], []
+    for n, row in enumerate(rows, start=1):
+        try:
+            options = candidate_options(row, levels, best_shipping)
+        except batch_io.ROW_ERRORS as e:
+            skipped.append({"row": n, "sku": row.get("sku"), "error": str(e)})
+            continue
+        labels.append((n, row.get("sku")))
+        candidates.append(options)
+
+    hurdle = min_roi if objective == "roi" else 0.0
+    solution = allocate(candidates, budget, hurdle, max_nodes)
+
+    allocations = []
+    for (n, sku), options, k in zip(labels, candidates, solution["choice"]):
+        if k is not None:
+            allocations.append({"row": n, "sku": sku, **options[k]})
+    allocations.sort(key=lambda a: -a["roi_pct"])
+
+    capital = round(solution["capital"], 2)
+    profit = round(solution["expected_profit"], 2)
+    lp_bound = round(solution["lp_bound"], 2)
+    return {
+        "input": {
+            "budget": budget,
+            "objective": objective,
+            "min_roi_pct": hurdle,
+            "levels": levels,
+            "best_shipping": best_shipping,
+        },
+        "allocations": allocations,
+        "summary": {
+            "candidates": len(candidates),
+            "funded": len(allocations),
+            "capital_deployed": capital,
+            "cash_remaining": round(budget - capital, 2),
+            "expected_profit": profit,
+            "roi_pct": round(profit / capital * 100, 1) if capital > 0 else 0.0,
+            "lp_bound": lp_bound,
+            "optimality_gap_pct": round((lp_bound - profit) / lp_bound * 100, 2) if lp_bound > 0 else 0.0,
+            "optimal": solution["optimal"],
+        },
+        "skipped": skipped,
+        "rate_table_version": "; ".join(sorted({a["rate_table_version"] for a in allocations}))
+                              or rate_tables.active().version,
+    }
+
+
+def print_report(result: dict, top: int = 25):
+    """Print a human-readable allocation report."""
+    inp = result["input"]
+    s = result["summary"]
+
+    print("\n" + "=" * 60)
+    print("  PORTFOLIO CAPITAL ALLOCATION")
+    print("=" * 60)
+
+    print(f"\n  Budget:               ${inp['budget']:,.2f}")
+    objective = inp["objective"]
+    if objective == "roi":
+        objective += f" (marginal ROI >= {inp['min_roi_pct']:.0f}%)"
+    print(f"  Objective:            {objective}")
+    print(f"  Candidates:           {s['candidates']} ({len(result['skipped'])} skipped)")
+    print(f"  Rate Tables:          {result['rate_table_version']}")
+
+    print(f"\n--- Allocation ({s['funded']} deals) ---")
+    for a in result["allocations"][:top]:
+        label = str(a["sku"]) if a["sku"] not in (None, "") else f"row {a['row']}"
+        method = a["shipping_method"] or "custom"
+        print(f"  {label[:18]:<18} {a['quantity']:>6} units  {method:<20} "
+              f"${a['capital']:>10,.2f}  ${a['expected_profit']:>9,.2f}  {a['roi_pct']:>6.1f}%")
+    if s["funded"] > top:
+        print(f"  ... and {s['funded'] - top} more")
+
+    print(f"\n--- Portfolio ---")
+    print(f"  Capital Deployed:     ${s['capital_deployed']:,.2f}")
+    print(f"  Cash Remaining:       ${s['cash_remaining']:,.2f}")
+    print(f"  Expected Profit:      ${s['expected_profit']:,.2f}")
+    print(f"  Portfolio ROI:        {s['roi_pct']:.1f}%")
+    print(f"  LP Upper Bound:       ${s['lp_bound']:,.2f} (gap {s['optimality_gap_pct']:.2f}%)")
+    if s["optimal"]:
+        print("  Allocation:           optimal")
+    else:
+        print("  Allocation:           best found (search stopped at --max-nodes)")
+
+    if result["skipped"]:
+        print(f"\n--- Skipped ---")
+        for item in result["skipped"][:10]:
+            print(f"  Row {item['row']}: {item['error']}")
+    print("=" * 60 + "\n")
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Allocate a purchasing budget across candidate deals",
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        epilog="""
+Examples:
+  Most expected profit from a $5,000 budget:
+    %(prog)s candidates.csv --budget 5000
+
+  Only fund capital that returns at least 50%%, keep the rest as cash:
+    %(prog)s candidates.jsonl --budget 20000 --objective roi --min-roi 50
+
+  Pick the cheapest shipping method at each quantity, JSON output:
+    %(prog)s candidates.csv --budget 5000 --best-shipping --json
+        """,
+    )
+
+    parser.add_argument("input", nargs="?", default="-", help="Candidate deals file (default: stdin)")
+    parser.add_argument("--input-format", type=str, choices=batch_io.FORMATS, default=None,
+                       help="Input format (default: from file extension, else csv)")
+    parser.add_argument("--budget", type=float, required=True, help="Cash available for landed costs")
+    parser.add_argument("--objective", type=str, choices=OBJECTIVES, default="profit",
+                       help="What to maximize (default: profit)")
+    parser.add_argument("--min-roi", type=float, default=DEFAULT_MIN_ROI,
+                       help=f"Marginal ROI hurdle for --objective roi (%%, default: {DEFAULT_MIN_ROI})")
+    parser.add_argument("--levels", type=int, default=DEFAULT_LEVELS,
+                       help=f"Order quantities costed per candidate (default: {DEFAULT_LEVELS})")
+    parser.add_argument("--best-shipping", action="store_true",
+                       help="Use the cheapest shipping method at each quantity")
+    parser.add_argument("--max-nodes", type=int, default=MAX_NODES,
+                       help=f"Branch-and-bound node limit for large problems (default: {MAX_NODES})")
+    parser.add_argument("--json", action="store_true", help="Output as JSON")
+
+    args = parser.parse_args()
+
+    input_format = args.input_format or batch_io.infer_format(args.input, "csv")
+    infile = sys.stdin if args.input == "-" else open(args.input, newline="", encoding="utf-8")
+    try:
+        result = optimize(batch_io.read_rows(infile, input_format), args.budget, objective=args.objective,
+                          min_roi=args.min_roi, levels=args.levels, best_shipping=args.best_shipping,
+                          max_nodes=args.max_nodes)
+    except ValueError as e:
+        parser.error(str(e))
+    finally:
+        if infile is not sys.stdin:
+            infile.close()
+
+    if args.json:
+        print(json.dumps(result, indent=2))
+    else:
+        print_report(result)
+
+
+if __name__ == "__main__":
+    main()
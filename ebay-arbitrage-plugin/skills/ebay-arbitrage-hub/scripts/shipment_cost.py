@@ -0,0 +1,411 @@
+#!/usr/bin/env python3
+"""
+Consolidated Shipment Costing
+
+calculate_landed_cost() prices one product as if it traveled alone: its own freight
+base fee, its own customs brokerage, its own de minimis check. A real freight shipment
+carries many SKUs, and those charges are paid once for the whole shipment. This script
+costs a manifest of SKUs as one shipment and allocates the shared charges back to each
+line, so every SKU gets a landed cost that adds up to what the forwarder actually bills.
+
+Charged once per shipment, then allocated by --allocate weight (default) or value:
+    - freight (base fee + total chargeable weight × per-kg rate, or --shipping-override)
+    - customs brokerage
+    - domestic delivery
+Per line, on the line's own goods value and rates:
+    - customs duties (base + Section 301) on goods + allocated freight + insurance
+    - FX spread, payment fee, insurance, defect buffer
+The $800 de minimis check is made once, on the whole shipment's goods value.
+
+Lines with package dimensions are billed on chargeable weight, as in
+calculate_landed_cost(): each line's units (or its cartons, given carton dimensions)
+bill the greater of actual and volumetric weight (see packing.py). Every SKU packs
+into its own cartons, so the shipment's chargeable weight is the sum of its lines',
+and --allocate weight splits shared charges by that chargeable weight.
+
+Each line is also costed on its own with calculate_landed_cost() for comparison, so
+the report shows what consolidating saves. Two passes over the manifest, so cost grows
+linearly with the number of lines. A single-line manifest costs exactly what
+calculate_landed_cost() does.
+
+Manifest columns (CSV header or JSONL keys):
+    product_cost, quantity, weight_per_unit_kg (required)
+    duty_rate, section_301_rate, defect_rate (optional, per line)
+    length_cm, width_cm, height_cm (packaged unit), carton_length_cm, carton_width_cm,
+        carton_height_cm, carton_weight_kg (optional, per line)
+    sku and any other columns are passed through to the per-SKU output
+
+Usage:
+    python shipment_cost.py manifest.csv --shipping-method sea_lcl
+    python shipment_cost.py manifest.csv --shipping-method air_freight --allocate value --json
+    python shipment_cost.py manifest.jsonl --shipping-override 1850 --output per_sku.csv
+"""
+
+import argparse
+import json
+import sys
+
+import batch_io
+import packing
+import rate_tables
+from landed_cost import (
+    DE_MINIMIS_THRESHOLD,
+    DEFAULT_CUSTOMS_BROKERAGE,
+    DEFAULT_DEFECT_RATE,
+    DEFAULT_DOMESTIC_DELIVERY,
+    DEFAULT_FX_SPREAD,
+    DEFAULT_INSURANCE_RATE,
+    DEFAULT_PAYMENT_FEE,
+    calculate_landed_cost_record,
+)
+
+
+ALLOCATIONS = ("weight", "value")
+
+# Per-line manifest fields, with the type to coerce text values to
+SHIPMENT_LINE_FIELDS = {
+    "product_cost": float,
+    "quantity": int,
+    "weight_per_unit_kg": float,
+    "duty_rate": float,
+    "section_301_rate": float,
+    "defect_rate": float,
+    "length_cm": float,
+    "width_cm": float,
+    "height_cm": float,
+    "carton_length_cm": float,
+    "carton_width_cm": float,
+    "carton_height_cm": float,
+    "carton_weight_kg": float,
+}
+
+UNIT_DIMS = ("length_cm", "width_cm", "height_cm")
+CARTON_DIMS = ("carton_length_cm", "carton_width_cm", "carton_height_cm")
+
+# Columns appended to each manifest line in the per-SKU output
+SHIPMENT_LINE_OUTPUT_FIELDS = [
+    "allocation_share", "product_total", "chargeable_weight_kg", "cartons", "shipping", "customs_total", "customs_brokerage_cost",
+    "domestic_delivery_cost", "fx_spread_cost", "payment_fee_cost", "insurance", "defect_buffer",
+    "total_landed_cost", "per_unit_landed", "per_unit_landed_defect_adjusted", "sellable_units",
+    "standalone_per_unit_landed",
+]
+
+
+def calculate_shipment(
+    lines,
+    shipping_method: str = "air_freight",
+    allocation: str = "weight",
+    fx_spread: float = DEFAULT_FX_SPREAD,
+    payment_fee: float = DEFAULT_PAYMENT_FEE,
+    insurance_rate: float = DEFAULT_INSURANCE_RATE,
+    customs_brokerage: float = DEFAULT_CUSTOMS_BROKERAGE,
+    domestic_delivery: float = DEFAULT_DOMESTIC_DELIVERY,
+    shipping_cost_override: float = None,
+    waive_de_minimis: bool = False,
+    as_of=None,
+) -> dict:
+    """
+    Landed cost of a multi-SKU shipment, allocated back to each manifest line.
+
+    Args:
+        lines: Manifest rows (dicts with SHIPMENT_LINE_FIELDS; other keys pass through)
+        shipping_method: One of the SHIPPING_RATES keys, for the whole shipment
+        allocation: "weight" or "value" — how freight, brokerage and domestic delivery
+            are split across lines
+        waive_de_minimis: Charge no duties when the shipment's goods value is under
+            DE_MINIMIS_THRESHOLD (individual postal/express parcels; freight entries
+            usually don't qualify, so the default is to charge them)
+        as_of: Order date; use the shipping rates in effect then
+        (fee arguments as in calculate_landed_cost, but charged once per shipment)
+
+    Returns:
+        dict with "lines" (input row + SHIPMENT_LINE_OUTPUT_FIELDS, rounded),
+        "shipment" (totals, de minimis, weight limit and savings vs. costing each
+        line alone) and rate_table_version
+    """
+    if allocation not in ALLOCATIONS:
+        raise ValueError(f"Unknown allocation: {allocation}. Options: {', '.join(ALLOCATIONS)}")
+
+    shipping_table = rate_tables.active().shipping_on(as_of)
+    index = shipping_table.index
+    method_code = index.code_of.get(shipping_method)
+    if method_code is None and shipping_cost_override is None:
+        raise ValueError(f"Unknown shipping method: {shipping_method}. Options: {', '.join(index.keys)}")
+
+    divisor = index.volumetric_divisor[method_code] if method_code is not None else None
+
+    # Pass 1: line values and shipment totals
+    rows, parsed = [], []
+    total_product_cost = total_weight_kg = total_volumetric_kg = total_chargeable_kg = 0.0
+    total_cartons = 0
+    for n, row in enumerate(lines, start=1):
+        try:
+            kwargs = batch_io.calculator_kwargs(row, SHIPMENT_LINE_FIELDS)
+            missing = [name for name in ("product_cost", "quantity", "weight_per_unit_kg") if name not in kwargs]
+            if missing:
+                raise ValueError(f"missing {', '.join(missing)}")
+            weight, volumetric, chargeable, cartons = packing.chargeable_weight(
+                kwargs["quantity"], kwargs["weight_per_unit_kg"], divisor,
+                tuple(kwargs.get(name) for name in UNIT_DIMS), tuple(kwargs.get(name) for name in CARTON_DIMS),
+                kwargs.get("carton_weight_kg", 0.0),
+            )
+        except batch_io.ROW_ERRORS as e:
+            raise ValueError(f"Manifest line {n}: {e}") from e
+        kwargs.setdefault("duty_rate", 0.0)
+        kwargs.setdefault("section_301_rate", 0.0)
+        kwargs.setdefault("defect_rate", DEFAULT_DEFECT_RATE)
+        product_total = kwargs["product_cost"] * kwargs["quantity"]
+        total_product_cost += product_total
+        total_weight_kg += weight
+        total_volumetric_kg += volumetric
+        total_chargeable_kg += chargeable
+        total_cartons += cartons
+        rows.append(row)
+        parsed.append((kwargs, product_total, chargeable, cartons))
+    if not parsed:
+        raise ValueError("Manifest is empty")
+
+    if shipping_cost_override is not None:
+        total_shipping = shipping_cost_override
+        over_weight_limit = False
+    else:
+        max_weight_kg = index.max_weight_kg[method_code]
+        over_weight_limit = bool(max_weight_kg and total_weight_kg > max_weight_kg)
+        total_shipping = index.base_fee[method_code] + total_chargeable_kg * index.rate_per_kg[method_code]
+
+    de_minimis = total_product_cost < DE_MINIMIS_THRESHOLD
+    charge_duties = not (waive_de_minimis and de_minimis)
+
+    # Allocation basis; fall back to units when every line weighs (or costs) nothing
+    basis = 1 if allocation == "weight" else 2
+    basis_total = total_chargeable_kg if allocation == "weight" else total_product_cost
+    if basis_total <= 0:
+        basis = 0
+        basis_total = sum(kwargs["quantity"] for kwargs, _, _, _ in parsed)
+
+    # Pass 2: allocate shared charges and cost each line
+    out_lines = []
+    totals = dict.fromkeys(("duties", "fx", "payment", "insurance", "defect", "landed", "standalone"), 0.0)
+    for row, line in zip(rows, parsed):
+        kwargs, product_total, chargeable, cartons = line
+        quantity = kwargs["quantity"]
+        share = (quantity, chargeable, product_total)[basis] / basis_total if basis_total else 0.0
+        shipping = total_shipping * share
+        brokerage = customs_brokerage * share
+        domestic = domestic_delivery * share
+
+        # Same order of operations as calculate_landed_cost_record()
+        fx_cost = product_total * (fx_spread / 100)
+        insurance_cost = product_total * (insurance_rate / 100)
+        dutiable_value = product_total + shipping + insurance_cost
+        if charge_duties:
+            duties = dutiable_value * (kwargs["duty_rate"] / 100) + dutiable_value * (kwargs["section_301_rate"] / 100)
+        else:
+            duties = 0.0
+        payment_cost = product_total * (payment_fee / 100)
+        defect_cost = product_total * (kwargs["defect_rate"] / 100)
+        sellable_units = int(quantity * (1 - kwargs["defect_rate"] / 100))
+        total_landed = (product_total + fx_cost + shipping + duties + brokerage + domestic
+                        + payment_cost + insurance_cost + defect_cost)
+
+        # The same line shipped on its own, for the savings comparison
+        standalone = calculate_landed_cost_record(
+            kwargs["product_cost"], quantity, kwargs["weight_per_unit_kg"], shipping_method,
+            kwargs["duty_rate"], kwargs["section_301_rate"], fx_spread, payment_fee, insurance_rate,
+            customs_brokerage, domestic_delivery, kwargs["defect_rate"],
+            None if shipping_cost_override is None else shipping_cost_override * share, True, as_of,
+            *(kwargs.get(name) for name in UNIT_DIMS), *(kwargs.get(name) for name in CARTON_DIMS),
+            kwargs.get("carton_weight_kg", 0.0),
+        )
+
+        for key, value in (("duties", duties), ("fx", fx_cost), ("payment", payment_cost),
+                           ("insurance", insurance_cost), ("defect", defect_cost), ("landed", total_landed),
+                           ("standalone", standalone.total_landed)):
+            totals[key] += value
+
+        out_lines.append({
+            **row,
+            "allocation_share": round(share, 6),
+            "product_total": round(product_total, 2),
+            "chargeable_weight_kg": round(chargeable, 2),
+            "cartons": cartons,
+            "shipping": round(shipping, 2),
+            "customs_total": round(duties, 2),
+            "customs_brokerage_cost": round(brokerage, 2),
+            "domestic_delivery_cost": round(domestic, 2),
+            "fx_spread_cost": round(fx_cost, 2),
+            "payment_fee_cost": round(payment_cost, 2),
+            "insurance": round(insurance_cost, 2),
+            "defect_buffer": round(defect_cost, 2),
+            "total_landed_cost": round(total_landed, 2),
+            "per_unit_landed": round(total_landed / quantity, 2) if quantity else 0.0,
+            "per_unit_landed_defect_adjusted": round(total_landed / sellable_units, 2) if sellable_units > 0 else 0,
+            "sellable_units": sellable_units,
+            "standalone_per_unit_landed": round(standalone.per_unit_landed, 2) if quantity else 0.0,
+        })
+
+    return {
+        "input": {
+            "shipping_method": shipping_method if shipping_cost_override is None else None,
+            "allocation": allocation,
+            "fx_spread_pct": fx_spread,
+            "payment_fee_pct": payment_fee,
+            "insurance_rate_pct": insurance_rate,
+            "waive_de_minimis": waive_de_minimis,
+        },
+        "lines": out_lines,
+        "shipment": {
+            "lines": len(out_lines),
+            "units": sum(kwargs["quantity"] for kwargs, _, _, _ in parsed),
+            "total_weight_kg": round(total_weight_kg, 2),
+            "volumetric_weight_kg": round(total_volumetric_kg, 2),
+            "chargeable_weight_kg": round(total_chargeable_kg, 2),
+            "cartons": total_cartons,
+            "product_total": round(total_product_cost, 2),
+            "shipping": round(total_shipping, 2),
+            "customs_total": round(totals["duties"], 2),
+            "customs_brokerage": round(customs_brokerage, 2),
+            "domestic_delivery": round(domestic_delivery, 2),
+            "fx_spread_cost": round(totals["fx"], 2),
+            "payment_fee_cost": round(totals["payment"], 2),
+            "insurance": round(totals["insurance"], 2),
+            "defect_buffer": round(totals["defect"], 2),
+            "total_landed_cost": round(totals["landed"], 2),
+            "standalone_total_landed_cost": round(totals["standalone"], 2),
+            "consolidation_savings": round(totals["standalone"] - totals["landed"], 2),
+            "de_minimis_applies": de_minimis,
+            "over_weight_limit": over_weight_limit,
+        },
+        "rate_table_version": shipping_table.stamp,
+    }
+
+
+def print_report(result: dict, top: int = 25):
+    """Print a human-readable shipment report."""
+    inp = result["input"]
+    s = result["shipment"]
+
+    print("\n" + "=" * 78)
+    print("  CONSOLIDATED SHIPMENT")
+    print("=" * 78)
+
+    method = inp["shipping_method"]
+    name = rate_tables.active().shipping.methods[method]["name"] if method else "Custom (user-provided)"
+    print(f"\n  Shipping Method:      {name}")
+    print(f"  Lines / Units:        {s['lines']} / {s['units']:,}")
+    print(f"  Total Weight:         {s['total_weight_kg']:,.2f} kg")
+    if s["chargeable_weight_kg"] != s["total_weight_kg"] or s["cartons"]:
+        cartons = f", {s['cartons']:,} cartons" if s["cartons"] else ""
+        print(f"  Chargeable Weight:    {s['chargeable_weight_kg']:,.2f} kg "
+              f"(volumetric {s['volumetric_weight_kg']:,.2f} kg{cartons})")
+    print(f"  Shared Costs Split:   by {inp['allocation']}")
+    print(f"  Rate Tables:          {result['rate_table_version']}")
+
+    print(f"\n--- Shipment Costs ---")
+    for label, key in (("Goods", "product_total"), ("Freight", "shipping"), ("Customs Duties", "customs_total"),
+                       ("Customs Brokerage", "customs_brokerage"), ("Domestic Delivery", "domestic_delivery"),
+                       ("FX Spread", "fx_spread_cost"), ("Payment Fees", "payment_fee_cost"),
+                       ("Insurance", "insurance"), ("Defect Buffer", "defect_buffer")):
+        print(f"  {label + ':':<22}${s[key]:>12,.2f}")
+    print(f"  {'TOTAL LANDED:':<22}${s['total_landed_cost']:>12,.2f}")
+    print(f"\n  Costed Separately:    ${s['standalone_total_landed_cost']:,.2f}")
+    print(f"  Consolidation Saves:  ${s['consolidation_savings']:,.2f}")
+
+    print(f"\n--- Per SKU ---")
+    print(f"  {'SKU':<18}{'Sellable':>9}{'Share':>8}{'Freight':>11}{'Landed/unit':>13}{'Alone/unit':>12}")
+    for n, line in enumerate(result["lines"][:top], start=1):
+        label = str(line.get("sku") or f"line {n}")
+        print(f"  {label[:18]:<18}{line['sellable_units']:>9}{line['allocation_share'] * 100:>7.1f}%"
+              f"{line['shipping']:>11,.2f}{line['per_unit_landed']:>13.2f}{line['standalone_per_unit_landed']:>12.2f}")
+    if len(result["lines"]) > top:
+        print(f"  ... and {len(result['lines']) - top} more")
+
+    if s["over_weight_limit"]:
+        print(f"\n  Warning: {s['total_weight_kg']:,.1f}kg exceeds this method's weight limit.")
+    if s["de_minimis_applies"]:
+        waived = " (duties waived)" if inp["waive_de_minimis"] else ""
+        print(f"\n  Note: Shipment value under ${DE_MINIMIS_THRESHOLD:,.0f} — de minimis may apply{waived}")
+    print("=" * 78 + "\n")
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Cost a multi-SKU shipment and allocate shared charges to each SKU",
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        epilog="""
+Examples:
+  Sea LCL shipment, shared costs split by weight:
+    %(prog)s manifest.csv --shipping-method sea_lcl
+
+  Split by goods value instead, JSON output:
+    %(prog)s manifest.csv --shipping-method air_freight --allocate value --json
+
+  Use the forwarder's actual quote and write per-SKU landed costs:
+    %(prog)s manifest.jsonl --shipping-override 1850 --output per_sku.csv
+        """,
+    )
+
+    parser.add_argument("input", nargs="?", default="-", help="Manifest file (default: stdin)")
+    parser.add_argument("--input-format", type=str, choices=batch_io.FORMATS, default=None,
+                       help="Input format (default: from file extension, else csv)")
+    parser.add_argument("--shipping-method", type=str, default="air_freight",
+                       choices=list(rate_tables.active().shipping.methods),
+                       help="Shipping method for the whole shipment (default: air_freight)")
+    parser.add_argument("--allocate", type=str, choices=ALLOCATIONS, default="weight",
+                       help="Split shared charges by weight or goods value (default: weight)")
+    parser.add_argument("--fx-spread", type=float, default=DEFAULT_FX_SPREAD,
+                       help=f"FX spread (%%, default: {DEFAULT_FX_SPREAD})")
+    parser.add_argument("--payment-fee", type=float, default=DEFAULT_PAYMENT_FEE,
+                       help=f"Payment platform fee (%%, default: {DEFAULT_PAYMENT_FEE})")
+    parser.add_argument("--insurance", type=float, default=DEFAULT_INSURANCE_RATE,
+                       help=f"Insurance rate (%%, default: {DEFAULT_INSURANCE_RATE})")
+    parser.add_argument("--customs-brokerage", type=float, default=DEFAULT_CUSTOMS_BROKERAGE,
+                       help=f"Customs brokerage for the shipment (default: ${DEFAULT_CUSTOMS_BROKERAGE})")
+    parser.add_argument("--domestic-delivery", type=float, default=DEFAULT_DOMESTIC_DELIVERY,
+                       help=f"Domestic delivery for the shipment (default: ${DEFAULT_DOMESTIC_DELIVERY})")
+    parser.add_argument("--shipping-override", type=float, default=None,
+                       help="Actual freight quote for the whole shipment")
+    parser.add_argument("--waive-de-minimis", action="store_true",
+                       help=f"Charge no duties if goods value is under ${DE_MINIMIS_THRESHOLD:,.0f}")
+    parser.add_argument("--as-of", type=str, default=None,
+                       help="Order date (YYYY-MM-DD); use the shipping rates in effect then")
+    parser.add_argument("--output", type=str, default=None, help="Write per-SKU lines to a CSV/JSONL file")
+    parser.add_argument("--json", action="store_true", help="Output as JSON")
+
+    args = parser.parse_args()
+
+    input_format = args.input_format or batch_io.infer_format(args.input, "csv")
+    infile = sys.stdin if args.input == "-" else open(args.input, newline="", encoding="utf-8")
+    try:
+        result = calculate_shipment(
+            batch_io.read_rows(infile, input_format),
+            shipping_method=args.shipping_method,
+            allocation=args.allocate,
+            fx_spread=args.fx_spread,
+            payment_fee=args.payment_fee,
+            insurance_rate=args.insurance,
+            customs_brokerage=args.customs_brokerage,
+            domestic_delivery=args.domestic_delivery,
+            shipping_cost_override=args.shipping_override,
+            waive_de_minimis=args.waive_de_minimis,
+            as_of=args.as_of,
+        )
+    except ValueError as e:
+        parser.error(str(e))
+    finally:
+        if infile is not sys.stdin:
+            infile.close()
+
+    if args.output:
+        output_format = batch_io.infer_format(args.output, input_format)
+        with open(args.output, "w", newline="", encoding="utf-8") as f:
+            batch_io.write_rows(result["lines"], f, output_format)
+
+    if args.json:
+        print(json.dumps(result, indent=2))
+    else:
+        print_report(result)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,307 @@
+#!/usr/bin/env python3
+"""
+Shipping Method & Order Quantity Solver
+
+Finds which shipping method is cheapest at each order quantity, and the lowest
+per-unit landed cost you can reach across a demand range.
+
+The method only changes freight and the duties charged on it: customs is assessed on
+product + freight + insurance, so landed cost is a fixed part plus freight × (1 +
+duty rates), or plain freight under de minimis, which depends on product cost alone.
+Either way it rises with freight for every method alike, so the cheapest method at a
+given quantity is still the one with the lowest base_fee + total_weight × rate_per_kg
+that can carry the weight. Those lines only cross at a handful of weights, so the
+solver computes the crossover quantities once and then reads the best method for any
+quantity off that breakpoint table — no per-method, per-quantity recalculation.
+
+Weights here are actual weights: the solver doesn't model volumetric or carton
+billing, so for bulky goods check the winner with landed_cost.py --dims.
+
+Usage:
+    python shipping_solver.py --product-cost 4.20 --weight-kg 0.5 --min-quantity 10 --max-quantity 2000
+    python shipping_solver.py --product-cost 4.20 --weight-kg 0.5 --min-quantity 10 --max-quantity 2000 \
+        --duty-rate 3.9 --section-301 7.5 --json
+"""
+
+import argparse
+import json
+import math
+
+import rate_tables
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+from landed_cost import (
+    DEFAULT_DEFECT_RATE,
+    calculate_landed_cost_record,
+    calculate_landed_cost_batch,
+)
+
+
+def _shipping_cost(method: dict, total_weight_kg: float):
+    """Freight for one method, or None if the weight exceeds its limit."""
+    if method["max_weight_kg"] and total_weight_kg > method["max_weight_kg"]:
+        return None
+    return method["base_fee"] + total_weight_kg * method["rate_per_kg"]
+
+
+def cheapest_method(quantity: int, weight_per_unit_kg: float, methods: dict = None) -> str:
+    """
+    Return the key of the cheapest method able to carry quantity units (ties go to the first listed).
+
+    Methods are ranked on actual weight (weight_per_unit_kg × quantity), not chargeable
+    weight, so for bulky goods billed on volumetric or carton weight the ranking can
+    differ from what landed_cost.py --dims charges.
+    """
+    methods = methods or rate_tables.active().shipping.methods
+    best_key, best_cost = None, math.inf
+    for key, method in methods.items():
+        cost = _shipping_cost(method, weight_per_unit_kg * quantity)
+        if cost is not None and cost < best_cost:
+            best_key, best_cost = key, cost
+    return best_key
+
+
+def method_breakpoints(weight_per_unit_kg: float, methods: dict = None) -> list:
+    """
+    Compute the quantity ranges over which each shipping method is cheapest.
+
+    Candidate breakpoints are every pairwise crossover of the methods' cost lines plus
+    every max_weight_kg limit, converted to quantities. The cheapest method can only
+    change at those points, so it is evaluated just on either side of each one.
+
+    Args:
+        weight_per_unit_kg: Weight per unit in kilograms
+        methods: Shipping rate table (default: the active rate_tables version)
+
+    Returns:
+        list of {"method", "name", "min_quantity", "max_quantity"} segments in quantity
+        order, covering every quantity from 1 up; the last max_quantity is None (unbounded).
+    """
+    if weight_per_unit_kg <= 0:
+        raise ValueError("weight_per_unit_kg must be positive")
+    methods = methods or rate_tables.active().shipping.methods
+
+    break_weights = set()
+    items = list(methods.values())
+    for i, a in enumerate(items):
+        if a["max_weight_kg"]:
+            break_weights.add(a["max_weight_kg"])
+        for b in items[i + 1:]:
+            if a["rate_per_kg"] != b["rate_per_kg"]:
+                crossover = (b["base_fee"] - a["base_fee"]) / (a["rate_per_kg"] - b["rate_per_kg"])
+                if crossover > 0:
+                    break_weights.add(crossover)
+
+    candidates = {1}
+    for weight in break_weights:
+        q = math.floor(weight / weight_per_unit_kg)
+        candidates.update(c for c in (q, q + 1) if c >= 1)
+
+    segments = []
+    for q in sorted(candidates):
+        key = cheapest_method(q, weight_per_unit_kg, methods)
+        if segments and segments[-1]["method"] == key:
+            continue
+        if segments:
+            segments[-1]["max_quantity"] = q - 1
+        segments.append({
+            "method": key,
+            "name": methods[key]["name"] if key else None,
+            "min_quantity": q,
+            "max_quantity": None,
+        })
+    return segments
+
+
+def landed_cost_frontier(
+    product_cost: float,
+    weight_per_unit_kg: float,
+    min_quantity: int,
+    max_quantity: int,
+    step: int = 1,
+    **landed_cost_kwargs,
+) -> dict:
+    """
+    Minimum landed cost at every quantity in a demand range, using the best method for each.
+
+    The method for each quantity comes from method_breakpoints(), and the whole range is
+    then costed in a single calculate_landed_cost_batch call. Requires NumPy.
+
+    Args:
+        product_cost: Per-unit cost from supplier
+        weight_per_unit_kg: Weight per unit in kilograms
+        min_quantity / max_quantity: Demand range (inclusive)
+        step: Quantity step (default 1)
+        **landed_cost_kwargs: Other calculate_landed_cost arguments (duty_rate, defect_rate...)
+
+    Returns:
+        dict with "quantity" and "shipping_method" arrays plus every batch output column
+    """
+    if np is None:
+        raise ImportError("landed_cost_frontier requires NumPy (pip install numpy)")
+
+    segments = method_breakpoints(weight_per_unit_kg)
+    starts = np.array([s["min_quantity"] for s in segments])
+    keys = np.array([s["method"] for s in segments])
+
+    quantity = np.arange(min_quantity, max_quantity + 1, step)
+    shipping_method = keys[np.searchsorted(starts, quantity, side="right") - 1]
+
+    result = calculate_landed_cost_batch(product_cost, quantity, weight_per_unit_kg,
+                                         shipping_method=shipping_method, **landed_cost_kwargs)
+    result["quantity"] = quantity
+    result["shipping_method"] = shipping_method
+    return result
+
+
+def solve(
+    product_cost: float,
+    weight_per_unit_kg: float,
+    min_quantity: int,
+    max_quantity: int,
+    **landed_cost_kwargs,
+) -> dict:
+    """
+    Breakpoint table for a demand range plus the lowest-cost order quantity.
+
+    Uses only the scalar calculator (no NumPy): each segment is costed at its two
+    ends. Within a segment per-unit landed cost falls as quantity grows (fixed fees
+    spread wider), so the best quantity is one of those ends — up to the rounding
+    of sellable_units in the defect-adjusted figure.
+
+    Returns:
+        dict with "segments" (clipped to the range, with per-unit landed costs at each
+        end), "best" (quantity, method and per-unit landed costs; None if no
+        quantity in range has sellable units) and rate_table_version.
+    """
+    if min_quantity < 1 or max_quantity < min_quantity:
+        raise ValueError("Need 1 <= min_quantity <= max_quantity")
+
+    def per_unit(q, key):
+        r = calculate_landed_cost_record(product_cost, q, weight_per_unit_kg, shipping_method=key,
+                                         quiet=True, **landed_cost_kwargs)
+        # With no sellable units the adjusted figure is reported as 0; never pick that as "best"
+        adjusted = round(r.per_unit_landed_adjusted, 2) if r.sellable_units > 0 else math.inf
+        return round(r.per_unit_landed, 2), adjusted
+
+    shipping_table = rate_tables.active().shipping
+    segments = []
+    best = None
+    for seg in method_breakpoints(weight_per_unit_kg, shipping_table.methods):
+        lo = max(seg["min_quantity"], min_quantity)
+        hi = max_quantity if seg["max_quantity"] is None else min(seg["max_quantity"], max_quantity)
+        if lo > hi:
+            continue
+        lo_cost, lo_adj = per_unit(lo, seg["method"])
+        hi_cost, hi_adj = per_unit(hi, seg["method"])
+        segments.append({
+            "method": seg["method"],
+            "name": seg["name"],
+            "min_quantity": lo,
+            "max_quantity": hi,
+            "per_unit_landed_at_min": lo_cost,
+            "per_unit_landed_at_max": hi_cost,
+        })
+        for q, cost, adj in ((lo, lo_cost, lo_adj), (hi, hi_cost, hi_adj)):
+            if adj < (best["per_unit_landed_defect_adjusted"] if best else math.inf):
+                best = {"quantity": q, "method": seg["method"], "per_unit_landed": cost,
+                        "per_unit_landed_defect_adjusted": adj}
+
+    return {
+        "input": {
+            "product_cost_per_unit": product_cost,
+            "weight_per_unit_kg": weight_per_unit_kg,
+            "min_quantity": min_quantity,
+            "max_quantity": max_quantity,
+        },
+        "segments": segments,
+        "best": best,
+        "rate_table_version": shipping_table.stamp,
+    }
+
+
+def print_report(result: dict):
+    """Print a human-readable shipping breakpoint report."""
+    inp = result["input"]
+    best = result["best"]
+
+    print("\n" + "=" * 60)
+    print("  SHIPPING METHOD SOLVER")
+    print("=" * 60)
+
+    print(f"\n  Product Cost/Unit:    ${inp['product_cost_per_unit']:.2f}")
+    print(f"  Weight/Unit:          {inp['weight_per_unit_kg']:.2f} kg")
+    print(f"  Demand Range:         {inp['min_quantity']}-{inp['max_quantity']} units")
+    print(f"  Rate Tables:          {result['rate_table_version']}")
+
+    print(f"\n--- Cheapest Method by Quantity ---")
+    for seg in result["segments"]:
+        qty = f"{seg['min_quantity']}-{seg['max_quantity']}"
+        print(f"  {qty:<14}  {seg['name']:<36} "
+              f"${seg['per_unit_landed_at_min']:.2f} -> ${seg['per_unit_landed_at_max']:.2f}/unit")
+
+    if best is None:
+        print("\n  No quantity in range yields any sellable units at this defect rate.")
+        print("=" * 60 + "\n")
+        return
+
+    print(f"\n--- Lowest Cost Order ---")
+    print(f"  Quantity:             {best['quantity']} units")
+    print(f"  Shipping Method:      {rate_tables.active().shipping.methods[best['method']]['name']}")
+    print(f"  Per Unit:             ${best['per_unit_landed']:.2f}")
+    print(f"  Per Unit (adj):       ${best['per_unit_landed_defect_adjusted']:.2f}")
+    print("=" * 60 + "\n")
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Find the cheapest shipping method at each order quantity",
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        epilog="""
+Examples:
+  Which method wins between 10 and 2000 units:
+    %(prog)s --product-cost 4.20 --weight-kg 0.5 --min-quantity 10 --max-quantity 2000
+
+  With duties, JSON output:
+    %(prog)s --product-cost 4.20 --weight-kg 0.5 --min-quantity 10 --max-quantity 2000 \\
+        --duty-rate 3.9 --section-301 7.5 --json
+        """,
+    )
+
+    parser.add_argument("--product-cost", type=float, required=True, help="Per-unit cost from supplier")
+    parser.add_argument("--weight-kg", type=float, required=True, help="Weight per unit in kilograms")
+    parser.add_argument("--min-quantity", type=int, default=1, help="Smallest order to consider (default: 1)")
+    parser.add_argument("--max-quantity", type=int, required=True, help="Largest order to consider")
+    parser.add_argument("--duty-rate", type=float, default=0.0, help="Base customs duty rate (%%, default: 0)")
+    parser.add_argument("--section-301", type=float, default=0.0, help="Section 301 tariff rate (%%, default: 0)")
+    parser.add_argument("--defect-rate", type=float, default=DEFAULT_DEFECT_RATE,
+                       help=f"Expected defect rate (%%, default: {DEFAULT_DEFECT_RATE})")
+    parser.add_argument("--json", action="store_true", help="Output as JSON")
+
+    args = parser.parse_args()
+
+    try:
+        result = solve(
+            product_cost=args.product_cost,
+            weight_per_unit_kg=args.weight_kg,
+            min_quantity=args.min_quantity,
+            max_quantity=args.max_quantity,
+            duty_rate=args.duty_rate,
+            section_301_rate=args.section_301,
+            defect_rate=args.defect_rate,
+        )
+    except ValueError as e:
+        parser.error(str(e))
+
+    if args.json:
+        print(json.dumps(result, indent=2))
+    else:
+        print_report(result)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,300 @@
+#!/usr/bin/env python3
+"""
+VeRO Brand Screen
+
+Flags listing titles and descriptions that mention brands known to file VeRO
+takedowns, using the brand list in rates/vero_brands.json (kept in step with
+references/vero-quick-ref.md). Each row gets a risk level and the terms that set it:
+
+    extreme   Counterfeit wording ("knockoff", "bootleg"), or a brand next to an
+              imitation term: "Yeti style tumbler", "inspired by Chanel", "replica Rolex"
+    high      A brand mention ("Nike running shoes"), or compatibility wording for a
+              brand that enforces on it ("case for iPhone 15")
+    moderate  Compatibility wording for a brand that enforces selectively
+              ("compatible with Samsung"), or a brand flagged as moderate risk
+    low       No listed brand or counterfeit term
+
+The whole list is compiled once into an Aho-Corasick automaton over words, so every
+term is found in a single left-to-right pass per text, whatever the number of terms.
+Matching is on whole words, ignoring case, accents and punctuation ("Ray-Ban",
+"RAY BAN" and "ray ban" all match). A screen finds risky wording, not risky products:
+a look-alike design with no brand name still needs a human look (see
+skills/compliance-guardian).
+
+deal_pipeline.py --vero-screen adds the same columns to scored deals.
+
+Usage:
+    python vero_screen.py --text "Yeti style 30oz tumbler stainless"
+    python vero_screen.py catalog.csv > screened.csv
+    python vero_screen.py titles.jsonl --text-columns title --output screened.jsonl --workers 4
+"""
+
+import argparse
+import functools
+import json
+import os
+import re
+import sys
+import unicodedata
+from collections import deque
+
+import batch_io
+import rate_tables
+
+
+VERO_TABLE_FILE = "vero_brands.json"
+
+DEFAULT_TEXT_COLUMNS = ("title", "description")
+
+# Columns appended to every screened row
+VERO_FIELDS = ["vero_risk", "vero_brands", "vero_terms"]
+
+# Term kinds
+BRAND, SAFE, COUNTERFEIT, IMITATION_BEFORE, IMITATION_AFTER, COMPATIBILITY = range(6)
+
+_WORD = re.compile(r"[a-z0-9]+")
+
+
+def tokenize(text: str) -> list:
+    """Lower-case words of text, with accents folded and punctuation dropped."""
+    text = text.lower()
+    if not text.isascii():
+        text = unicodedata.normalize("NFKD", text).encode("ascii", "ignore").decode("ascii")
+    return _WORD.findall(text)
+
+
+class VeroMatcher:
+    """
+    Compiled VeRO term list.
+
+    Terms are word sequences in a trie with Aho-Corasick failure links; scan() walks
+    a text's words once and reports every term occurrence as (first word, last word,
+    term index). screen() turns the occurrences into a risk level.
+    """
+
+    def __init__(self, table: dict):
+        self.version = table["version"]
+        self.levels = tuple(table["levels"])
+        level_codes = {name: code for code, name in enumerate(self.levels)}
+        self.brands = [entry["brand"] for entry in table["brands"]]
+        self.brand_risk = [level_codes[entry["risk"]] for entry in table["brands"]]
+        self.compatibility_risk = [level_codes[entry["compatibility_risk"]] for entry in table["brands"]]
+        self.extreme = len(self.levels) - 1
+
+        self.terms = []  # (kind, phrase, length in words, brand index or None)
+        self._goto = [{}]
+        self._fail = [0]
+        self._out = [()]
+        for phrase in table["counterfeit_terms"]:
+            self._add(phrase, COUNTERFEIT)
+        for phrase in table["imitation_terms"]["before"]:
+            self._add(phrase, IMITATION_BEFORE)
+        for phrase in table["imitation_terms"]["after"]:
+            self._add(phrase, IMITATION_AFTER)
+        for phrase in table["compatibility_terms"]:
+            self._add(phrase, COMPATIBILITY)
+        for brand, entry in enumerate(table["brands"]):
+            for phrase in entry["names"]:
+                self._add(phrase, BRAND, brand)
+            for phrase in entry.get("safe_phrases", ()):
+                self._add(phrase, SAFE, brand)
+        self._link()
+
+    def _add(self, phrase: str, kind: int, brand: int = None):
+        words = tokenize(phrase)
+        if not words:
+            raise ValueError(f"VeRO term has no words: {phrase!r}")
+        state = 0
+        for word in words:
+            nxt = self._goto[state].get(word)
+            if nxt is None:
+                nxt = self._goto[state][word] = len(self._goto)
+                self._goto.append({})
+                self._fail.append(0)
+                self._out.append(())
+            state = nxt
+        self._out[state] += (len(self.terms),)
+        self.terms.append((kind, " ".join(words), len(words), brand))
+
+    def _link(self):
+        """Breadth-first failure links; each state also reports its suffix states' terms."""
+        queue = deque(self._goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for word, nxt in self._goto[state].items():
+                queue.append(nxt)
+                fail = self._fail[state]
+                while fail and word not in self._goto[fail]:
+                    fail = self._fail[fail]
+                self._fail[nxt] = self._goto[fail].get(word, 0)
+                self._out[nxt] += self._out[self._fail[nxt]]
+
+    def scan(self, text: str) -> list:
+        """Every term occurrence in text as (first word, last word, term index)."""
+        goto, fail, out, terms = self._goto, self._fail, self._out, self.terms
+        matches = []
+        state = 0
+        for i, word in enumerate(tokenize(text)):
+            while state and word not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(word, 0)
+            if out[state]:
+                for term in out[state]:
+                    matches.append((i - terms[term][2] + 1, i, term))
+        return matches
+
+    def _classify(self, matches: list, brands: list, found: list) -> int:
+        """Risk level code for one text's matches; appends its brands and terms."""
+        terms = self.terms
+        level = 0
+        safe = [(start, end, terms[term][3]) for start, end, term in matches if terms[term][0] == SAFE]
+        before_ends = {end: term for start, end, term in matches if terms[term][0] == IMITATION_BEFORE}
+        after_starts = {start: term for start, end, term in matches if terms[term][0] == IMITATION_AFTER}
+        compatibility_ends = {}
+        for start, end, term in matches:
+            kind = terms[term][0]
+            if kind == COMPATIBILITY:
+                # The longest phrase ending here ("compatible with" over "with")
+                if end not in compatibility_ends or terms[term][2] > terms[compatibility_ends[end]][2]:
+                    compatibility_ends[end] = term
+            elif kind == COUNTERFEIT:
+                level = self.extreme
+                found.append(terms[term][1])
+
+        for start, end, term in matches:
+            kind, phrase, _, brand = terms[term]
+            if kind != BRAND:
+                continue
+            if any(s <= start and end <= e and b == brand for s, e, b in safe):
+                continue
+            qualifier = before_ends.get(start - 1)
+            if qualifier is None:
+                qualifier = after_starts.get(end + 1)
+            if qualifier is not None:
+                brand_level = self.extreme
+            else:
+                qualifier = compatibility_ends.get(start - 1)
+                brand_level = self.brand_risk[brand] if qualifier is None else self.compatibility_risk[brand]
+            level = max(level, brand_level)
+            brands.append(self.brands[brand])
+            found.append(phrase)
+            if qualifier is not None:
+                found.append(terms[qualifier][1])
+        return level
+
+    def screen(self, *texts) -> dict:
+        """Risk level, brands and matched terms across one listing's texts (blank ones skipped)."""
+        level = 0
+        brands, found = [], []
+        for text in texts:
+            if text:
+                matches = self.scan(str(text))
+                if matches:
+                    level = max(level, self._classify(matches, brands, found))
+        return {
+            "vero_risk": self.levels[level],
+            "vero_brands": "; ".join(dict.fromkeys(brands)),
+            "vero_terms": "; ".join(dict.fromkeys(found)),
+        }
+
+
+def load_table(path: str = None) -> dict:
+    """The VeRO brand table from path, or from the rate tables directory."""
+    path = path or os.path.join(rate_tables.rates_dir(), VERO_TABLE_FILE)
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
+
+
+@functools.lru_cache(maxsize=None)
+def matcher(path: str = None) -> VeroMatcher:
+    """The compiled matcher for a brand table (built once per process)."""
+    return VeroMatcher(load_table(path))
+
+
+def screen_row(row: dict, text_columns=DEFAULT_TEXT_COLUMNS) -> dict:
+    """VERO_FIELDS for one --input row, screening its text columns."""
+    return matcher().screen(*(row.get(column) for column in text_columns))
+
+
+def print_report(text: str, result: dict, version: str):
+    """Print a human-readable screen of one text."""
+    print("\n" + "=" * 60)
+    print("  VeRO BRAND SCREEN")
+    print("=" * 60)
+    print(f"\n  Text:        {text}")
+    print(f"  Risk:        {result['vero_risk'].upper()}")
+    if result["vero_brands"]:
+        print(f"  Brands:      {result['vero_brands']}")
+        print(f"  Terms:       {result['vero_terms']}")
+    elif result["vero_terms"]:
+        print(f"  Terms:       {result['vero_terms']}")
+    print(f"\n  Brand List: vero_brands@{version}")
+    print("=" * 60 + "\n")
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Screen listing titles and descriptions for VeRO brand risk",
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        epilog="""
+Examples:
+  Check one title:
+    %(prog)s --text "Yeti style 30oz tumbler stainless"
+
+  Screen a candidate catalog (title and description columns):
+    %(prog)s catalog.csv > screened.csv
+
+  Titles only, JSONL, on 4 cores:
+    %(prog)s titles.jsonl --text-columns title --output screened.jsonl --workers 4
+        """,
+    )
+
+    parser.add_argument("input", nargs="?", default="-", help="Input file (default: stdin)")
+    parser.add_argument("--text", type=str, default=None, help="Screen this text instead of a file")
+    parser.add_argument("--text-columns", type=str, default=",".join(DEFAULT_TEXT_COLUMNS),
+                       help=f"Columns to screen (default: {','.join(DEFAULT_TEXT_COLUMNS)})")
+    parser.add_argument("--output", type=str, default="-", help="Output file (default: stdout)")
+    parser.add_argument("--input-format", type=str, choices=batch_io.FORMATS, default=None,
+                       help="Input format (default: from file extension, else csv)")
+    parser.add_argument("--output-format", type=str, choices=batch_io.FORMATS, default=None,
+                       help="Output format (default: from file extension, else same as input)")
+    parser.add_argument("--workers", type=int, default=1,
+                       help="Worker processes; >1 splits the file into chunks (default: 1)")
+    parser.add_argument("--chunk-size", type=int, default=batch_io.DEFAULT_CHUNK_SIZE,
+                       help=f"Rows per worker chunk (default: {batch_io.DEFAULT_CHUNK_SIZE})")
+    parser.add_argument("--json", action="store_true", help="Output as JSON (with --text)")
+
+    args = parser.parse_args()
+
+    try:
+        compiled = matcher()
+    except (OSError, KeyError, ValueError) as e:
+        parser.error(f"Can't load the VeRO brand list: {e}")
+
+    if args.text is not None:
+        result = compiled.screen(args.text)
+        if args.json:
+            print(json.dumps({"text": args.text, **result, "vero_list_version": compiled.version}, indent=2))
+        else:
+            print_report(args.text, result, compiled.version)
+        return
+
+    text_columns = tuple(column.strip() for column in args.text_columns.split(",") if column.strip())
+    if not text_columns:
+        parser.error("--text-columns needs at least one column")
+    count = batch_io.run_rows(
+        functools.partial(screen_row, text_columns=text_columns),
+        VERO_FIELDS,
+        input_path=args.input,
+        output_path=args.output,
+        input_format=args.input_format,
+        output_format=args.output_format,
+        workers=args.workers,
+        chunk_size=args.chunk_size,
+    )
+
+    print(f"Screened {count} rows against vero_brands@{compiled.version}", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,219 @@
+#!/usr/bin/env python3
+"""
+Calculator Server
+
+Keeps the landed cost and margin calculators resident in one process and answers
+JSON requests over localhost HTTP, so repeated questions don't each pay for a fresh
+interpreter start and argparse setup. Standard library only.
+
+Endpoints (POST a JSON object of calculator arguments, named as in the Python API):
+    POST /landed-cost   -> same JSON as landed_cost.py --json
+    POST /margin        -> same JSON as margin_calculator.py --json
+    POST /deal          -> landed cost piped into margin (deal_pipeline.py columns)
+    GET  /stats         -> request counts, errors and p50/p99 latency per endpoint
+    GET  /health        -> {"status": "ok", "rate_table_version": ...}
+
+The rate files (rates/*.json, see rate_tables.py) are checked every --rates-interval
+seconds; an edited or newly effective version is swapped in without a restart, and
+each response's rate_table_version says which one was used.
+
+Usage:
+    python calc_server.py                      # listens on 127.0.0.1:8765
+    python calc_server.py --port 9000
+    curl -s localhost:8765/landed-cost -d '{"product_cost": 4.2, "quantity": 200, "weight_per_unit_kg": 0.5}'
+    curl -s localhost:8765/stats
+"""
+
+import argparse
+import json
+import sys
+import threading
+import time
+import traceback
+from collections import deque
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import batch_io
+import rate_tables
+from deal_pipeline import deal_row
+from landed_cost import LANDED_COST_FIELDS, calculate_landed_cost
+from margin_calculator import MARGIN_FIELDS, calculate_margin
+
+
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_PORT = 8765
+LATENCY_WINDOW = 10000  # Most recent requests kept per endpoint for percentiles
+
+
+def _landed_cost(body: dict) -> dict:
+    return calculate_landed_cost(**batch_io.calculator_kwargs(body, LANDED_COST_FIELDS), quiet=True)
+
+
+def _margin(body: dict) -> dict:
+    return calculate_margin(**batch_io.calculator_kwargs(body, MARGIN_FIELDS))
+
+
+ROUTES = {
+    "/landed-cost": _landed_cost,
+    "/margin": _margin,
+    "/deal": deal_row,
+}
+
+
+class LatencyStats:
+    """Thread-safe per-endpoint request counter with a sliding latency window."""
+
+    def __init__(self, window: int = LATENCY_WINDOW):
+        self._lock = threading.Lock()
+        self._window = window
+        self._endpoints = {}
+        self.started = time.time()
+
+    def record(self, endpoint: str, seconds: float, ok: bool):
+        with self._lock:
+            stats = self._endpoints.get(endpoint)
+            if stats is None:
+                stats = self._endpoints[endpoint] = {"requests": 0, "errors": 0,
+                                                     "latencies": deque(maxlen=self._window)}
+            stats["requests"] += 1
+            if not ok:
+                stats["errors"] += 1
+            stats["latencies"].append(seconds)
+
+    def snapshot(self) -> dict:
+        """Return counts and latency percentiles (in milliseconds) per endpoint."""
+        with self._lock:
+            endpoints = {name: (s["requests"], s["errors"], sorted(s["latencies"]))
+                         for name, s in self._endpoints.items()}
+        result = {"uptime_s": round(time.time() - self.started, 1), "endpoints": {}}
+        for name, (requests, errors, latencies) in endpoints.items():
+            result["endpoints"][name] = {
+                "requests": requests,
+                "errors": errors,
+                "p50_ms": round(_percentile(latencies, 50) * 1000, 3),
+                "p99_ms": round(_percentile(latencies, 99) * 1000, 3),
+                "max_ms": round(latencies[-1] * 1000, 3) if latencies else 0.0,
+            }
+        return result
+
+
+def _percentile(sorted_values: list, pct: float) -> float:
+    """Nearest-rank percentile of an already sorted list (0 for an empty list)."""
+    if not sorted_values:
+        return 0.0
+    rank = max(1, -(-len(sorted_values) * pct // 100))
+    return sorted_values[int(rank) - 1]
+
+
+class CalculatorHandler(BaseHTTPRequestHandler):
+    """Routes JSON requests to the calculators; stats live on the server object."""
+
+    server_version = "ArbitrageCalc/1.0"
+
+    def do_GET(self):
+        if self.path == "/stats":
+            self._send(200, self.server.stats.snapshot())
+        elif self.path == "/health":
+            self._send(200, {"status": "ok", "rate_table_version": rate_tables.active().version})
+        else:
+            self._send(404, {"error": f"Unknown endpoint: {self.path}"})
+
+    def do_POST(self):
+        handler = ROUTES.get(self.path)
+        if handler is None:
+            self._send(404, {"error": f"Unknown endpoint: {self.path}. Options: {', '.join(ROUTES)}"})
+            return
+
+        start = time.perf_counter()
+        try:
+            length = int(self.headers.get("Content-Length", 0))
+            body = json.loads(self.rfile.read(length) or b"{}")
+            if not isinstance(body, dict):
+                raise ValueError("Request body must be a JSON object")
+            status, payload = 200, handler(body)
+        except (json.JSONDecodeError, *batch_io.ROW_ERRORS) as e:
+            status, payload = 400, {"error": str(e)}
+        except Exception as e:
+            # A calculator bug must still answer in JSON, count as a failed request and
+            # reach stderr; --verbose only governs the access log
+            self._log_exception()
+            status, payload = 500, {"error": f"Internal error: {e}"}
+        self.server.stats.record(self.path, time.perf_counter() - start, status == 200)
+        self._send(status, payload)
+
+    def _send(self, status: int, payload: dict):
+        data = json.dumps(payload).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, format, *args):
+        if self.server.verbose:
+            super().log_message(format, *args)
+
+    def _log_exception(self):
+        """Write the exception being handled, with its traceback, to stderr."""
+        sys.stderr.write(f"{self.address_string()} - - [{self.log_date_time_string()}] "
+                         f"Error handling POST {self.path}\n{traceback.format_exc()}")
+
+
+def make_server(host: str = DEFAULT_HOST, port: int = DEFAULT_PORT, verbose: bool = False) -> ThreadingHTTPServer:
+    """Create (but don't start) a calculator server bound to host:port."""
+    server = ThreadingHTTPServer((host, port), CalculatorHandler)
+    server.stats = LatencyStats()
+    server.verbose = verbose
+    return server
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Serve the landed cost and margin calculators over localhost HTTP",
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        epilog="""
+Examples:
+  Start the server:
+    %(prog)s --port 8765
+
+  Landed cost, margin and full deal requests:
+    curl -s localhost:8765/landed-cost -d '{"product_cost": 4.2, "quantity": 200, "weight_per_unit_kg": 0.5}'
+    curl -s localhost:8765/margin -d '{"sale_price": 29.99, "cogs": 8.5, "shipping_cost": 4.5}'
+    curl -s localhost:8765/deal -d '{"product_cost": 4.2, "quantity": 200, "weight_per_unit_kg": 0.5, "sale_price": 29.99}'
+
+  Request counts and p50/p99 latency:
+    curl -s localhost:8765/stats
+
+  Rate files in another directory, checked every 30s:
+    EBAY_ARBITRAGE_RATES_DIR=/srv/rates %(prog)s --rates-interval 30
+        """,
+    )
+
+    parser.add_argument("--host", type=str, default=DEFAULT_HOST, help=f"Bind address (default: {DEFAULT_HOST})")
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT, help=f"Port (default: {DEFAULT_PORT})")
+    parser.add_argument("--rates-interval", type=float, default=rate_tables.DEFAULT_WATCH_INTERVAL,
+                       help=f"Seconds between rate file checks; 0 disables hot reload "
+                            f"(default: {rate_tables.DEFAULT_WATCH_INTERVAL})")
+    parser.add_argument("--verbose", action="store_true", help="Log every request to stderr")
+
+    args = parser.parse_args()
+
+    watcher = None
+    if args.rates_interval > 0:
+        watcher = rate_tables.RateTableWatcher(args.rates_interval)
+        watcher.start()
+
+    server = make_server(args.host, args.port, verbose=args.verbose)
+    print(f"Calculator server listening on http://{args.host}:{args.port} (rate tables {rate_tables.active().version})", file=sys.stderr)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        if watcher is not None:
+            watcher.stop()
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,418 @@
+#!/usr/bin/env python3
+"""
+Cash Conversion Cycle Simulator
+
+Landed cost and margin say what a deal earns per unit; they don't say how long the
+money is gone. This script runs a whole catalog of SKUs through a year (or any horizon)
+of purchase orders and tracks every dollar: supplier and freight paid on the order day,
+stock in transit for the method's transit time (transit_days in
+rates/shipping_rates.json), a few days to receive and list, sales at each SKU's daily
+velocity, and eBay payouts landing a few days after each sale. It reports the daily
+cash position and the annualized ROI you get from each shipping method.
+
+Each SKU reorders its usual quantity whenever stock on hand plus stock on the way
+drops to its reorder point (daily sales × (lead time + safety days)). Orders from many
+SKUs are in flight at once and draw on one cash pool; with --cash, an order that the
+pool can't cover waits until payouts come in, most profitable SKUs first.
+
+The simulation is a day-bucketed event calendar: arrivals and payouts are scheduled
+into per-day slots when an order is placed or a sale is made, and each simulated day is
+a handful of NumPy operations across all SKUs at once, so a year of a 500-SKU operation
+over every shipping method takes well under a second. Without --seed, transit times
+are the midpoint of each method's range and sales are the expected daily velocity;
+with --seed, each order's transit time is drawn from the range and daily sales are
+Poisson. Requires NumPy.
+
+Results per method:
+    capital            Starting cash (--cash), or the peak cash the plan needs if unlimited
+    profit             Ending cash + inventory at landed cost + payouts not yet received,
+                       minus capital
+    annualized ROI     profit / capital, scaled to 365 days
+    cash conversion    Average dollars tied up in stock and pending payouts, in days of
+                       landed cost sold
+
+Input columns (CSV header or JSONL keys) are the deal_pipeline.py columns, plus:
+    daily_sales   Expected units sold per day while in stock (required)
+    sku           Optional label
+quantity is the reorder quantity; shipping_method is ignored (every method is simulated).
+SKUs a method can't carry (over its weight limit) or that lose money under it are not
+stocked in that method's run.
+
+Usage:
+    python cash_cycle.py skus.csv
+    python cash_cycle.py skus.csv --cash 20000 --payout-days 28 --days 730
+    python cash_cycle.py skus.jsonl --methods air_freight,sea_lcl --seed 7 --json
+"""
+
+import argparse
+import csv
+import json
+import sys
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+import batch_io
+import rate_tables
+from deal_pipeline import DEAL_MARGIN_FIELDS
+from landed_cost import LANDED_COST_FIELDS, calculate_landed_cost_record
+from margin_calculator import calculate_margin_record
+
+
+DEFAULT_DAYS = 365
+DEFAULT_PROCESSING_DAYS = 4  # Receive, inspect, photograph, list
+DEFAULT_PAYOUT_DAYS = 7  # Sale -> ship -> delivery -> funds released (new sellers: add ~21)
+DEFAULT_SAFETY_DAYS = 7  # Extra days of sales covered by the reorder point
+
+# Every method is simulated, so the row's own method is not passed through
+SKU_LANDED_FIELDS = {name: kind for name, kind in LANDED_COST_FIELDS.items() if name != "shipping_method"}
+
+
+def sku_economics(row: dict, method: str, shipping_table) -> dict:
+    """
+    Per-order and per-unit cash flows of one SKU shipped by one method.
+
+    Returns:
+        dict with order_cost (total landed cost of one reorder, paid on the order day),
+        sellable_units, unit_cost (landed cost per sellable unit), cash_per_sale (eBay
+        payout net of fees, buyer shipping, packaging and returns), shippable (False if
+        one reorder exceeds the method's weight limit) and profitable (a sale pays back
+        more than the unit's landed cost)
+    """
+    landed = calculate_landed_cost_record(shipping_method=method, quiet=True,
+                                          **batch_io.calculator_kwargs(row, SKU_LANDED_FIELDS))
+    unit_cost = round(landed.per_unit_landed_adjusted, 2)
+    margin = calculate_margin_record(cogs=unit_cost, **batch_io.calculator_kwargs(row, DEAL_MARGIN_FIELDS))
+    max_weight = shipping_table.methods[method]["max_weight_kg"]
+    return {
+        "order_cost": landed.total_landed,
+        "sellable_units": landed.sellable_units,
+        "unit_cost": unit_cost,
+        "cash_per_sale": margin.net_profit + unit_cost,
+        "shippable": not (max_weight and landed.total_weight_kg > max_weight) and landed.sellable_units > 0,
+        "profitable": margin.net_profit > 0,
+    }
+
+
+def simulate(
+    skus: list,
+    daily_sales,
+    transit_days: tuple,
+    days: int = DEFAULT_DAYS,
+    cash: float = None,
+    processing_days: int = DEFAULT_PROCESSING_DAYS,
+    payout_days: int = DEFAULT_PAYOUT_DAYS,
+    safety_days: int = DEFAULT_SAFETY_DAYS,
+    seed: int = None,
+) -> dict:
+    """
+    Simulate one shipping method for a catalog of SKUs.
+
+    Args:
+        skus: sku_economics() dict per SKU, all for the same method
+        daily_sales: Expected units sold per day, per SKU
+        transit_days: (min, max) door-to-door days for the method
+        days: Horizon in days
+        cash: Starting cash; None means unlimited (capital = peak cash needed)
+        processing_days: Days from arrival until units can sell
+        payout_days: Days from sale until the payout is in the bank
+        safety_days: Extra days of sales covered by each SKU's reorder point
+        seed: Random seed for sampled transit times and Poisson sales (None = expected values)
+
+    Returns:
+        dict of summary figures plus "cash_position", the cash on hand at the end of each day
+    """
+    n = len(skus)
+    order_cost = np.array([s["order_cost"] for s in skus], dtype=float)
+    sellable = np.array([s["sellable_units"] for s in skus], dtype=float)
+    unit_cost = np.array([s["unit_cost"] for s in skus], dtype=float)
+    cash_per_sale = np.array([s["cash_per_sale"] for s in skus], dtype=float)
+    shippable = np.array([s["shippable"] for s in skus], dtype=bool)
+    profitable = np.array([s["profitable"] for s in skus], dtype=bool)
+    daily = np.asarray(daily_sales, dtype=float)
+
+    # When cash is short, the most profitable SKUs reorder first
+    priority = np.argsort(-(cash_per_sale - unit_cost) / np.where(unit_cost > 0, unit_cost, np.inf), kind="stable")
+    order_cost, sellable, unit_cost, cash_per_sale, shippable, profitable, daily = (
+        a[priority] for a in (order_cost, sellable, unit_cost, cash_per_sale, shippable, profitable, daily))
+    # Nobody restocks a SKU the method can't carry or that loses money on every sale
+    active = shippable & profitable
+
+    low, high = transit_days
+    lead = (low + high) // 2 + processing_days
+    reorder_point = daily * (lead + safety_days)
+    rng = np.random.default_rng(seed) if seed is not None else None
+
+    # Event calendar: units becoming sellable and payouts arriving, by day
+    horizon = days + high + processing_days + payout_days + 1
+    arrivals = np.zeros((horizon, n))
+    payouts = np.zeros(horizon)
+
+    on_hand = np.zeros(n)
+    pipeline = np.zeros(n)  # Ordered, not yet sellable
+    balance = 0.0 if cash is None else float(cash)
+    cash_position = np.empty(days)
+    tied_up = np.empty(days)  # Landed cost in stock and transit plus payouts pending
+    cogs_sold = units_sold = lost_sales = 0.0
+    orders_placed = order_days_delayed = 0
+
+    for day in range(days):
+        balance += payouts[day]
+        landed_today = arrivals[day]
+        on_hand += landed_today
+        pipeline -= landed_today
+
+        demand = rng.poisson(daily) if rng is not None else daily
+        sales = np.minimum(on_hand, demand)
+        on_hand -= sales
+        lost_sales += (demand - sales)[active].sum()
+        units_sold += sales.sum()
+        cogs_sold += sales @ unit_cost
+        payouts[day + payout_days] += sales @ cash_per_sale
+
+        reorder = np.flatnonzero(active & (on_hand + pipeline <= reorder_point))
+        if reorder.size:
+            if cash is not None:
+                # Fund the longest prefix (in priority order) the pool can cover
+                funded = np.cumsum(order_cost[reorder]) <= balance
+                order_days_delayed += reorder.size - funded.sum()
+                reorder = reorder[funded]
+            if rng is not None:
+                order_lead = rng.integers(low, high + 1, reorder.size) + processing_days
+            else:
+                order_lead = lead
+            arrivals[day + order_lead, reorder] += sellable[reorder]
+            pipeline[reorder] += sellable[reorder]
+            balance -= order_cost[reorder].sum()
+            orders_placed += reorder.size
+
+        cash_position[day] = balance
+        tied_up[day] = (on_hand + pipeline) @ unit_cost + payouts[day + 1:].sum()
+
+    capital = float(cash) if cash is not None else max(0.0, -cash_position.min())
+    if cash is None:
+        cash_position += capital
+    inventory_value = float((on_hand + pipeline) @ unit_cost)
+    receivables = float(payouts[days:].sum())
+    profit = float(cash_position[-1]) + inventory_value + receivables - capital
+
+    return {
+        "capital": round(capital, 2),
+        "min_cash": round(float(cash_position.min()), 2),
+        "ending_cash": round(float(cash_position[-1]), 2),
+        "inventory_value": round(inventory_value, 2),
+        "receivables": round(receivables, 2),
+        "profit": round(profit, 2),
+        "annualized_roi_pct": round(profit / capital * 365 / days * 100, 1) if capital > 0 else 0.0,
+        "cash_conversion_days": round(tied_up.mean() / (cogs_sold / days), 1) if cogs_sold > 0 else None,
+        "orders_placed": int(orders_placed),
+        "order_days_delayed": int(order_days_delayed),
+        "units_sold": round(units_sold, 1),
+        "lost_sales_units": round(float(lost_sales), 1),
+        "unshippable_skus": int((~shippable).sum()),
+        "unprofitable_skus": int((shippable & ~profitable).sum()),
+        "cash_position": cash_position,
+    }
+
+
+def run_simulation(rows, methods: list = None, days: int = DEFAULT_DAYS, cash: float = None,
+                   processing_days: int = DEFAULT_PROCESSING_DAYS, payout_days: int = DEFAULT_PAYOUT_DAYS,
+                   safety_days: int = DEFAULT_SAFETY_DAYS, seed: int = None) -> dict:
+    """
+    Cost every SKU row under each shipping method and simulate each method.
+
+    Rows that cannot be costed are listed under "skipped" with their error instead of
+    stopping the run.
+
+    Returns:
+        dict with "input", "methods" (summary per method, best annualized ROI first),
+        "daily_cash" ({method: list of end-of-day cash}), "skipped" and rate_table_version
+    """
+    if np is None:
+        raise ImportError("cash_cycle requires NumPy (pip install numpy)")
+    if days < 1:
+        raise ValueError("days must be at least 1")
+
+    shipping_table = rate_tables.active().shipping
+    methods = methods or [key for key, m in shipping_table.methods.items() if m["transit_days"]]
+    for key in methods:
+        if key not in shipping_table.methods:
+            raise ValueError(f"Unknown shipping method: {key}. Options: {', '.join(shipping_table.methods)}")
+        if not shipping_table.methods[key]["transit_days"]:
+            raise ValueError(f"No transit_days for shipping method {key} in {shipping_table.stamp}")
+
+    economics = {key: [] for key in methods}
+    daily_sales, skipped = [], []
+    for n, row in enumerate(rows, start=1):
+        try:
+            value = row.get("daily_sales")
+            if value is None or value == "":
+                raise ValueError("SKU needs daily_sales")
+            daily = batch_io.coerce(value, float)
+            costed = {key: sku_economics(row, key, shipping_table) for key in methods}
+        except batch_io.ROW_ERRORS as e:
+            skipped.append({"row": n, "sku": row.get("sku"), "error": str(e)})
+            continue
+        daily_sales.append(daily)
+        for key in methods:
+            economics[key].append(costed[key])
+    if not daily_sales:
+        raise ValueError("No SKUs could be costed")
+
+    summaries, daily_cash = [], {}
+    for key in methods:
+        method = shipping_table.methods[key]
+        result = simulate(economics[key], daily_sales, method["transit_days"], days=days, cash=cash,
+                          processing_days=processing_days, payout_days=payout_days,
+                          safety_days=safety_days, seed=seed)
+        daily_cash[key] = [round(float(c), 2) for c in result.pop("cash_position")]
+        summaries.append({"method": key, "name": method["name"], "transit_days": list(method["transit_days"]),
+                          **result})
+    summaries.sort(key=lambda s: -s["annualized_roi_pct"])
+
+    return {
+        "input": {
+            "skus": len(daily_sales),
+            "days": days,
+            "cash": cash,
+            "processing_days": processing_days,
+            "payout_days": payout_days,
+            "safety_days": safety_days,
+            "seed": seed,
+        },
+        "methods": summaries,
+        "daily_cash": daily_cash,
+        "skipped": skipped,
+        "rate_table_version": rate_tables.active().version,
+    }
+
+
+def write_daily_cash(result: dict, path: str):
+    """Write the daily cash position as CSV: one row per day, one column per method."""
+    methods = list(result["daily_cash"])
+    with open(path, "w", newline="", encoding="utf-8") as f:
+        writer = csv.writer(f)
+        writer.writerow(["day"] + methods)
+        for day, values in enumerate(zip(*(result["daily_cash"][m] for m in methods)), start=1):
+            writer.writerow([day] + list(values))
+
+
+def print_report(result: dict):
+    """Print a human-readable cash cycle report."""
+    inp = result["input"]
+
+    print("\n" + "=" * 78)
+    print("  CASH CONVERSION CYCLE")
+    print("=" * 78)
+
+    print(f"\n  SKUs:                 {inp['skus']} ({len(result['skipped'])} skipped)")
+    print(f"  Horizon:              {inp['days']} days" + (f" (seed {inp['seed']})" if inp["seed"] is not None else ""))
+    print(f"  Starting Cash:        " + (f"${inp['cash']:,.2f}" if inp["cash"] is not None else "unlimited (peak need)"))
+    print(f"  Lead Times:           +{inp['processing_days']} days to list, "
+          f"+{inp['payout_days']} days to payout")
+    print(f"  Rate Tables:          {result['rate_table_version']}")
+
+    print(f"\n--- By Shipping Method ---")
+    print(f"  {'Method':<22}{'Transit':>9}{'Capital':>14}{'Profit':>14}{'Ann. ROI':>10}{'CCC days':>9}")
+    for s in result["methods"]:
+        transit = f"{s['transit_days'][0]}-{s['transit_days'][1]}d"
+        ccc = f"{s['cash_conversion_days']:.0f}" if s["cash_conversion_days"] is not None else "-"
+        print(f"  {s['method']:<22}{transit:>9}{s['capital']:>14,.2f}{s['profit']:>14,.2f}"
+              f"{s['annualized_roi_pct']:>9.1f}%{ccc:>9}")
+        notes = []
+        if s["unshippable_skus"]:
+            notes.append(f"{s['unshippable_skus']} SKUs over weight limit")
+        if s["unprofitable_skus"]:
+            notes.append(f"{s['unprofitable_skus']} SKUs unprofitable, not stocked")
+        if s["order_days_delayed"]:
+            notes.append(f"{s['order_days_delayed']} order-days waiting for cash")
+        if notes:
+            print(f"  {'':<22}({'; '.join(notes)})")
+
+    best = result["methods"][0]
+    series = result["daily_cash"][best["method"]]
+    print(f"\n--- Cash Position: {best['name']} ---")
+    for day in list(range(30, len(series) + 1, 30)) or [len(series)]:
+        print(f"  Day {day:<5} ${series[day - 1]:>14,.2f}")
+    print(f"  Lowest    ${best['min_cash']:>14,.2f}")
+
+    if result["skipped"]:
+        print(f"\n--- Skipped ---")
+        for item in result["skipped"][:10]:
+            print(f"  Row {item['row']}: {item['error']}")
+    print("=" * 78 + "\n")
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Simulate cash flow and annualized ROI of a SKU catalog by shipping method",
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        epilog="""
+Examples:
+  One year, unlimited cash, every shipping method:
+    %(prog)s skus.csv
+
+  $20k of starting cash, new-seller payout hold, two years:
+    %(prog)s skus.csv --cash 20000 --payout-days 28 --days 730
+
+  Air vs. sea with sampled transit times and sales, JSON output:
+    %(prog)s skus.jsonl --methods air_freight,sea_lcl --seed 7 --json
+        """,
+    )
+
+    parser.add_argument("input", nargs="?", default="-", help="SKU file (default: stdin)")
+    parser.add_argument("--input-format", type=str, choices=batch_io.FORMATS, default=None,
+                       help="Input format (default: from file extension, else csv)")
+    parser.add_argument("--methods", type=str, default=None,
+                       help="Comma-separated shipping methods (default: every method with transit days)")
+    parser.add_argument("--days", type=int, default=DEFAULT_DAYS, help=f"Horizon in days (default: {DEFAULT_DAYS})")
+    parser.add_argument("--cash", type=float, default=None,
+                       help="Starting cash (default: unlimited, capital = peak cash needed)")
+    parser.add_argument("--processing-days", type=int, default=DEFAULT_PROCESSING_DAYS,
+                       help=f"Days from arrival to listed (default: {DEFAULT_PROCESSING_DAYS})")
+    parser.add_argument("--payout-days", type=int, default=DEFAULT_PAYOUT_DAYS,
+                       help=f"Days from sale to payout (default: {DEFAULT_PAYOUT_DAYS})")
+    parser.add_argument("--safety-days", type=int, default=DEFAULT_SAFETY_DAYS,
+                       help=f"Extra days of sales in the reorder point (default: {DEFAULT_SAFETY_DAYS})")
+    parser.add_argument("--seed", type=int, default=None,
+                       help="Sample transit times and daily sales with this seed (default: expected values)")
+    parser.add_argument("--daily-output", type=str, default=None, help="Write the daily cash position to a CSV file")
+    parser.add_argument("--json", action="store_true", help="Output as JSON")
+
+    args = parser.parse_args()
+
+    if np is None:
+        parser.error("cash_cycle.py requires NumPy (pip install numpy)")
+
+    input_format = args.input_format or batch_io.infer_format(args.input, "csv")
+    infile = sys.stdin if args.input == "-" else open(args.input, newline="", encoding="utf-8")
+    try:
+        result = run_simulation(
+            batch_io.read_rows(infile, input_format),
+            methods=args.methods.split(",") if args.methods else None,
+            days=args.days,
+            cash=args.cash,
+            processing_days=args.processing_days,
+            payout_days=args.payout_days,
+            safety_days=args.safety_days,
+            seed=args.seed,
+        )
+    except ValueError as e:
+        parser.error(str(e))
+    finally:
+        if infile is not sys.stdin:
+            infile.close()
+
+    if args.daily_output:
+        write_daily_cash(result, args.daily_output)
+
+    if args.json:
+        print(json.dumps(result, indent=2))
+    else:
+        print_report(result)
+
+
+if __name__ == "__main__":
+    main()
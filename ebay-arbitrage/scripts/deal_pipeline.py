@@ -0,0 +1,225 @@
+#!/usr/bin/env python3
+"""
+Deal Evaluation Pipeline
+
+Scores a whole catalog of candidate deals in one process. Each row is run through
+calculate_landed_cost(), and the resulting per-unit landed cost is fed straight into
+calculate_margin() as COGS — the same two steps the evaluate-deal workflow does by hand.
+
+Rows are read, scored and written one at a time, so memory use stays flat no matter
+how large the input is. With --workers N the catalog is split into chunks scored on a
+process pool; output order still matches input order.
+
+Input columns (CSV header or JSONL keys) use the calculator argument names:
+    Landed cost: product_cost, quantity, weight_per_unit_kg (required), shipping_method,
+                 duty_rate, section_301_rate, fx_spread, payment_fee, insurance_rate,
+                 customs_brokerage, domestic_delivery, defect_rate, shipping_cost_override
+    Packing:     length_cm, width_cm, height_cm (packaged unit), carton_length_cm,
+                 carton_width_cm, carton_height_cm, carton_weight_kg — freight is
+                 billed on chargeable (dimensional) weight when given
+    Margin:      sale_price (required), shipping_cost, category, fvf_override,
+                 promoted_rate, return_rate, international, packaging_cost,
+                 return_shipping_cost
+    Both:        as_of (order date, YYYY-MM-DD) — cost and score under the rates in
+                 effect then instead of today's
+    Pricing:     price_tiers ("50:4.80,200:4.20,1000:3.60") in place of product_cost —
+                 the unit price is the tier the row's quantity falls in
+Any other columns (SKU, supplier URL, notes...) are passed through unchanged.
+
+With --vero-screen, the title and description columns are also screened against the
+VeRO brand list (see vero_screen.py) and vero_risk, vero_brands and vero_terms are
+added to each row.
+
+With --cache PATH (or EBAY_ARBITRAGE_CACHE set), each row's costing is stored in a
+SQLite result cache (see result_cache.py) and reused by later runs for rows whose
+inputs, rates and code haven't changed, so re-scoring a mostly unchanged catalog only
+calculates the new or edited rows.
+
+Usage:
+    python deal_pipeline.py catalog.csv > scored.csv
+    python deal_pipeline.py catalog.jsonl --output scored.jsonl --workers 8
+    python deal_pipeline.py catalog.csv --vero-screen > scored.csv
+    python deal_pipeline.py catalog.csv --cache ~/.cache/ebay-arbitrage.sqlite > scored.csv
+    cat catalog.csv | python deal_pipeline.py --input-format csv --output-format jsonl
+"""
+
+import argparse
+import sys
+from functools import partial
+
+import batch_io
+import result_cache
+import vero_screen
+from landed_cost import LANDED_COST_FIELDS, calculate_landed_cost_record
+from margin_calculator import MARGIN_FIELDS, calculate_margin_record, get_assessment
+from price_tiers import resolve_product_cost
+
+
+# cogs comes from the landed cost step, not from the row
+DEAL_MARGIN_FIELDS = {name: kind for name, kind in MARGIN_FIELDS.items() if name != "cogs"}
+
+# Columns appended to every output row
+OUTPUT_FIELDS = [
+    "total_landed_cost",
+    "per_unit_landed",
+    "per_unit_landed_defect_adjusted",
+    "sellable_units",
+    "multiplier_from_listing_price",
+    "total_ebay_fees",
+    "net_profit",
+    "net_margin_pct",
+    "roi_pct",
+    "breakeven_price",
+    "assessment",
+    "rate_table_version",
+]
+
+
+# Every calculator input of a deal, for the result cache key
+DEAL_FIELDS = {**LANDED_COST_FIELDS, **DEAL_MARGIN_FIELDS}
+
+
+def deal_row(row: dict, defect_adjusted: bool = False, vero_columns: tuple = None, cache_path: str = None) -> dict:
+    """
+    Run one candidate deal through landed cost and margin.
+
+    Args:
+        row: Input fields (see module docstring)
+        defect_adjusted: Use per_unit_landed_defect_adjusted as COGS instead of per_unit_landed
+        vero_columns: Text columns to screen for VeRO brands (None = don't screen)
+        cache_path: Result cache file to reuse costings from (None = always calculate)
+
+    Returns:
+        dict of OUTPUT_FIELDS for the deal, plus vero_screen.VERO_FIELDS when screening
+    """
+    row = resolve_product_cost(row)
+    if cache_path is None:
+        result = deal_costs(row, defect_adjusted)
+    else:
+        kwargs = batch_io.calculator_kwargs(row, DEAL_FIELDS)
+        kwargs["defect_adjusted"] = defect_adjusted
+        result = result_cache.open_cache(cache_path).call(
+            "deal_row", lambda: deal_costs(row, defect_adjusted), kwargs, kwargs.get("as_of"))
+    if vero_columns:
+        result.update(vero_screen.screen_row(row, vero_columns))
+    return result
+
+
+def deal_costs(row: dict, defect_adjusted: bool = False) -> dict:
+    """OUTPUT_FIELDS for one deal row (product_cost already resolved)."""
+    landed = calculate_landed_cost_record(**batch_io.calculator_kwargs(row, LANDED_COST_FIELDS), quiet=True)
+    per_unit_landed = round(landed.per_unit_landed, 2)
+    per_unit_landed_adjusted = round(landed.per_unit_landed_adjusted, 2)
+    cogs = per_unit_landed_adjusted if defect_adjusted else per_unit_landed
+    margin = calculate_margin_record(cogs=cogs, **batch_io.calculator_kwargs(row, DEAL_MARGIN_FIELDS))
+    net_margin = margin.net_margin
+    roi = margin.roi
+
+    return {
+        "total_landed_cost": round(landed.total_landed, 2),
+        "per_unit_landed": per_unit_landed,
+        "per_unit_landed_defect_adjusted": per_unit_landed_adjusted,
+        "sellable_units": landed.sellable_units,
+        "multiplier_from_listing_price": round(landed.multiplier, 2),
+        "total_ebay_fees": round(margin.total_ebay_fees, 2),
+        "net_profit": round(margin.net_profit, 2),
+        "net_margin_pct": round(net_margin, 1),
+        "roi_pct": round(roi, 1),
+        "breakeven_price": round(margin.breakeven_price, 2),
+        "assessment": get_assessment(net_margin, roi),
+        "rate_table_version": f"{margin.rate_table_version},{landed.rate_table_version}",
+    }
+
+
+def evaluate_deal(row: dict, defect_adjusted: bool = False) -> dict:
+    """
+    Score one deal row: the input row plus OUTPUT_FIELDS and an "error" column.
+
+    A row that cannot be scored gets an error message instead of results, so one
+    bad line doesn't stop the whole catalog.
+    """
+    return batch_io.apply_row(partial(deal_row, defect_adjusted=defect_adjusted), row, OUTPUT_FIELDS)
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Score a catalog of deals: landed cost piped into margin, one row at a time",
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        epilog="""
+Examples:
+  Score a supplier catalog (CSV in, CSV out):
+    %(prog)s catalog.csv > scored.csv
+
+  JSONL in, JSONL out:
+    %(prog)s catalog.jsonl --output scored.jsonl
+
+  Read from stdin, using the defect-adjusted landed cost as COGS:
+    cat catalog.csv | %(prog)s --input-format csv --defect-adjusted
+
+  Large catalog on 8 cores:
+    %(prog)s catalog.csv --output scored.csv --workers 8
+
+  Also flag VeRO brand risk in the title and description:
+    %(prog)s catalog.csv --vero-screen > scored.csv
+
+  Nightly re-score that only calculates new or changed rows:
+    %(prog)s catalog.csv --cache ~/.cache/ebay-arbitrage.sqlite > scored.csv
+        """,
+    )
+
+    parser.add_argument("input", nargs="?", default="-", help="Input file (default: stdin)")
+    parser.add_argument("--output", type=str, default="-", help="Output file (default: stdout)")
+    parser.add_argument("--input-format", type=str, choices=batch_io.FORMATS, default=None,
+                       help="Input format (default: from file extension, else csv)")
+    parser.add_argument("--output-format", type=str, choices=batch_io.FORMATS, default=None,
+                       help="Output format (default: from file extension, else same as input)")
+    parser.add_argument("--defect-adjusted", action="store_true",
+                       help="Use the defect-adjusted per-unit landed cost as COGS")
+    parser.add_argument("--vero-screen", action="store_true",
+                       help="Add VeRO brand risk columns, screening the --vero-columns text")
+    parser.add_argument("--vero-columns", type=str, default=",".join(vero_screen.DEFAULT_TEXT_COLUMNS),
+                       help=f"Text columns for --vero-screen (default: {','.join(vero_screen.DEFAULT_TEXT_COLUMNS)})")
+    parser.add_argument("--workers", type=int, default=1,
+                       help="Worker processes; >1 splits the catalog into chunks (default: 1)")
+    parser.add_argument("--chunk-size", type=int, default=batch_io.DEFAULT_CHUNK_SIZE,
+                       help=f"Rows per worker chunk (default: {batch_io.DEFAULT_CHUNK_SIZE})")
+    parser.add_argument("--cache", type=str, default=None,
+                       help=f"Reuse costings stored in this SQLite file (default: ${result_cache.CACHE_ENV}, if set)")
+
+    args = parser.parse_args()
+
+    try:
+        cache = result_cache.for_cli(args.cache)
+    except ValueError as e:
+        parser.error(str(e))
+
+    vero_columns = None
+    output_fields = OUTPUT_FIELDS
+    if args.vero_screen:
+        vero_columns = tuple(column.strip() for column in args.vero_columns.split(",") if column.strip())
+        try:
+            vero_screen.matcher()
+        except (OSError, KeyError, ValueError) as e:
+            parser.error(f"Can't load the VeRO brand list: {e}")
+        output_fields = OUTPUT_FIELDS + vero_screen.VERO_FIELDS
+
+    count = batch_io.run_rows(
+        partial(deal_row, defect_adjusted=args.defect_adjusted, vero_columns=vero_columns,
+                cache_path=cache.path if cache is not None else None),
+        output_fields,
+        input_path=args.input,
+        output_path=args.output,
+        input_format=args.input_format,
+        output_format=args.output_format,
+        workers=args.workers,
+        chunk_size=args.chunk_size,
+    )
+
+    print(f"Scored {count} deals", file=sys.stderr)
+    if cache is not None and args.workers <= 1:
+        print(f"Result cache: {cache.stats['hits']} hits, {cache.stats['misses']} misses ({cache.path})",
+              file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
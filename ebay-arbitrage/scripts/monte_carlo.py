@@ -0,0 +1,314 @@
+#!/usr/bin/env python3
+"""
+Monte Carlo Deal Risk
+
+Defect rates, return rates, FX spread and freight are point estimates in the
+calculators, but in reality they swing by supplier and season. This script samples
+any of those inputs from distributions you give it, runs each draw through the
+vectorized landed cost → margin chain, and reports the spread of outcomes:
+P5/P50/P95 net profit, margin and ROI, plus the probability of losing money.
+
+Draws are generated and evaluated in fixed-size chunks: the ~20 intermediate cost
+columns only ever exist for one chunk, and each outcome is folded into a fixed-size
+log-bucket histogram plus a running sum, so memory stays flat however many draws
+you ask for. Percentiles are accurate to 0.01% of the value (or half a cent). The
+same --seed and --chunk-size always reproduce the same results. Requires NumPy.
+
+Distributions (--vary NAME=SPEC):
+    uniform:LOW:HIGH
+    normal:MEAN:SD               (clipped at 0)
+    triangular:LOW:MODE:HIGH
+    lognormal:MEDIAN:SIGMA
+NAME is any numeric calculator argument (defect_rate, return_rate, fx_spread,
+duty_rate, sale_price, ...) or freight_multiplier, which scales the calculated
+freight cost (1.0 = the shipping rate table as listed).
+
+Usage:
+    python monte_carlo.py --set product_cost=4.20 --set quantity=200 --set weight_per_unit_kg=0.5 \
+        --set sale_price=29.99 --set shipping_cost=4.50 \
+        --vary defect_rate=triangular:2:4:12 --vary return_rate=uniform:5:15 \
+        --vary freight_multiplier=lognormal:1:0.25 --draws 200000 --seed 42
+"""
+
+import argparse
+import json
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+import batch_io
+import packing
+import rate_tables
+from deal_pipeline import DEAL_MARGIN_FIELDS
+from landed_cost import LANDED_COST_FIELDS, calculate_landed_cost_batch
+from margin_calculator import calculate_margin_batch
+
+
+DEFAULT_DRAWS = 100000
+DEFAULT_CHUNK_SIZE = 50000
+PERCENTILES = (5, 50, 95)
+RELATIVE_ACCURACY = 0.0001  # Percentiles are within 0.01% of the true value
+ZERO_BAND = 0.005  # Outcomes within half a cent of zero share one bucket
+MAX_MAGNITUDE = 1e7  # Outcomes beyond this are counted in the outermost bucket
+
+# Parameters of each distribution, in the order they appear in a spec string
+DISTRIBUTIONS = {
+    "uniform": ("low", "high"),
+    "normal": ("mean", "sd"),
+    "triangular": ("low", "mode", "high"),
+    "lognormal": ("median", "sigma"),
+}
+
+DEAL_FIELDS = {**LANDED_COST_FIELDS, **DEAL_MARGIN_FIELDS}
+
+
+def parse_distribution(spec: str) -> tuple:
+    """Parse "kind:p1:p2[:p3]" into (kind, tuple of float parameters)."""
+    kind, *params = spec.split(":")
+    if kind not in DISTRIBUTIONS:
+        raise ValueError(f"Unknown distribution: {kind}. Options: {', '.join(DISTRIBUTIONS)}")
+    if len(params) != len(DISTRIBUTIONS[kind]):
+        raise ValueError(f"{kind} takes {len(DISTRIBUTIONS[kind])} parameters: "
+                         f"{':'.join(DISTRIBUTIONS[kind])}")
+    return kind, tuple(float(p) for p in params)
+
+
+def sample(rng, kind: str, params: tuple, size: int):
+    """Draw size samples from one distribution; all inputs are non-negative, so clip at 0."""
+    if kind == "uniform":
+        draws = rng.uniform(params[0], params[1], size)
+    elif kind == "normal":
+        draws = rng.normal(params[0], params[1], size)
+    elif kind == "triangular":
+        draws = rng.triangular(params[0], params[1], params[2], size)
+    else:
+        draws = rng.lognormal(np.log(params[0]), params[1], size)
+    return np.maximum(draws, 0.0)
+
+
+class OutcomeSketch:
+    """
+    Streaming summary of one outcome metric: count, sum, min/max and a signed
+    log-bucket histogram of fixed size.
+
+    Bucket k > 0 holds (ZERO_BAND * gamma^(k-1), ZERO_BAND * gamma^k] with
+    gamma = (1 + accuracy) / (1 - accuracy), bucket -k its negative mirror and bucket
+    0 everything within ZERO_BAND of zero, so bucket order is value order and a
+    quantile is one cumulative-count search.
+    """
+
+    def __init__(self, accuracy: float = RELATIVE_ACCURACY):
+        self.gamma = (1 + accuracy) / (1 - accuracy)
+        self.max_key = int(np.ceil(np.log(MAX_MAGNITUDE / ZERO_BAND) / np.log(self.gamma)))
+        self.counts = np.zeros(2 * self.max_key + 1, dtype=np.int64)
+        self.count = 0
+        self.total = 0.0
+        self.min = np.inf
+        self.max = -np.inf
+
+    def add(self, values):
+        """Fold an array of outcomes into the summary."""
+        magnitude = np.abs(values)
+        keys = np.zeros(values.shape, dtype=np.int64)
+        outside = magnitude > ZERO_BAND
+        keys[outside] = np.ceil(np.log(magnitude[outside] / ZERO_BAND) / np.log(self.gamma))
+        keys = np.sign(values).astype(np.int64) * np.minimum(keys, self.max_key)
+        self.counts += np.bincount(keys + self.max_key, minlength=self.counts.size)
+        self.count += values.size
+        self.total += float(values.sum())
+        self.min = min(self.min, float(values.min()))
+        self.max = max(self.max, float(values.max()))
+
+    def mean(self) -> float:
+        return self.total / self.count
+
+    def percentiles(self, ps) -> list:
+        """Values at the percentiles ps (each 0-100)."""
+        cumulative = np.cumsum(self.counts)
+        ranks = np.asarray(ps, dtype=float) / 100 * (self.count - 1)
+        keys = np.searchsorted(cumulative, ranks, side="right") - self.max_key
+        values = np.sign(keys) * ZERO_BAND * 2 * self.gamma ** np.abs(keys) / (self.gamma + 1)
+        return [float(v) for v in np.clip(values, self.min, self.max)]
+
+
+def simulate_chunk(fixed: dict, varied: dict, rng, size: int) -> dict:
+    """
+    Evaluate one chunk of draws through landed cost and margin.
+
+    Args:
+        fixed: Calculator arguments held constant (landed cost and margin, minus cogs)
+        varied: {name: (kind, params)} distributions to sample
+        rng: numpy Generator
+        size: Number of draws in this chunk
+
+    Returns:
+        dict of net_profit, net_margin_pct, roi_pct and per_unit_landed arrays, plus
+        the rate_table_version string
+    """
+    args = dict(fixed)
+    for name, (kind, params) in varied.items():
+        args[name] = sample(rng, kind, params, size)
+
+    freight_multiplier = args.pop("freight_multiplier", None)
+    landed_args = {k: v for k, v in args.items() if k in LANDED_COST_FIELDS}
+    margin_args = {k: v for k, v in args.items() if k in DEAL_MARGIN_FIELDS}
+
+    if freight_multiplier is not None and "shipping_cost_override" not in landed_args:
+        method = rate_tables.active().shipping_on(landed_args.get("as_of")).methods[landed_args.get("shipping_method", "air_freight")]
+        _, _, chargeable_weight_kg, _ = packing.chargeable_weight_batch(
+            landed_args["quantity"], landed_args["weight_per_unit_kg"], method["volumetric_divisor"] or np.inf,
+            tuple(landed_args.get(name) for name in ("length_cm", "width_cm", "height_cm")),
+            tuple(landed_args.get(name) for name in ("carton_length_cm", "carton_width_cm", "carton_height_cm")),
+            landed_args.get("carton_weight_kg", 0.0),
+        )
+        landed_args["shipping_cost_override"] = (
+            (method["base_fee"] + chargeable_weight_kg * method["rate_per_kg"]) * freight_multiplier
+        )
+
+    landed = calculate_landed_cost_batch(**landed_args)
+    # Cents, as deal_pipeline passes it on, so simulated profits match the pipeline's
+    per_unit_landed = np.round(landed["per_unit_landed"], 2)
+    margin = calculate_margin_batch(cogs=per_unit_landed, **margin_args)
+    size_shape = (size,)
+    return {
+        "per_unit_landed": np.broadcast_to(per_unit_landed, size_shape),
+        "net_profit": np.broadcast_to(margin["net_profit"], size_shape),
+        "net_margin_pct": np.broadcast_to(margin["net_margin_pct"], size_shape),
+        "roi_pct": np.broadcast_to(margin["roi_pct"], size_shape),
+        "rate_table_version": f"{margin['rate_table_version']},{landed['rate_table_version']}",
+    }
+
+
+def run_simulation(
+    fixed: dict,
+    varied: dict,
+    draws: int = DEFAULT_DRAWS,
+    seed: int = None,
+    chunk_size: int = DEFAULT_CHUNK_SIZE,
+) -> dict:
+    """
+    Run a Monte Carlo simulation of one deal.
+
+    Each chunk's four outcome columns are folded into an OutcomeSketch per metric
+    and a loss counter, then discarded with the rest of the chunk, so memory does
+    not grow with draws.
+
+    Returns:
+        dict with per-metric mean and P5/P50/P95, plus probability_of_loss and the
+        rate_table_version of the last chunk
+    """
+    if np is None:
+        raise ImportError("run_simulation requires NumPy (pip install numpy)")
+    if draws < 1:
+        raise ValueError(f"draws must be at least 1, got {draws}")
+    if chunk_size < 1:
+        raise ValueError(f"chunk_size must be at least 1, got {chunk_size}")
+    unknown = [name for name in list(fixed) + list(varied)
+               if name not in DEAL_FIELDS and name != "freight_multiplier"]
+    if unknown:
+        raise ValueError(f"Unknown deal input: {unknown[0]}. Options: {', '.join(DEAL_FIELDS)}, freight_multiplier")
+
+    rng = np.random.default_rng(seed)
+    outcomes = {}
+    losses = 0
+    done = 0
+    while done < draws:
+        size = min(chunk_size, draws - done)
+        chunk = simulate_chunk(fixed, varied, rng, size)
+        version = chunk.pop("rate_table_version")
+        for metric, values in chunk.items():
+            outcomes.setdefault(metric, OutcomeSketch()).add(values)
+        losses += int(np.count_nonzero(chunk["net_profit"] < 0))
+        done += size
+
+    summary = {"draws": draws, "seed": seed, "metrics": {}}
+    for metric, sketch in outcomes.items():
+        summary["metrics"][metric] = {
+            "mean": round(sketch.mean(), 2),
+            **{f"p{p}": round(v, 2) for p, v in zip(PERCENTILES, sketch.percentiles(PERCENTILES))},
+        }
+    summary["probability_of_loss"] = round(losses / draws, 4)
+    summary["rate_table_version"] = version
+    return summary
+
+
+def print_report(result: dict):
+    """Print a human-readable risk report."""
+    metrics = result["metrics"]
+
+    print("\n" + "=" * 60)
+    print("  MONTE CARLO DEAL RISK")
+    print("=" * 60)
+
+    print(f"\n  Draws:                {result['draws']:,}" + (f" (seed {result['seed']})" if result["seed"] is not None else ""))
+
+    print(f"\n--- Outcomes (per unit sold) ---")
+    print(f"  {'':<20}{'P5':>10}{'P50':>10}{'P95':>10}{'Mean':>10}")
+    for label, metric, unit in (("Landed Cost", "per_unit_landed", "$"), ("Net Profit", "net_profit", "$"),
+                                ("Net Margin", "net_margin_pct", "%"), ("ROI", "roi_pct", "%")):
+        m = metrics[metric]
+        cells = [f"{'$' if unit == '$' else ''}{m[k]:.2f}{'%' if unit == '%' else ''}"
+                 for k in ("p5", "p50", "p95", "mean")]
+        print(f"  {label:<20}" + "".join(f"{c:>10}" for c in cells))
+
+    print(f"\n  Probability of Loss:  {result['probability_of_loss'] * 100:.1f}%")
+    print(f"  Rate Tables:          {result['rate_table_version']}")
+    print("=" * 60 + "\n")
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Monte Carlo risk analysis of a deal's landed cost and margin",
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        epilog="""
+Examples:
+  Uncertain defect rate, return rate and freight:
+    %(prog)s --set product_cost=4.20 --set quantity=200 --set weight_per_unit_kg=0.5 \\
+        --set sale_price=29.99 --set shipping_cost=4.50 \\
+        --vary defect_rate=triangular:2:4:12 --vary return_rate=uniform:5:15 \\
+        --vary freight_multiplier=lognormal:1:0.25 --seed 42
+
+  Sale price uncertainty, 1M draws, JSON output:
+    %(prog)s --set product_cost=4.20 --set quantity=200 --set weight_per_unit_kg=0.5 \\
+        --set shipping_cost=4.50 --vary sale_price=normal:29.99:3 --draws 1000000 --json
+        """,
+    )
+
+    parser.add_argument("--set", type=str, action="append", default=[], metavar="NAME=VALUE",
+                       help="Fixed deal input (repeatable); needs product_cost, quantity, weight_per_unit_kg, sale_price")
+    parser.add_argument("--vary", type=str, action="append", default=[], metavar="NAME=SPEC",
+                       help="Sampled input, e.g. defect_rate=triangular:2:4:12 (repeatable)")
+    parser.add_argument("--draws", type=int, default=DEFAULT_DRAWS, help=f"Number of draws (default: {DEFAULT_DRAWS})")
+    parser.add_argument("--chunk-size", type=int, default=DEFAULT_CHUNK_SIZE,
+                       help=f"Draws evaluated per chunk (default: {DEFAULT_CHUNK_SIZE})")
+    parser.add_argument("--seed", type=int, default=None, help="Random seed for reproducible runs")
+    parser.add_argument("--json", action="store_true", help="Output as JSON")
+
+    args = parser.parse_args()
+
+    if np is None:
+        parser.error("monte_carlo.py requires NumPy (pip install numpy)")
+
+    try:
+        fixed = {}
+        for item in args.set:
+            name, value = item.split("=", 1)
+            fixed[name] = batch_io.coerce(value, DEAL_FIELDS.get(name, float))
+        varied = {}
+        for item in args.vary:
+            name, spec = item.split("=", 1)
+            varied[name] = parse_distribution(spec)
+        result = run_simulation(fixed, varied, draws=args.draws, seed=args.seed, chunk_size=args.chunk_size)
+    except (TypeError, ValueError, KeyError) as e:
+        parser.error(str(e))
+
+    if args.json:
+        print(json.dumps(result, indent=2))
+    else:
+        print_report(result)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,189 @@
+"""
+Dimensional Weight and Carton Packing
+
+Air and express carriers bill the greater of actual weight and dimensional
+(volumetric) weight: length × width × height in cm divided by the method's
+volumetric divisor (6000 for air cargo, 5000 for express couriers). A pillow that
+weighs 0.3kg but ships in a 40×40×15cm bag bills as 4kg by air. Each shipping method
+in rates/shipping_rates.json carries its volumetric_divisor; null means the method
+doesn't bill by volume.
+
+Orders ship in cartons, not loose units. Given the unit package and the carton
+dimensions, units_per_carton() finds how many units fit on a grid (best of the six
+axis-aligned orientations) and the shipment is billed on its cartons — their
+dimensional weight, and the units' weight plus each carton's own tare weight.
+
+    Unit dims only:   chargeable = max(units × unit weight, units × unit volumetric weight)
+    With carton dims: chargeable = max(units × unit weight + cartons × carton weight,
+                                       cartons × carton volumetric weight)
+    Neither:          chargeable = units × unit weight (the plain actual-weight model)
+
+The scalar functions back calculate_landed_cost(); the *_batch functions take NumPy
+arrays and back calculate_landed_cost_batch() and DealGraph, step for step.
+Not meant to be run directly.
+"""
+
+import itertools
+import math
+
+# NumPy is imported inside the *_batch functions, so the scalar path never pays for it
+
+
+# The six ways to align a box's edges with a carton's edges
+ORIENTATIONS = tuple(itertools.permutations(range(3)))
+
+FIT_TOLERANCE = 1e-9  # So 30cm / 7.5cm counts as exactly 4
+
+
+def parse_dims(text: str) -> tuple:
+    """(length, width, height) in cm from "40x30x20" (also "40*30*20" or "40,30,20")."""
+    parts = [p for p in str(text).lower().replace("*", "x").replace(",", "x").split("x") if p.strip()]
+    if len(parts) != 3:
+        raise ValueError(f"Dimensions must be LxWxH in cm (e.g. 40x30x20), got {text!r}")
+    dims = tuple(float(p) for p in parts)
+    if min(dims) <= 0:
+        raise ValueError(f"Dimensions must be positive, got {text!r}")
+    return dims
+
+
+def _given(dims) -> bool:
+    """True if all three dimensions are given; False if none are; ValueError if only some."""
+    present = [d is not None and d == d and d > 0 for d in dims]  # d == d rules out NaN
+    if all(present):
+        return True
+    if any(present):
+        raise ValueError(f"Need all three dimensions (length, width, height), got {dims}")
+    return False
+
+
+def volumetric_weight_kg(length_cm: float, width_cm: float, height_cm: float, divisor) -> float:
+    """Dimensional weight of one box; 0 if the method has no volumetric divisor."""
+    if not divisor:
+        return 0.0
+    return length_cm * width_cm * height_cm / divisor
+
+
+def units_per_carton(unit_dims: tuple, carton_dims: tuple) -> int:
+    """Units that fit in one carton, stacked on a grid in the best single orientation."""
+    best = 0
+    for order in ORIENTATIONS:
+        fit = 1
+        for axis, unit_axis in enumerate(order):
+            fit *= math.floor(carton_dims[axis] / unit_dims[unit_axis] + FIT_TOLERANCE)
+        best = max(best, fit)
+    return best
+
+
+def chargeable_weight(
+    quantity: int,
+    weight_per_unit_kg: float,
+    volumetric_divisor,
+    unit_dims: tuple = (None, None, None),
+    carton_dims: tuple = (None, None, None),
+    carton_weight_kg: float = 0.0,
+) -> tuple:
+    """
+    Billable weight of a shipment.
+
+    Returns (total_weight_kg, volumetric_weight_kg, chargeable_weight_kg, cartons).
+    total_weight_kg is the actual gross weight (including carton tare); cartons is 0
+    when no carton dimensions are given. Without any dimensions the result is the
+    plain actual-weight model: chargeable = total = weight_per_unit_kg × quantity.
+    """
+    total_weight_kg = weight_per_unit_kg * quantity
+    has_unit = _given(unit_dims)
+    if _given(carton_dims):
+        if not has_unit:
+            raise ValueError("Carton dimensions need the unit package dimensions too")
+        per_carton = units_per_carton(unit_dims, carton_dims)
+        if per_carton == 0:
+            raise ValueError(f"A {'x'.join(f'{d:g}' for d in unit_dims)}cm unit doesn't fit in a "
+                             f"{'x'.join(f'{d:g}' for d in carton_dims)}cm carton")
+        cartons = -(-quantity // per_carton)
+        total_weight_kg = total_weight_kg + cartons * carton_weight_kg
+        volumetric = cartons * volumetric_weight_kg(*carton_dims, volumetric_divisor)
+    elif has_unit:
+        cartons = 0
+        volumetric = quantity * volumetric_weight_kg(*unit_dims, volumetric_divisor)
+    else:
+        return total_weight_kg, 0.0, total_weight_kg, 0
+    return total_weight_kg, volumetric, max(total_weight_kg, volumetric), cartons
+
+
+def _given_batch(dims, shape):
+    """Per-row (given, partial) masks for three dimension columns (NaN or <= 0 means missing)."""
+    import numpy as np
+    present = [np.broadcast_to(np.asarray(d, dtype=float) > 0, shape) for d in dims]
+    given = present[0] & present[1] & present[2]
+    return given, (present[0] | present[1] | present[2]) & ~given
+
+
+def units_per_carton_batch(unit_dims, carton_dims):
+    """Vectorized units_per_carton() over (length, width, height) column triples."""
+    import numpy as np
+    unit = [np.asarray(d, dtype=float) for d in unit_dims]
+    carton = [np.asarray(d, dtype=float) for d in carton_dims]
+    with np.errstate(divide="ignore", invalid="ignore"):
+        # fits[i][j]: whole unit edges j along carton edge i
+        fits = [[np.floor(carton[i] / unit[j] + FIT_TOLERANCE) for j in range(3)] for i in range(3)]
+        best = None
+        for order in ORIENTATIONS:
+            fit = fits[0][order[0]] * fits[1][order[1]] * fits[2][order[2]]
+            best = fit if best is None else np.fmax(best, fit)
+    return np.nan_to_num(best, nan=0.0, posinf=0.0)
+
+
+def chargeable_weight_batch(
+    quantity,
+    weight_per_unit_kg,
+    volumetric_divisor,
+    unit_dims=(None, None, None),
+    carton_dims=(None, None, None),
+    carton_weight_kg=0.0,
+) -> tuple:
+    """
+    Vectorized chargeable_weight(). Requires NumPy.
+
+    Dimensions are columns (or scalars) where NaN, None or 0 means not given.
+    volumetric_divisor is inf where a method doesn't bill by volume. Returns
+    (total_weight_kg, volumetric_weight_kg, chargeable_weight_kg, cartons) arrays,
+    and raises ValueError for the first row with partial dimensions, carton
+    dimensions without unit dimensions, or a unit that doesn't fit its carton.
+    """
+    try:
+        import numpy as np
+    except ImportError:
+        raise ImportError("chargeable_weight_batch requires NumPy (pip install numpy)") from None
+
+    quantity = np.asarray(quantity, dtype=float)
+    total_weight_kg = np.asarray(weight_per_unit_kg, dtype=float) * quantity
+    unit_dims = [np.nan if d is None else d for d in unit_dims]
+    carton_dims = [np.nan if d is None else d for d in carton_dims]
+    shape = np.broadcast_shapes(total_weight_kg.shape, np.shape(volumetric_divisor),
+                                *(np.shape(d) for d in unit_dims), *(np.shape(d) for d in carton_dims),
+                                np.shape(carton_weight_kg))
+
+    has_unit, unit_partial = _given_batch(unit_dims, shape)
+    has_carton, carton_partial = _given_batch(carton_dims, shape)
+    if unit_partial.any() or carton_partial.any():
+        raise ValueError("Need all three dimensions (length, width, height) "
+                         f"in row {int(np.argmax(unit_partial | carton_partial))}")
+    if (has_carton & ~has_unit).any():
+        raise ValueError("Carton dimensions need the unit package dimensions too "
+                         f"(row {int(np.argmax(has_carton & ~has_unit))})")
+    if not has_unit.any():
+        total_weight_kg = np.broadcast_to(total_weight_kg, shape)
+        return total_weight_kg, np.zeros(shape), total_weight_kg, np.zeros(shape, dtype=np.int64)
+
+    per_carton = units_per_carton_batch(unit_dims, carton_dims)
+    if (has_carton & (per_carton == 0)).any():
+        raise ValueError(f"Unit doesn't fit in its carton (row {int(np.argmax(has_carton & (per_carton == 0)))})")
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        cartons = np.where(has_carton, np.ceil(quantity / per_carton), 0.0)
+    unit_volume = unit_dims[0] * np.asarray(unit_dims[1], dtype=float) * unit_dims[2]
+    carton_volume = carton_dims[0] * np.asarray(carton_dims[1], dtype=float) * carton_dims[2]
+    volumetric = np.where(has_carton, cartons * (carton_volume / volumetric_divisor),
+                          np.where(has_unit, quantity * (unit_volume / volumetric_divisor), 0.0))
+    total_weight_kg = np.where(has_carton, total_weight_kg + cartons * carton_weight_kg, total_weight_kg)
+    return total_weight_kg, volumetric, np.fmax(total_weight_kg, volumetric), cartons.astype(np.int64)
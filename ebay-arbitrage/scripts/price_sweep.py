@@ -0,0 +1,170 @@
+#!/usr/bin/env python3
+"""
+Price Sweep / Sensitivity Grid
+
+Evaluates the margin or landed cost calculators over a 2-D grid of two inputs —
+e.g. sale_price × promoted_rate, or quantity × shipping_method — in one vectorized
+pass, and prints the chosen metric as a compact matrix. Use it to pick a listing
+price or order size instead of re-running the CLI once per combination.
+
+Requires NumPy.
+
+Usage:
+    python price_sweep.py margin --rows sale_price=19.99:39.99:1 --cols promoted_rate=0,2,5,8 \
+        --set cogs=8.50 --set shipping_cost=4.50 --metric net_profit
+    python price_sweep.py landed-cost --rows quantity=50:1000:50 \
+        --cols shipping_method=air_parcel,air_freight,sea_lcl \
+        --set product_cost=4.20 --set weight_per_unit_kg=0.5 --metric per_unit_landed
+"""
+
+import argparse
+import json
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+import batch_io
+from landed_cost import LANDED_COST_FIELDS, calculate_landed_cost_batch
+from margin_calculator import MARGIN_FIELDS, calculate_margin_batch
+
+
+CALCULATORS = {
+    "margin": (calculate_margin_batch, MARGIN_FIELDS),
+    "landed-cost": (calculate_landed_cost_batch, LANDED_COST_FIELDS),
+}
+
+
+def sweep_grid(batch_fn, row_param: str, row_values, col_param: str, col_values, **fixed) -> dict:
+    """
+    Evaluate a batch calculator over every (row value, column value) pair.
+
+    The two swept inputs are broadcast as a column and a row vector, so the whole
+    grid is one call to the batch calculator rather than one call per cell.
+
+    Args:
+        batch_fn: calculate_margin_batch or calculate_landed_cost_batch
+        row_param / col_param: Calculator argument names to sweep
+        row_values / col_values: 1-D sequences of values for each
+        **fixed: Every other calculator argument, held constant across the grid
+
+    Returns:
+        dict of 2-D arrays (len(row_values) × len(col_values)), one per output column
+    """
+    if row_param == col_param:
+        raise ValueError(f"Cannot sweep {row_param} against itself")
+    row_values = np.asarray(row_values)
+    col_values = np.asarray(col_values)
+    fixed[row_param] = row_values.reshape(-1, 1)
+    fixed[col_param] = col_values.reshape(1, -1)
+    return batch_fn(**fixed)
+
+
+def sweep_margin(row_param: str, row_values, col_param: str, col_values, **fixed) -> dict:
+    """Margin columns (net_profit, net_margin_pct, roi_pct, ...) over a 2-D input grid."""
+    return sweep_grid(calculate_margin_batch, row_param, row_values, col_param, col_values, **fixed)
+
+
+def sweep_landed_cost(row_param: str, row_values, col_param: str, col_values, **fixed) -> dict:
+    """Landed cost columns (per_unit_landed, total_landed_cost, ...) over a 2-D input grid."""
+    return sweep_grid(calculate_landed_cost_batch, row_param, row_values, col_param, col_values, **fixed)
+
+
+def parse_axis(spec: str, fields: dict) -> tuple:
+    """
+    Parse an axis spec: "name=start:stop:step" (inclusive range) or "name=v1,v2,...".
+
+    Returns (name, list of values coerced to the calculator argument type).
+    """
+    name, sep, values = spec.partition("=")
+    if not sep or name not in fields:
+        raise ValueError(f"Bad axis '{spec}'. Use name=start:stop:step or name=v1,v2 with one of: "
+                         f"{', '.join(fields)}")
+    kind = fields[name]
+    if ":" in values:
+        start, stop, step = (float(v) for v in values.split(":"))
+        if step == 0 or (stop - start) * step < 0:
+            raise ValueError(f"Bad axis '{spec}': step must be non-zero and go from start toward stop")
+        count = int(round((stop - start) / step)) + 1
+        return name, [batch_io.coerce(round(start + i * step, 10), kind) for i in range(count)]
+    return name, [batch_io.coerce(v, kind) for v in values.split(",")]
+
+
+def format_matrix(grid: dict, metric: str, row_param: str, row_values, col_param: str, col_values,
+                  fmt: str = "csv", decimals: int = 2) -> str:
+    """Render one metric of a sweep as CSV (row label column + one column per col value) or JSON."""
+    matrix = np.round(np.asarray(grid[metric], dtype=float), decimals)
+    if fmt == "json":
+        return json.dumps({
+            "metric": metric,
+            "rows": {row_param: list(row_values)},
+            "cols": {col_param: list(col_values)},
+            "values": matrix.tolist(),
+            "rate_table_version": np.asarray(grid["rate_table_version"]).tolist(),
+        })
+    lines = [",".join([f"{row_param}\\{col_param}"] + [str(v) for v in col_values])]
+    for label, values in zip(row_values, matrix):
+        lines.append(",".join([str(label)] + [f"{v:.{decimals}f}" for v in values]))
+    return "\n".join(lines)
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Sweep two calculator inputs over a grid and print one metric as a matrix",
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        epilog="""
+Examples:
+  Net profit by sale price and promoted rate:
+    %(prog)s margin --rows sale_price=19.99:39.99:1 --cols promoted_rate=0,2,5,8 \\
+        --set cogs=8.50 --set shipping_cost=4.50 --metric net_profit
+
+  ROI by sale price and return rate, electronics:
+    %(prog)s margin --rows sale_price=25:60:5 --cols return_rate=5,10,15,20 \\
+        --set cogs=15 --set shipping_cost=6 --set category=electronics --metric roi_pct
+
+  Per-unit landed cost by quantity and shipping method:
+    %(prog)s landed-cost --rows quantity=50:1000:50 \\
+        --cols shipping_method=air_parcel,air_freight,sea_lcl,express_dhl \\
+        --set product_cost=4.20 --set weight_per_unit_kg=0.5 --metric per_unit_landed
+        """,
+    )
+
+    parser.add_argument("calculator", choices=list(CALCULATORS), help="Which calculator to sweep")
+    parser.add_argument("--rows", type=str, required=True, help="Row axis: name=start:stop:step or name=v1,v2,...")
+    parser.add_argument("--cols", type=str, required=True, help="Column axis: name=start:stop:step or name=v1,v2,...")
+    parser.add_argument("--set", type=str, action="append", default=[], metavar="NAME=VALUE",
+                       help="Hold a calculator argument fixed (repeatable)")
+    parser.add_argument("--metric", type=str, default=None,
+                       help="Output column to print (default: net_profit / per_unit_landed)")
+    parser.add_argument("--decimals", type=int, default=2, help="Decimal places (default: 2)")
+    parser.add_argument("--json", action="store_true", help="Output as JSON instead of CSV matrix")
+
+    args = parser.parse_args()
+
+    if np is None:
+        parser.error("price_sweep.py requires NumPy (pip install numpy)")
+
+    batch_fn, fields = CALCULATORS[args.calculator]
+    metric = args.metric or ("net_profit" if args.calculator == "margin" else "per_unit_landed")
+    try:
+        row_param, row_values = parse_axis(args.rows, fields)
+        col_param, col_values = parse_axis(args.cols, fields)
+        fixed = dict(s.split("=", 1) for s in args.set)
+        unknown = [name for name in fixed if name not in fields]
+        if unknown:
+            raise ValueError(f"Unknown argument for --set: {unknown[0]}. Options: {', '.join(fields)}")
+        fixed = batch_io.calculator_kwargs(fixed, fields)
+        grid = sweep_grid(batch_fn, row_param, row_values, col_param, col_values, **fixed)
+    except (TypeError, ValueError) as e:
+        parser.error(str(e))
+    metrics = [name for name in grid if name != "rate_table_version"]
+    if metric not in metrics:
+        parser.error(f"Unknown metric: {metric}. Options: {', '.join(metrics)}")
+
+    print(format_matrix(grid, metric, row_param, row_values, col_param, col_values,
+                        fmt="json" if args.json else "csv", decimals=args.decimals))
+
+
+if __name__ == "__main__":
+    main()
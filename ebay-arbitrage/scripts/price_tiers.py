@@ -0,0 +1,376 @@
+#!/usr/bin/env python3
+"""
+Tiered Price Break Comparison
+
+Supplier quotes usually come as price breaks — 50+ at $4.80, 200+ at $4.20, 1000+ at
+$3.60 — and the cheapest unit price isn't always the cheapest landed unit: a bigger
+tier can push you onto pricier freight, over de minimis, or past what you can sell.
+This script costs every tier × shipping method combination of a quote through landed
+cost and margin, and marks the option with the lowest landed cost per sellable unit.
+
+Price schedules are written as MIN_QUANTITY:UNIT_PRICE pairs, e.g. "50:4.80,200:4.20,1000:3.60"
+(in JSONL, a list of [min_quantity, unit_price] pairs also works). Each tier is costed
+at its minimum order quantity, or at the quote's quantity if that is larger and still
+within the tier.
+
+All quotes in a file are flattened into one table of (quote, tier, method) cells and
+costed with a single calculate_landed_cost_batch() call and a single
+calculate_margin_batch() call, so thousands of quotes cost about as much as one.
+Requires NumPy.
+
+The same schedule format works as a price_tiers column in deal_pipeline.py and
+portfolio_optimizer.py, in place of product_cost.
+
+Usage:
+    python price_tiers.py --tiers "50:4.80,200:4.20,1000:3.60" --weight-kg 0.5 --sale-price 29.99
+    python price_tiers.py --input quotes.csv --output options.csv
+    python price_tiers.py --input quotes.jsonl --cheapest-only --methods air_freight,sea_lcl
+"""
+
+import argparse
+import bisect
+import json
+import sys
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+import batch_io
+import packing
+import rate_tables
+from landed_cost import LANDED_COST_FIELDS, calculate_landed_cost_batch
+from margin_calculator import MARGIN_FIELDS, calculate_margin_batch
+
+
+# Price and quantity come from the schedule, every method is costed, and cogs comes
+# from the landed cost step
+QUOTE_LANDED_FIELDS = {name: kind for name, kind in LANDED_COST_FIELDS.items()
+                       if name not in ("product_cost", "quantity", "shipping_method")}
+QUOTE_MARGIN_FIELDS = {name: kind for name, kind in MARGIN_FIELDS.items() if name != "cogs"}
+
+# Columns of the option table, one row per (quote, tier, method)
+OPTION_FIELDS = [
+    "quote",
+    "sku",
+    "tier_min_quantity",
+    "unit_price",
+    "quantity",
+    "shipping_method",
+    "total_landed_cost",
+    "per_unit_landed",
+    "per_unit_landed_defect_adjusted",
+    "sellable_units",
+    "net_profit",
+    "net_margin_pct",
+    "roi_pct",
+    "over_weight_limit",
+    "cheapest",
+    "rate_table_version",
+]
+
+
+def parse_price_tiers(value) -> tuple:
+    """
+    Parse a price schedule into ((min_quantity, unit_price), ...) sorted by quantity.
+
+    Accepts "50:4.80,200:4.20" strings or a list of [min_quantity, unit_price] pairs.
+    """
+    if isinstance(value, str):
+        pairs = [item.split(":") for item in value.replace(";", ",").split(",") if item.strip()]
+    else:
+        pairs = list(value)
+    tiers = []
+    for pair in pairs:
+        if len(pair) != 2:
+            raise ValueError(f"Price tier must be MIN_QUANTITY:UNIT_PRICE, got {pair}")
+        tiers.append((batch_io.coerce(pair[0], int), float(pair[1])))
+    tiers.sort()
+    if not tiers:
+        raise ValueError("Price schedule is empty")
+    for i, (min_quantity, price) in enumerate(tiers):
+        if min_quantity < 1 or price < 0:
+            raise ValueError(f"Price tier {min_quantity}:{price} needs min_quantity >= 1 and price >= 0")
+        if i and min_quantity == tiers[i - 1][0]:
+            raise ValueError(f"Two price tiers start at {min_quantity} units")
+    return tuple(tiers)
+
+
+def unit_price(tiers: tuple, quantity: int) -> float:
+    """Unit price for an order of quantity units under a parsed schedule."""
+    i = bisect.bisect_right(tiers, (quantity, float("inf"))) - 1
+    if i < 0:
+        raise ValueError(f"Quantity {quantity} is below the supplier MOQ of {tiers[0][0]}")
+    return tiers[i][1]
+
+
+def tier_orders(tiers: tuple, quantity: int = None) -> list:
+    """
+    The order to cost for each tier: (tier_min_quantity, unit_price, order_quantity).
+
+    A tier is ordered at its minimum, or at quantity if larger. Tiers that quantity
+    already outgrows (the next tier's price applies) are left out.
+    """
+    orders = []
+    for i, (min_quantity, price) in enumerate(tiers):
+        order_quantity = max(min_quantity, quantity or 0)
+        if i + 1 < len(tiers) and order_quantity >= tiers[i + 1][0]:
+            continue
+        orders.append((min_quantity, price, order_quantity))
+    return orders
+
+
+def resolve_product_cost(row: dict) -> dict:
+    """
+    Fill in product_cost from a price_tiers column at the row's quantity.
+
+    Rows that already have a product_cost (or no schedule) are returned unchanged.
+    """
+    if row.get("product_cost") not in (None, "") or row.get("price_tiers") in (None, ""):
+        return row
+    if row.get("quantity") in (None, ""):
+        raise ValueError("price_tiers needs a quantity to price the order")
+    quantity = batch_io.coerce(row["quantity"], int)
+    return {**row, "product_cost": unit_price(parse_price_tiers(row["price_tiers"]), quantity)}
+
+
+def option_table(rows, methods: list = None) -> dict:
+    """
+    Cost every tier × shipping method of every quote.
+
+    Args:
+        rows: Quote rows: price_tiers, weight_per_unit_kg and sale_price (required),
+            optional quantity (the units you need) and sku, plus any other deal columns
+        methods: Shipping method keys (default: every method in the active rate table)
+
+    Returns:
+        dict with "columns" (OPTION_FIELDS arrays, one entry per option, grouped by
+        quote) and "skipped" (rows that could not be costed, with their error)
+    """
+    if np is None:
+        raise ImportError("option_table requires NumPy (pip install numpy)")
+
+    methods = methods or list(rate_tables.active().shipping.methods)
+    known = rate_tables.active().shipping.methods
+    for key in methods:
+        if key not in known:
+            raise ValueError(f"Unknown shipping method: {key}. Options: {', '.join(known)}")
+
+    quote, sku, tier_min, price, quantity = [], [], [], [], []
+    landed_rows, margin_rows, skipped = [], [], []
+    for n, row in enumerate(rows, start=1):
+        try:
+            if row.get("price_tiers") in (None, ""):
+                raise ValueError("Quote needs price_tiers")
+            tiers = parse_price_tiers(row["price_tiers"])
+            wanted = row.get("quantity")
+            orders = tier_orders(tiers, None if wanted in (None, "") else batch_io.coerce(wanted, int))
+            landed_kwargs = batch_io.calculator_kwargs(row, QUOTE_LANDED_FIELDS)
+            margin_kwargs = batch_io.calculator_kwargs(row, QUOTE_MARGIN_FIELDS)
+            missing = (batch_io.missing_arguments({**landed_kwargs, "product_cost": 0, "quantity": 0},
+                                                  calculate_landed_cost_batch)
+                       + batch_io.missing_arguments({**margin_kwargs, "cogs": 0}, calculate_margin_batch))
+            if missing:
+                raise ValueError(f"Quote needs {', '.join(missing)}")
+            # Check dimensions here: one bad quote would otherwise fail the whole batch
+            packing.chargeable_weight(
+                1, 0.0, None,
+                tuple(landed_kwargs.get(name) for name in ("length_cm", "width_cm", "height_cm")),
+                tuple(landed_kwargs.get(name) for name in ("carton_length_cm", "carton_width_cm", "carton_height_cm")),
+            )
+        except batch_io.ROW_ERRORS as e:
+            skipped.append({"row": n, "sku": row.get("sku"), "error": str(e)})
+            continue
+        for min_quantity, tier_price, order_quantity in orders:
+            quote.append(n)
+            sku.append(row.get("sku"))
+            tier_min.append(min_quantity)
+            price.append(tier_price)
+            quantity.append(order_quantity)
+        landed_rows.append(landed_kwargs)
+        margin_rows.append(margin_kwargs)
+
+    if not quote:
+        return {"columns": {name: np.array([]) for name in OPTION_FIELDS}, "skipped": skipped}
+
+    # Cells: every tier order of every quote, once per method, grouped by quote
+    m = len(methods)
+    quote = np.array(quote)
+    quote_index = np.repeat(np.unique(quote, return_inverse=True)[1], m)
+    landed_columns = {name: column[quote_index]
+                      for name, column in batch_io.batch_columns(landed_rows, calculate_landed_cost_batch).items()}
+    margin_columns = {name: column[quote_index]
+                      for name, column in batch_io.batch_columns(margin_rows, calculate_margin_batch).items()}
+    shipping_method = np.tile(np.array(methods), len(price))
+    quantity = np.repeat(np.array(quantity), m)
+
+    landed = calculate_landed_cost_batch(product_cost=np.repeat(np.array(price), m), quantity=quantity,
+                                         shipping_method=shipping_method, **landed_columns)
+    cogs = np.round(landed["per_unit_landed_defect_adjusted"], 2)
+    margin = calculate_margin_batch(cogs=cogs, **margin_columns)
+
+    # Cheapest per sellable unit within each quote; options that can't ship or sell never win
+    cost = np.where(landed["over_weight_limit"] | (landed["sellable_units"] <= 0), np.inf, cogs)
+    cell_quote = np.repeat(quote, m)
+    order = np.lexsort((cost, cell_quote))
+    first = np.ones(order.size, dtype=bool)
+    first[1:] = cell_quote[order][1:] != cell_quote[order][:-1]
+    cheapest = np.zeros(order.size, dtype=bool)
+    cheapest[order[first]] = np.isfinite(cost[order[first]])
+
+    rate_table_version = np.char.add(np.char.add(np.broadcast_to(margin["rate_table_version"], cost.shape).astype(str),
+                                                 ","),
+                                     np.broadcast_to(landed["rate_table_version"], cost.shape).astype(str))
+    columns = {
+        "quote": cell_quote,
+        "sku": np.repeat(np.array(sku, dtype=object), m),
+        "tier_min_quantity": np.repeat(np.array(tier_min), m),
+        "unit_price": np.repeat(np.array(price), m),
+        "quantity": quantity,
+        "shipping_method": shipping_method,
+        "total_landed_cost": landed["total_landed_cost"],
+        "per_unit_landed": landed["per_unit_landed"],
+        "per_unit_landed_defect_adjusted": landed["per_unit_landed_defect_adjusted"],
+        "sellable_units": landed["sellable_units"],
+        "net_profit": margin["net_profit"],
+        "net_margin_pct": margin["net_margin_pct"],
+        "roi_pct": margin["roi_pct"],
+        "over_weight_limit": landed["over_weight_limit"],
+        "cheapest": cheapest,
+        "rate_table_version": rate_table_version,
+    }
+    return {"columns": columns, "skipped": skipped}
+
+
+# Rounding for table output, matching the scalar calculators' report precision
+_ROUNDING = {
+    "total_landed_cost": 2, "per_unit_landed": 2, "per_unit_landed_defect_adjusted": 2,
+    "net_profit": 2, "net_margin_pct": 1, "roi_pct": 1,
+}
+
+
+def option_rows(columns: dict, cheapest_only: bool = False):
+    """Yield the option table as rounded row dicts (OPTION_FIELDS keys)."""
+    keep = np.flatnonzero(columns["cheapest"]) if cheapest_only else range(len(columns["quote"]))
+    lists = {name: (np.round(column, _ROUNDING[name]) if name in _ROUNDING else column).tolist()
+             for name, column in columns.items()}
+    for i in keep:
+        yield {name: lists[name][i] for name in OPTION_FIELDS}
+
+
+def print_report(rows: list):
+    """Print a human-readable tier x method table for one quote."""
+    print("\n" + "=" * 78)
+    print("  PRICE TIERS x SHIPPING METHOD")
+    print("=" * 78)
+
+    print(f"\n  Rate Tables:          {rows[0]['rate_table_version']}")
+    print(f"\n  {'Tier':>6}{'Price':>8}{'Qty':>7}  {'Method':<21}{'Landed/unit':>12}"
+          f"{'Adj/unit':>10}{'Profit':>9}{'ROI':>8}")
+    for r in rows:
+        flag = "  <- cheapest" if r["cheapest"] else ("  (over weight limit)" if r["over_weight_limit"] else "")
+        print(f"  {r['tier_min_quantity']:>5}+{r['unit_price']:>8.2f}{r['quantity']:>7}  {r['shipping_method']:<21}"
+              f"{r['per_unit_landed']:>12.2f}{r['per_unit_landed_defect_adjusted']:>10.2f}"
+              f"{r['net_profit']:>9.2f}{r['roi_pct']:>7.1f}%{flag}")
+    print("\n  Landed/unit and Adj/unit are per unit ordered and per sellable unit;")
+    print("  profit and ROI are per unit sold.")
+    print("=" * 78 + "\n")
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Cost every price tier x shipping method of supplier quotes",
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        epilog="""
+Examples:
+  One quote, every shipping method:
+    %(prog)s --tiers "50:4.80,200:4.20,1000:3.60" --weight-kg 0.5 --sale-price 29.99
+
+  Need 300 units, with duties:
+    %(prog)s --tiers "50:4.80,200:4.20,1000:3.60" --quantity 300 --weight-kg 0.5 \\
+        --sale-price 29.99 --duty-rate 3.9 --section-301 7.5
+
+  A file of quotes (price_tiers column), just the winner per quote:
+    %(prog)s --input quotes.csv --output best.csv --cheapest-only
+        """,
+    )
+
+    parser.add_argument("--tiers", type=str, default=None, help='Price schedule, e.g. "50:4.80,200:4.20,1000:3.60"')
+    parser.add_argument("--quantity", type=int, default=None, help="Units needed (default: each tier's minimum)")
+    parser.add_argument("--weight-kg", type=float, default=None, help="Weight per unit in kilograms")
+    parser.add_argument("--sale-price", type=float, default=None, help="Expected eBay sale price")
+    parser.add_argument("--shipping-cost", type=float, default=None, help="Shipping charged to the buyer's order")
+    parser.add_argument("--category", type=str, default=None, help="eBay category")
+    parser.add_argument("--duty-rate", type=float, default=None, help="Base customs duty rate (%%)")
+    parser.add_argument("--section-301", type=float, default=None, help="Section 301 tariff rate (%%)")
+    parser.add_argument("--defect-rate", type=float, default=None, help="Expected defect rate (%%)")
+    parser.add_argument("--methods", type=str, default=None,
+                       help="Comma-separated shipping methods (default: all)")
+    parser.add_argument("--input", type=str, default=None, help="Quotes file (CSV/JSONL, - for stdin)")
+    parser.add_argument("--output", type=str, default="-", help="Option table file in --input mode (default: stdout)")
+    parser.add_argument("--input-format", type=str, choices=batch_io.FORMATS, default=None,
+                       help="Input format (default: from file extension, else csv)")
+    parser.add_argument("--output-format", type=str, choices=batch_io.FORMATS, default=None,
+                       help="Output format (default: from file extension, else same as input)")
+    parser.add_argument("--cheapest-only", action="store_true", help="Only the cheapest option per quote")
+    parser.add_argument("--json", action="store_true", help="Output as JSON")
+
+    args = parser.parse_args()
+
+    if np is None:
+        parser.error("price_tiers.py requires NumPy (pip install numpy)")
+    methods = args.methods.split(",") if args.methods else None
+
+    if args.input:
+        input_format = args.input_format or batch_io.infer_format(args.input, "csv")
+        output_format = args.output_format or batch_io.infer_format(args.output, input_format)
+        infile = sys.stdin if args.input == "-" else open(args.input, newline="", encoding="utf-8")
+        try:
+            result = option_table(batch_io.read_rows(infile, input_format), methods)
+        except ValueError as e:
+            parser.error(str(e))
+        finally:
+            if infile is not sys.stdin:
+                infile.close()
+        outfile = sys.stdout if args.output == "-" else open(args.output, "w", newline="", encoding="utf-8")
+        try:
+            count = batch_io.write_rows(option_rows(result["columns"], args.cheapest_only), outfile, output_format,
+                                        fieldnames=OPTION_FIELDS)
+        finally:
+            if outfile is not sys.stdout:
+                outfile.close()
+        for item in result["skipped"]:
+            print(f"Row {item['row']}: {item['error']}", file=sys.stderr)
+        print(f"Wrote {count} options", file=sys.stderr)
+        return
+
+    if not (args.tiers and args.weight_kg is not None and args.sale_price is not None):
+        parser.error("--tiers, --weight-kg and --sale-price are required (or use --input)")
+    row = {
+        "price_tiers": args.tiers,
+        "quantity": args.quantity,
+        "weight_per_unit_kg": args.weight_kg,
+        "sale_price": args.sale_price,
+        "shipping_cost": args.shipping_cost,
+        "category": args.category,
+        "duty_rate": args.duty_rate,
+        "section_301_rate": args.section_301,
+        "defect_rate": args.defect_rate,
+    }
+    try:
+        result = option_table([row], methods)
+    except ValueError as e:
+        parser.error(str(e))
+    if result["skipped"]:
+        parser.error(result["skipped"][0]["error"])
+    rows = list(option_rows(result["columns"], args.cheapest_only))
+
+    if args.json:
+        print(json.dumps(rows, indent=2))
+    else:
+        print_report(rows)
+
+
+if __name__ == "__main__":
+    main()
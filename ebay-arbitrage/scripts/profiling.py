@@ -0,0 +1,181 @@
+"""
+Phase Timing for the Calculator CLIs
+
+Opt-in instrumentation that records wall time and call counts per phase of a run
+(argument parsing, the calculation, building the rounded result dict, JSON
+serialization, print_report, per-row bulk work), so a slow production run shows
+where the time goes.
+
+Turn it on with --profile (json or prometheus) on landed_cost.py and
+margin_calculator.py, or for every run by setting
+
+    EBAY_ARBITRAGE_PROFILE=json          # or "prometheus"; "1" means json
+    EBAY_ARBITRAGE_PROFILE_OUTPUT=path   # default: stderr, so stdout stays clean
+
+JSON output:
+
+    {"script": "landed_cost", "total_seconds": 0.0012,
+     "phases": {"argparse": {"calls": 1, "seconds": 0.0004, "mean_seconds": 0.0004}, ...}}
+
+Prometheus text exposition (for a node_exporter textfile collector or a pushgateway):
+
+    ebay_arbitrage_phase_seconds_total{script="landed_cost",phase="calculate"} 1.2e-05
+    ebay_arbitrage_phase_calls_total{script="landed_cost",phase="calculate"} 1
+
+When profiling is off, phase() hands back one shared no-op context manager and wrap()
+returns the function unchanged, so the instrumented code paths cost next to nothing.
+With --workers N, rows are scored in other processes and only the whole bulk run is
+timed. Not meant to be run directly.
+"""
+
+import contextlib
+import json
+import os
+import sys
+import time
+
+
+PROFILE_ENV = "EBAY_ARBITRAGE_PROFILE"
+PROFILE_OUTPUT_ENV = "EBAY_ARBITRAGE_PROFILE_OUTPUT"
+FORMATS = ("json", "prometheus")
+METRIC_PREFIX = "ebay_arbitrage_phase"
+
+_DISABLED_PHASE = contextlib.nullcontext()
+
+
+class _Phase:
+    """Context manager adding one timed call to a phase."""
+
+    __slots__ = ("stats", "start")
+
+    def __init__(self, stats: list):
+        self.stats = stats
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.stats[0] += 1
+        self.stats[1] += time.perf_counter() - self.start
+        return False
+
+
+class Profiler:
+    """
+    Per-phase wall time and call counts for one CLI run.
+
+    A Profiler with fmt=None is disabled: phase() and wrap() do no timing and
+    report() writes nothing.
+    """
+
+    def __init__(self, script: str, fmt: str = None, output: str = None, started: float = None):
+        if fmt is not None and fmt not in FORMATS:
+            raise ValueError(f"Unknown profile format: {fmt}. Options: {', '.join(FORMATS)}")
+        self.script = script
+        self.fmt = fmt
+        self.output = output
+        self.started = time.perf_counter() if started is None else started
+        self.phases = {}  # name -> [calls, seconds], in first-seen order
+
+    @property
+    def enabled(self) -> bool:
+        return self.fmt is not None
+
+    def _stats(self, name: str) -> list:
+        stats = self.phases.get(name)
+        if stats is None:
+            stats = self.phases[name] = [0, 0.0]
+        return stats
+
+    def phase(self, name: str):
+        """Context manager timing one call of the named phase."""
+        if self.fmt is None:
+            return _DISABLED_PHASE
+        return _Phase(self._stats(name))
+
+    def record(self, name: str, seconds: float, calls: int = 1):
+        """Add time measured elsewhere (e.g. argument parsing, before the profiler existed)."""
+        if self.fmt is not None:
+            stats = self._stats(name)
+            stats[0] += calls
+            stats[1] += seconds
+
+    def wrap(self, name: str, fn):
+        """fn, timed as the named phase on every call (fn itself when disabled)."""
+        if self.fmt is None:
+            return fn
+        stats = self._stats(name)
+        perf_counter = time.perf_counter
+
+        def timed(*args, **kwargs):
+            start = perf_counter()
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                stats[0] += 1
+                stats[1] += perf_counter() - start
+
+        return timed
+
+    def to_dict(self) -> dict:
+        return {
+            "script": self.script,
+            "total_seconds": time.perf_counter() - self.started,
+            "phases": {
+                name: {"calls": calls, "seconds": seconds, "mean_seconds": seconds / calls if calls else 0.0}
+                for name, (calls, seconds) in self.phases.items()
+            },
+        }
+
+    def to_prometheus(self) -> str:
+        """Prometheus text exposition format."""
+        profile = self.to_dict()
+        lines = [
+            f"# HELP {METRIC_PREFIX}_seconds_total Wall time spent in each phase of a calculator run.",
+            f"# TYPE {METRIC_PREFIX}_seconds_total counter",
+        ]
+        for name, stats in profile["phases"].items():
+            lines.append(f'{METRIC_PREFIX}_seconds_total{{script="{self.script}",phase="{name}"}} {stats["seconds"]!r}')
+        lines += [
+            f"# HELP {METRIC_PREFIX}_calls_total Calls of each phase in a calculator run.",
+            f"# TYPE {METRIC_PREFIX}_calls_total counter",
+        ]
+        for name, stats in profile["phases"].items():
+            lines.append(f'{METRIC_PREFIX}_calls_total{{script="{self.script}",phase="{name}"}} {stats["calls"]}')
+        lines += [
+            "# HELP ebay_arbitrage_run_seconds Wall time of the whole calculator run.",
+            "# TYPE ebay_arbitrage_run_seconds gauge",
+            f'ebay_arbitrage_run_seconds{{script="{self.script}"}} {profile["total_seconds"]!r}',
+        ]
+        return "\n".join(lines) + "\n"
+
+    def report(self):
+        """Write the profile to the output file (or stderr) in the chosen format."""
+        if self.fmt is None:
+            return
+        text = json.dumps(self.to_dict(), indent=2) + "\n" if self.fmt == "json" else self.to_prometheus()
+        if self.output:
+            with open(self.output, "w", encoding="utf-8") as f:
+                f.write(text)
+        else:
+            sys.stderr.write(text)
+
+
+def for_cli(script: str, fmt: str = None, output: str = None, started: float = None) -> Profiler:
+    """
+    Profiler for a CLI run: the --profile format if given, else EBAY_ARBITRAGE_PROFILE.
+
+    started is the perf_counter() reading from the top of main(); the time since then
+    (building the parser and parsing arguments) is recorded as the "argparse" phase.
+    """
+    if fmt is None:
+        fmt = os.environ.get(PROFILE_ENV, "").strip().lower() or None
+        if fmt in ("1", "true", "yes"):
+            fmt = "json"
+        elif fmt in ("0", "false", "no"):
+            fmt = None
+    profiler = Profiler(script, fmt, output or os.environ.get(PROFILE_OUTPUT_ENV) or None, started)
+    if started is not None:
+        profiler.record("argparse", time.perf_counter() - started)
+    return profiler
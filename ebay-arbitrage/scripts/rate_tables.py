@@ -0,0 +1,527 @@
+"""
+Rate Tables
+
+Loads the eBay fee schedule and shipping rates from versioned data files and compiles
+them into integer-coded indexes, so the calculators don't redo string normalization
+and nested dict lookups on every call.
+
+    rates/ebay_fees.json       — FVF rates by category, per-order fee, international fee
+    rates/shipping_rates.json  — per-kg rate, base fee, weight limit, volumetric divisor and
+                                 transit days by method
+
+Each file holds a list of versions with effective dates; the version in effect today
+is used unless a calculation passes as_of, in which case the version in effect on that
+date is found through an EffectiveIndex (a bisect over the sorted effective dates), so
+backtests over historical orders cost O(log k) per order for k versions. To change a
+rate, add a new version to the file — no code change or redeploy. Set EBAY_ARBITRAGE_RATES_DIR to load the files from another directory.
+
+Files are parsed once per process (and again only when they change on disk) into:
+
+    CategoryIndex  — eBay category -> code -> FVF rate, with a normalized alias map so
+                     free text like "Cell Phones" or "Home & Garden" resolves directly
+    ShippingIndex  — shipping method key -> code -> rate_per_kg / base_fee / max weight /
+                     volumetric divisor
+
+active() returns the current RateTables snapshot. A resident process (calc_server.py)
+runs a RateTableWatcher, which re-reads changed files and swaps in a new snapshot in
+one assignment; a calculation that already holds the old snapshot finishes on it.
+Every calculator result is stamped with the version it used (rate_table_version).
+Not meant to be run directly.
+"""
+
+import bisect
+import datetime
+import functools
+import json
+import os
+import re
+import sys
+import threading
+
+# NumPy is imported on first batch use (the *_array attributes, codes() and the
+# *_columns() methods), so loading the tables for a scalar calculation skips it
+
+
+# eBay's own category names (and common shorthand) for the FVF_RATES keys,
+# written in normalized form (see normalize_category)
+CATEGORY_ALIASES = {
+    "books_magazines": "books",
+    "dvds_movies": "dvds",
+    "movies_tv": "movies",
+    "business": "business_industrial",
+    "clothing_shoes_accessories": "clothing",
+    "computers_tablets_networking": "computers",
+    "computers_tablets": "computers",
+    "consumer_electronics": "electronics",
+    "cell_phones_accessories": "cell_phones",
+    "cell_phones_smart_watches": "cell_phones",
+    "phones": "cell_phones",
+    "jewelry_watches": "jewelry",
+    "musical_instruments_gear": "musical_instruments",
+    "ebay_motors": "auto_parts",
+    "parts_accessories": "auto_parts",
+    "sporting": "sporting_goods",
+    "toys_hobbies": "toys",
+    "video_games_consoles": "video_games",
+}
+
+MAX_CACHED_CATEGORIES = 10000  # Free-text spellings remembered per process
+
+RATES_DIR_ENV = "EBAY_ARBITRAGE_RATES_DIR"
+DEFAULT_RATES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "rates")
+FEE_TABLE_FILE = "ebay_fees.json"
+SHIPPING_TABLE_FILE = "shipping_rates.json"
+DEFAULT_WATCH_INTERVAL = 5.0  # Seconds between file checks in a resident process
+
+# Errors that mean a rate file is missing or malformed
+LOAD_ERRORS = (OSError, ValueError, KeyError, TypeError)
+
+
+def normalize_category(text: str) -> str:
+    """Lower-case, drop "&"/"and" and punctuation, join words with "_" ("Home & Garden" -> "home_garden")."""
+    words = re.findall(r"[a-z0-9]+", text.lower())
+    return "_".join(w for w in words if w != "and")
+
+
+class CategoryIndex:
+    """Integer-coded FVF rate table with O(1) free-text category resolution."""
+
+    def __init__(self, fvf_rates: dict, aliases: dict = None):
+        self.names = tuple(fvf_rates)
+        self.rates = tuple(fvf_rates[name] for name in self.names)
+        self.default_code = self.names.index("default")
+
+        codes = {name: code for code, name in enumerate(self.names)}
+        self._aliases = dict(codes)
+        for alias, target in (CATEGORY_ALIASES if aliases is None else aliases).items():
+            if target in codes:
+                self._aliases[alias] = codes[target]
+        # Exact spellings seen so far -> code; grows as new free text is resolved
+        self._cache = dict(codes)
+
+    @functools.cached_property
+    def rate_array(self):
+        import numpy as np
+        return np.array(self.rates)
+
+    def code(self, category: str) -> int:
+        """Resolve a category (any spelling) to its code; unknown categories map to "default"."""
+        code = self._cache.get(category)
+        if code is None:
+            code = self._aliases.get(normalize_category(category), self.default_code)
+            if len(self._cache) < MAX_CACHED_CATEGORIES:
+                self._cache[category] = code
+        return code
+
+    def rate(self, category: str) -> float:
+        """FVF rate (percentage) for a category."""
+        return self.rates[self.code(category)]
+
+    def codes(self, categories):
+        """Vectorized code(): resolves each distinct value once. Requires NumPy."""
+        import numpy as np
+        categories = np.asarray(categories, dtype=str)
+        distinct, inverse = np.unique(categories, return_inverse=True)
+        return np.array([self.code(c) for c in distinct], dtype=np.int16)[inverse].reshape(categories.shape)
+
+
+class ShippingIndex:
+    """Integer-coded shipping rate table."""
+
+    def __init__(self, shipping_rates: dict):
+        self.keys = tuple(shipping_rates)
+        self.code_of = {key: code for code, key in enumerate(self.keys)}
+        self.methods = tuple(shipping_rates[key] for key in self.keys)
+        self.rate_per_kg = tuple(m["rate_per_kg"] for m in self.methods)
+        self.base_fee = tuple(m["base_fee"] for m in self.methods)
+        self.max_weight_kg = tuple(m["max_weight_kg"] for m in self.methods)
+        self.volumetric_divisor = tuple(m["volumetric_divisor"] for m in self.methods)
+
+    @functools.cached_property
+    def rate_per_kg_array(self):
+        import numpy as np
+        return np.array(self.rate_per_kg)
+
+    @functools.cached_property
+    def base_fee_array(self):
+        import numpy as np
+        return np.array(self.base_fee)
+
+    @functools.cached_property
+    def max_weight_kg_array(self):
+        import numpy as np
+        return np.array([w or np.inf for w in self.max_weight_kg])
+
+    @functools.cached_property
+    def volumetric_divisor_array(self):
+        import numpy as np
+        return np.array([d or np.inf for d in self.volumetric_divisor])
+
+    def codes(self, methods):
+        """
+        Vectorized method key -> code lookup. Requires NumPy.
+
+        Returns (codes, known): unknown keys get code 0 and known=False.
+        """
+        import numpy as np
+        methods = np.asarray(methods, dtype=str)
+        distinct, inverse = np.unique(methods, return_inverse=True)
+        distinct_codes = np.array([self.code_of.get(m, -1) for m in distinct], dtype=np.int16)
+        codes = distinct_codes[inverse].reshape(methods.shape)
+        known = codes >= 0
+        return np.where(known, codes, 0), known
+
+
+class FeeTable:
+    """One version of the eBay fee schedule."""
+
+    __slots__ = ("version", "effective_date", "fvf_rates", "per_order_fee", "international_fee_rate",
+                 "categories", "stamp")
+
+    def __init__(self, version: str, effective_date: datetime.date, fvf_rates: dict,
+                 per_order_fee: float, international_fee_rate: float):
+        self.version = version
+        self.effective_date = effective_date
+        self.fvf_rates = fvf_rates
+        self.per_order_fee = per_order_fee
+        self.international_fee_rate = international_fee_rate
+        self.categories = CategoryIndex(fvf_rates)
+        self.stamp = f"ebay_fees@{version}"
+
+
+class ShippingTable:
+    """One version of the shipping rate table."""
+
+    __slots__ = ("version", "effective_date", "methods", "index", "stamp")
+
+    def __init__(self, version: str, effective_date: datetime.date, methods: dict):
+        self.version = version
+        self.effective_date = effective_date
+        self.methods = methods
+        self.index = ShippingIndex(methods)
+        self.stamp = f"shipping_rates@{version}"
+
+
+def _parse_fee_version(entry: dict) -> FeeTable:
+    fvf_rates = {name: float(rate) for name, rate in entry["fvf_rates"].items()}
+    if "default" not in fvf_rates:
+        raise ValueError("fvf_rates needs a \"default\" rate")
+    return FeeTable(str(entry["version"]), datetime.date.fromisoformat(entry["effective_date"]), fvf_rates,
+                    float(entry["per_order_fee"]), float(entry["international_fee_rate"]))
+
+
+def _transit_days(value):
+    """(min, max) door-to-door days from a [min, max] pair, or None if not given."""
+    if not value:
+        return None
+    low, high = (int(d) for d in value)
+    if not 0 <= low <= high:
+        raise ValueError(f"transit_days must be [min, max] with 0 <= min <= max, got {value}")
+    return low, high
+
+
+def _volumetric_divisor(value):
+    """cm³ per kg of dimensional weight, or None if the method doesn't bill by volume."""
+    if not value:
+        return None
+    divisor = float(value)
+    if divisor <= 0:
+        raise ValueError(f"volumetric_divisor must be positive, got {value}")
+    return divisor
+
+
+def _parse_shipping_version(entry: dict) -> ShippingTable:
+    methods = {}
+    for key, method in entry["methods"].items():
+        methods[key] = {
+            "name": str(method["name"]),
+            "rate_per_kg": float(method["rate_per_kg"]),
+            "base_fee": float(method["base_fee"]),
+            "max_weight_kg": float(method["max_weight_kg"]) if method.get("max_weight_kg") else None,
+            "volumetric_divisor": _volumetric_divisor(method.get("volumetric_divisor")),
+            "transit_days": _transit_days(method.get("transit_days")),
+            "notes": str(method.get("notes", "")),
+        }
+    if not methods:
+        raise ValueError("methods is empty")
+    return ShippingTable(str(entry["version"]), datetime.date.fromisoformat(entry["effective_date"]), methods)
+
+
+def _file_signature(path: str) -> tuple:
+    stat = os.stat(path)
+    return stat.st_mtime_ns, stat.st_size
+
+
+# path -> (file signature, parsed versions); a file is only re-parsed after it changes
+_parsed_files = {}
+
+
+def load_versions(path: str, parse_version) -> tuple:
+    """
+    Parse every version in a rate file, oldest effective date first.
+
+    Results are cached by path and file signature (mtime, size), so repeated loads of
+    an unchanged file cost one stat() call.
+    """
+    signature = _file_signature(path)
+    cached = _parsed_files.get(path)
+    if cached is not None and cached[0] == signature:
+        return cached[1]
+
+    with open(path, encoding="utf-8") as f:
+        try:
+            data = json.load(f)
+        except ValueError as e:
+            raise ValueError(f"{path}: {e}") from e
+    try:
+        versions = tuple(sorted((parse_version(entry) for entry in data["versions"]),
+                                key=lambda v: v.effective_date))
+    except LOAD_ERRORS as e:
+        raise ValueError(f"{path}: bad rate table version: {e}") from e
+    if not versions:
+        raise ValueError(f"{path}: no versions")
+    dates = [v.effective_date for v in versions]
+    if len(set(dates)) != len(dates):
+        raise ValueError(f"{path}: two versions share an effective_date")
+
+    _parsed_files[path] = (signature, versions)
+    return versions
+
+
+def to_date(value) -> datetime.date:
+    """Accept a date, datetime or ISO string ("2025-03-14" or "2025-03-14T09:30:00")."""
+    if isinstance(value, datetime.datetime):
+        return value.date()
+    if isinstance(value, datetime.date):
+        return value
+    return datetime.date.fromisoformat(str(value)[:10])
+
+
+class EffectiveIndex:
+    """
+    Interval index over one table's versions (oldest first).
+
+    Version i is in effect from dates[i] up to, not including, dates[i + 1], so the
+    version for a date is one bisect over the sorted effective dates: O(log k) per
+    lookup for k versions.
+    """
+
+    def __init__(self, versions: tuple):
+        self.versions = versions
+        self.dates = tuple(v.effective_date for v in versions)
+
+    @functools.cached_property
+    def days(self):
+        import numpy as np
+        return np.array(self.dates, dtype="datetime64[D]")
+
+    @functools.cached_property
+    def stamps(self):
+        import numpy as np
+        return np.array([v.stamp for v in self.versions])
+
+    def _no_version(self, day):
+        return ValueError(f"No rate table version in effect on {day} (earliest is {self.dates[0]})")
+
+    def on(self, day):
+        """The version in effect on day (a date, datetime or ISO string)."""
+        day = to_date(day)
+        i = bisect.bisect_right(self.dates, day) - 1
+        if i < 0:
+            raise self._no_version(day)
+        return self.versions[i]
+
+    def codes(self, as_of, default: datetime.date):
+        """
+        Vectorized on(): the version index for every date in as_of. Requires NumPy.
+
+        as_of may hold dates, datetimes, ISO strings or datetime64 values; missing
+        entries (None/NaT) use default.
+        """
+        import numpy as np
+        days = np.asarray(as_of).astype("datetime64[s]").astype("datetime64[D]")
+        days = np.where(np.isnat(days), np.datetime64(default, "D"), days)
+        codes = np.searchsorted(self.days, days, side="right") - 1
+        if (codes < 0).any():
+            raise self._no_version(days[codes < 0].flat[0])
+        return codes
+
+
+class RateTables:
+    """
+    Immutable snapshot of both rate files.
+
+    fees / shipping are the versions in effect on `day`; fee_history /
+    shipping_history index every version in the files by effective date, for
+    calculations as of another date.
+    """
+
+    def __init__(self, fee_versions: tuple, shipping_versions: tuple, day: datetime.date = None,
+                 signature: tuple = None):
+        self.fee_history = EffectiveIndex(fee_versions)
+        self.shipping_history = EffectiveIndex(shipping_versions)
+        self.day = day or datetime.date.today()
+        self.signature = signature
+        self.fees = self.fee_history.on(self.day)
+        self.shipping = self.shipping_history.on(self.day)
+        self.version = f"{self.fees.stamp},{self.shipping.stamp}"
+
+    def fees_on(self, as_of=None) -> FeeTable:
+        """Fee version in effect on as_of (today's if None)."""
+        return self.fees if as_of is None else self.fee_history.on(as_of)
+
+    def shipping_on(self, as_of=None) -> ShippingTable:
+        """Shipping rate version in effect on as_of (today's if None)."""
+        return self.shipping if as_of is None else self.shipping_history.on(as_of)
+
+    def fee_columns(self, category, as_of=None) -> tuple:
+        """
+        Per-row fee rates for the batch API. Requires NumPy.
+
+        Returns (fvf_rate, per_order_fee, international_fee_rate, stamp). With a
+        single as_of (or None for today) every row uses one version and only
+        fvf_rate is an array; with an array of dates each row gets the version in
+        effect on its date and all four are arrays, broadcastable against category
+        and as_of.
+        """
+        import numpy as np
+
+        if as_of is None or np.ndim(as_of) == 0:
+            fees = self.fees_on(as_of)
+            return (fees.categories.rate_array[fees.categories.codes(category)], fees.per_order_fee,
+                    fees.international_fee_rate, fees.stamp)
+
+        history = self.fee_history
+        codes = history.codes(as_of, self.day)
+        # One rate per (version, category) pair actually present, then a 2-D gather
+        versions, version_rows = np.unique(codes, return_inverse=True)
+        categories = np.asarray(category, dtype=str)
+        names, category_rows = np.unique(categories, return_inverse=True)
+        rates = np.array([[history.versions[v].categories.rate(name) for name in names] for v in versions])
+        fvf_rate = rates[version_rows.reshape(codes.shape), category_rows.reshape(categories.shape)]
+        per_order_fee = np.array([v.per_order_fee for v in history.versions])[codes]
+        international_fee_rate = np.array([v.international_fee_rate for v in history.versions])[codes]
+        return fvf_rate, per_order_fee, international_fee_rate, history.stamps[codes]
+
+    def shipping_columns(self, shipping_method, as_of=None) -> tuple:
+        """
+        Per-row shipping rates for the batch API. Requires NumPy.
+
+        Returns (rate_per_kg, base_fee, max_weight_kg, volumetric_divisor, known, stamp).
+        max_weight_kg is inf where a method has no limit and volumetric_divisor is inf
+        where it doesn't bill by volume; known is False where the method isn't in
+        the version used (its rates are then 0). With a single as_of (or None for
+        today) stamp is one string, otherwise an array like the others.
+        """
+        import numpy as np
+
+        if as_of is None or np.ndim(as_of) == 0:
+            shipping = self.shipping_on(as_of)
+            index = shipping.index
+            codes, known = index.codes(shipping_method)
+            return (index.rate_per_kg_array[codes], index.base_fee_array[codes],
+                    index.max_weight_kg_array[codes], index.volumetric_divisor_array[codes], known, shipping.stamp)
+
+        history = self.shipping_history
+        codes = history.codes(as_of, self.day)
+        versions, version_rows = np.unique(codes, return_inverse=True)
+        methods = np.asarray(shipping_method, dtype=str)
+        keys, method_rows = np.unique(methods, return_inverse=True)
+        rows = (version_rows.reshape(codes.shape), method_rows.reshape(methods.shape))
+        table = [[history.versions[v].methods.get(key) for key in keys] for v in versions]
+
+        def column(value):
+            return np.array([[value(m) if m else 0.0 for m in row] for row in table])[rows]
+
+        known = np.array([[m is not None for m in row] for row in table])[rows]
+        max_weight_kg = np.where(known, column(lambda m: m["max_weight_kg"] or np.inf), np.inf)
+        volumetric_divisor = np.where(known, column(lambda m: m["volumetric_divisor"] or np.inf), np.inf)
+        return (column(lambda m: m["rate_per_kg"]), column(lambda m: m["base_fee"]), max_weight_kg,
+                volumetric_divisor, known, history.stamps[codes])
+
+
+def rates_dir() -> str:
+    """Directory the rate files are read from."""
+    return os.environ.get(RATES_DIR_ENV) or DEFAULT_RATES_DIR
+
+
+def _signature(directory: str) -> tuple:
+    return (
+        directory,
+        _file_signature(os.path.join(directory, FEE_TABLE_FILE)),
+        _file_signature(os.path.join(directory, SHIPPING_TABLE_FILE)),
+        datetime.date.today(),
+    )
+
+
+def load(directory: str = None) -> RateTables:
+    """Load (or re-use the cached parse of) both rate files into a new RateTables snapshot."""
+    directory = directory or rates_dir()
+    signature = _signature(directory)
+    return RateTables(
+        load_versions(os.path.join(directory, FEE_TABLE_FILE), _parse_fee_version),
+        load_versions(os.path.join(directory, SHIPPING_TABLE_FILE), _parse_shipping_version),
+        day=signature[-1],
+        signature=signature,
+    )
+
+
+_active = None
+_load_lock = threading.Lock()
+
+
+def active() -> RateTables:
+    """The current rate tables, loaded from rates_dir() on first use."""
+    tables = _active
+    if tables is None:
+        with _load_lock:
+            if _active is None:
+                _swap(load())
+            tables = _active
+    return tables
+
+
+def _swap(tables: RateTables):
+    global _active
+    _active = tables  # A single reference assignment: readers see the old or the new snapshot, never a mix
+
+
+def reload(directory: str = None) -> bool:
+    """
+    Re-read the rate files if they (or the date) changed and swap in the new tables.
+
+    Returns True if the active tables were replaced. A file that fails to parse raises
+    and leaves the active tables untouched.
+    """
+    directory = directory or rates_dir()
+    with _load_lock:
+        if _active is not None and _active.signature == _signature(directory):
+            return False
+        _swap(load(directory))
+        return True
+
+
+class RateTableWatcher(threading.Thread):
+    """Daemon thread that polls the rate files and hot-swaps the active tables when they change."""
+
+    def __init__(self, interval: float = DEFAULT_WATCH_INTERVAL, directory: str = None, log=sys.stderr):
+        super().__init__(name="rate-table-watcher", daemon=True)
+        self.interval = interval
+        self.directory = directory
+        self.log = log
+        self._stopped = threading.Event()
+
+    def run(self):
+        last_error = None
+        while not self._stopped.wait(self.interval):
+            try:
+                if reload(self.directory):
+                    print(f"Rate tables reloaded: {active().version}", file=self.log)
+                last_error = None
+            except LOAD_ERRORS as e:
+                if str(e) != last_error:  # Report a broken file once, not on every poll
+                    print(f"Rate table reload failed, still using {active().version}: {e}", file=self.log)
+                last_error = str(e)
+
+    def stop(self):
+        self._stopped.set()
@@ -0,0 +1,306 @@
+"""
+Persistent Result Cache
+
+On-disk memoization of calculator results, shared by every job and user pointing at
+the same file. A result is stored under a content hash of:
+
+    - the calculator name and its normalized arguments (typed values, so "4.20" and
+      4.2 are the same input)
+    - the fee and shipping rate versions in effect for the calculation date
+    - a fingerprint of the rate files' contents and the calculator source files
+
+so editing rates/ebay_fees.json or rates/shipping_rates.json, a new rate version
+taking effect, or a code change all miss automatically; old entries are never read
+again and age out. Nothing has to be flushed by hand.
+
+Storage is a single SQLite file (stdlib sqlite3, WAL mode, so several processes can
+read and write it at once). Entries expire after a TTL (default 7 days) and the least
+recently used ones are evicted once the file holds more than a size cap (default
+256 MB) of results. Hit, miss, expiry and eviction counters are kept per cache object
+(stats) and cumulatively in the file (totals()).
+
+Writes and access-time updates are buffered and written in one short transaction
+every FLUSH_EVERY changes and on close(), so a busy pipeline doesn't hold the write
+lock. Each process (including --workers processes) opens its own connection and
+flushes it when it exits.
+
+Turn it on with --cache PATH on landed_cost.py, margin_calculator.py and
+deal_pipeline.py, or for every run with
+
+    EBAY_ARBITRAGE_CACHE=/path/to/results.sqlite
+
+Not meant to be run directly.
+"""
+
+import atexit
+import datetime
+import glob
+import hashlib
+import json
+import multiprocessing.util
+import os
+import sqlite3
+import time
+
+import batch_io
+import rate_tables
+
+
+CACHE_ENV = "EBAY_ARBITRAGE_CACHE"
+CACHE_FORMAT = 1  # Bump when the stored result layout changes
+DEFAULT_MAX_BYTES = 256 * 1024 * 1024
+DEFAULT_TTL_SECONDS = 7 * 24 * 3600
+EVICT_TO = 0.9  # Evict down to this fraction of max_bytes
+FLUSH_EVERY = 256  # Buffered writes and access-time updates per transaction
+TOUCH_AFTER = 3600  # Seconds; LRU access times are only rewritten when older than this
+BUSY_TIMEOUT_MS = 10000
+
+SOURCE_DIR = os.path.dirname(os.path.abspath(__file__))
+
+_SCHEMA = (
+    "CREATE TABLE IF NOT EXISTS entries (key BLOB PRIMARY KEY, value TEXT NOT NULL, created REAL NOT NULL, "
+    "accessed REAL NOT NULL, size INTEGER NOT NULL) WITHOUT ROWID",
+    "CREATE INDEX IF NOT EXISTS entries_accessed ON entries (accessed)",
+    "CREATE TABLE IF NOT EXISTS counters (name TEXT PRIMARY KEY, value INTEGER NOT NULL)",
+)
+
+COUNTERS = ("hits", "misses", "expired", "evictions", "bytes")
+
+# rate tables signature -> fingerprint of the rate files and calculator sources
+_fingerprints = {}
+
+
+def fingerprint(tables: rate_tables.RateTables) -> str:
+    """Digest of the rate files' contents and the calculator source files."""
+    signature = tables.signature[:3] if tables.signature else None
+    cached = _fingerprints.get(signature)
+    if cached is not None:
+        return cached
+    digest = hashlib.sha256()
+    directory = tables.signature[0] if tables.signature else rate_tables.rates_dir()
+    paths = [os.path.join(directory, rate_tables.FEE_TABLE_FILE),
+             os.path.join(directory, rate_tables.SHIPPING_TABLE_FILE)]
+    paths += sorted(glob.glob(os.path.join(SOURCE_DIR, "*.py")))
+    for path in paths:
+        with open(path, "rb") as f:
+            digest.update(os.path.basename(path).encode() + b"\0" + f.read() + b"\0")
+    _fingerprints[signature] = digest.hexdigest()
+    return _fingerprints[signature]
+
+
+def _normalize(value):
+    if isinstance(value, float):
+        return int(value) if value.is_integer() and abs(value) < 2 ** 53 else value
+    if isinstance(value, (datetime.date, datetime.datetime)):
+        return value.isoformat()
+    return value
+
+
+class ResultCache:
+    """
+    SQLite-backed result cache with TTL, LRU eviction under a size cap, and counters.
+
+    Values are JSON-serializable dicts. Use key() to build a key and get()/put(), or
+    call() to do both around a computation.
+    """
+
+    def __init__(self, path: str, max_bytes: int = DEFAULT_MAX_BYTES, ttl_seconds: float = DEFAULT_TTL_SECONDS):
+        if max_bytes <= 0:
+            raise ValueError(f"Cache size cap must be positive, got {max_bytes}")
+        self.path = path
+        self.max_bytes = max_bytes
+        self.ttl_seconds = ttl_seconds
+        self.stats = dict.fromkeys(COUNTERS[:-1], 0)
+        self._unsaved = dict.fromkeys(COUNTERS, 0)  # Counter changes not yet in the file
+        self._pending = {}  # key -> (value text, created); written on flush
+        self._touched = {}  # key -> accessed time of hits; written on flush
+        self._expired = []
+        self._prefixes = {}  # (name, as_of, rate tables signature) -> hash of the call's fixed parts
+        self._db = sqlite3.connect(path, timeout=BUSY_TIMEOUT_MS / 1000, isolation_level=None)
+        self._db.execute(f"PRAGMA busy_timeout = {BUSY_TIMEOUT_MS}")
+        self._db.execute("PRAGMA journal_mode = WAL")
+        self._db.execute("PRAGMA synchronous = NORMAL")
+        with self._db:
+            for statement in _SCHEMA:
+                self._db.execute(statement)
+
+    def key(self, name: str, kwargs: dict, as_of=None) -> bytes:
+        """
+        Content hash for a calculator call.
+
+        kwargs are the call's (already coerced) arguments; None values are dropped, so
+        an omitted argument and an explicit None are the same call. as_of picks the
+        rate versions that go into the key (today's if None).
+        """
+        tables = rate_tables.active()
+        slot = (name, as_of, tables.signature)
+        prefix = self._prefixes.get(slot)
+        if prefix is None:
+            day = None if as_of in (None, "") else rate_tables.to_date(as_of)
+            fixed = [CACHE_FORMAT, name, None if day is None else day.isoformat(),
+                     tables.fees_on(day).stamp, tables.shipping_on(day).stamp, fingerprint(tables)]
+            prefix = self._prefixes[slot] = hashlib.sha256(json.dumps(fixed).encode() + b"\0")
+        digest = prefix.copy()
+        digest.update(json.dumps({k: _normalize(v) for k, v in kwargs.items() if v is not None and k != "as_of"},
+                                 sort_keys=True, separators=(",", ":"), default=str).encode())
+        return digest.digest()
+
+    def get(self, key: bytes):
+        """The cached dict for key, or None on a miss (or an expired entry)."""
+        now = time.time()
+        pending = self._pending.get(key)
+        if pending is not None:
+            self._count("hits")
+            return json.loads(pending[0])
+        row = self._db.execute("SELECT value, created, accessed FROM entries WHERE key = ?", (key,)).fetchone()
+        if row is None:
+            self._count("misses")
+            return None
+        value, created, accessed = row
+        if self.ttl_seconds is not None and now - created > self.ttl_seconds:
+            self._count("expired")
+            self._count("misses")
+            self._expired.append(key)
+            self._maybe_flush()
+            return None
+        self._count("hits")
+        if now - accessed > TOUCH_AFTER:
+            self._touched[key] = now
+            self._maybe_flush()
+        return json.loads(value)
+
+    def put(self, key: bytes, value: dict):
+        """Store value under key (written on the next flush)."""
+        self._pending[key] = (json.dumps(value, separators=(",", ":")), time.time())
+        self._maybe_flush()
+
+    def call(self, name: str, compute, kwargs: dict, as_of=None) -> dict:
+        """compute()'s result for this call, from the cache when possible."""
+        key = self.key(name, kwargs, as_of)
+        value = self.get(key)
+        if value is None:
+            value = compute()
+            self.put(key, value)
+        return value
+
+    def _count(self, name: str):
+        self.stats[name] += 1
+        self._unsaved[name] += 1
+
+    def _maybe_flush(self):
+        if len(self._pending) + len(self._touched) + len(self._expired) >= FLUSH_EVERY:
+            self.flush()
+
+    def flush(self):
+        """Write buffered results, access times and counters, then evict if over the size cap."""
+        pending, touched, expired, unsaved = self._pending, self._touched, self._expired, self._unsaved
+        if not (pending or touched or expired or any(unsaved.values())):
+            return
+        self._pending, self._touched, self._expired = {}, {}, []
+        self._unsaved = dict.fromkeys(COUNTERS, 0)
+        added = 0
+        with self._db:
+            self._db.execute("BEGIN IMMEDIATE")
+            for key in expired:
+                row = self._db.execute("SELECT size FROM entries WHERE key = ?", (key,)).fetchone()
+                if row is not None:
+                    self._db.execute("DELETE FROM entries WHERE key = ?", (key,))
+                    added -= row[0]
+            for key, (value, created) in pending.items():
+                size = len(key) + len(value)
+                cursor = self._db.execute(
+                    "INSERT OR IGNORE INTO entries (key, value, created, accessed, size) VALUES (?, ?, ?, ?, ?)",
+                    (key, value, created, created, size))
+                if cursor.rowcount == 1:
+                    added += size
+            self._db.executemany("UPDATE entries SET accessed = ? WHERE key = ?",
+                                 [(accessed, key) for key, accessed in touched.items()])
+            unsaved["bytes"] = added
+            self._db.executemany(
+                "INSERT INTO counters (name, value) VALUES (?, ?) "
+                "ON CONFLICT (name) DO UPDATE SET value = value + excluded.value",
+                [(name, value) for name, value in unsaved.items() if value])
+            total = self._db.execute("SELECT value FROM counters WHERE name = 'bytes'").fetchone()
+            if total is not None and total[0] > self.max_bytes:
+                self._evict(total[0])
+
+    def _evict(self, total: int):
+        """Delete least recently used entries until the cache is under EVICT_TO of its cap (in a transaction)."""
+        target = self.max_bytes * EVICT_TO
+        evicted = freed = 0
+        while total - freed > target:
+            rows = self._db.execute("SELECT key, size FROM entries ORDER BY accessed LIMIT 1000").fetchall()
+            if not rows:
+                break
+            batch = []
+            for key, size in rows:
+                batch.append((key,))
+                freed += size
+                if total - freed <= target:
+                    break
+            self._db.executemany("DELETE FROM entries WHERE key = ?", batch)
+            evicted += len(batch)
+        self._db.execute("UPDATE counters SET value = value - ? WHERE name = 'bytes'", (freed,))
+        self._db.execute(
+            "INSERT INTO counters (name, value) VALUES ('evictions', ?) "
+            "ON CONFLICT (name) DO UPDATE SET value = value + excluded.value", (evicted,))
+        self.stats["evictions"] += evicted
+
+    def totals(self) -> dict:
+        """Cumulative counters stored in the cache file, plus the entry count."""
+        self.flush()
+        totals = dict.fromkeys(COUNTERS, 0)
+        totals.update(self._db.execute("SELECT name, value FROM counters").fetchall())
+        totals["entries"] = self._db.execute("SELECT COUNT(*) FROM entries").fetchone()[0]
+        return totals
+
+    def clear(self):
+        """Delete every entry (counters are kept)."""
+        self._pending, self._touched, self._expired = {}, {}, []
+        with self._db:
+            self._db.execute("DELETE FROM entries")
+            self._db.execute("UPDATE counters SET value = 0 WHERE name = 'bytes'")
+
+    def close(self):
+        if self._db is not None:
+            self.flush()
+            self._db.close()
+            self._db = None
+
+
+# (process id, path) -> ResultCache; a forked worker must not reuse its parent's connection
+_open = {}
+
+
+def open_cache(path: str) -> ResultCache:
+    """The process's ResultCache for path, flushed and closed at exit."""
+    slot = (os.getpid(), path)
+    cache = _open.get(slot)
+    if cache is None:
+        cache = _open[slot] = ResultCache(path)
+        atexit.register(cache.close)
+        # Worker processes skip atexit but run multiprocessing finalizers
+        multiprocessing.util.Finalize(cache, cache.close, exitpriority=10)
+    return cache
+
+
+def for_cli(path: str = None) -> ResultCache:
+    """The --cache file if given, else EBAY_ARBITRAGE_CACHE; None if neither is set."""
+    path = path or os.environ.get(CACHE_ENV) or None
+    if not path:
+        return None
+    try:
+        return open_cache(path)
+    except sqlite3.Error as e:
+        raise ValueError(f"Can't open result cache {path}: {e}") from e
+
+
+def cached_row(process_row, name: str, fields: dict, path: str, row: dict) -> dict:
+    """
+    process_row(row) through the cache at path, keyed on the row's fields.
+
+    A module-level function, so functools.partial(cached_row, process_row, name,
+    fields, path) can be sent to worker processes. Rows that raise are not cached.
+    """
+    kwargs = batch_io.calculator_kwargs(row, fields)
+    return open_cache(path).call(name, lambda: process_row(row), kwargs, kwargs.get("as_of"))
@@ -0,0 +1,449 @@
+#!/usr/bin/env python3
+"""
+Sold Comps Price Distribution
+
+Turns an exported sold-listings file (Terapeak or eBay sold search, as CSV or JSONL)
+into a per-product price distribution and the sale price to plan on. Rows are grouped
+by a keyword or product key column, and each group keeps:
+
+- P25 / median / P75 (and any chosen percentile) of the sold prices
+- min, max and mean sold price
+- sold listings, units sold and all listings, for the sell-through rate
+- sales per month, when the rows have a sold date
+
+The chosen percentile becomes the group's sale_price and, given a COGS (--cogs, or
+per group from --costs), goes straight into calculate_margin(). The median is the
+default; --percentile 25 plans on the cheaper end of the market. The output columns
+(key, sale_price, ...) feed deal_pipeline.py and target_solver.py.
+
+The file is read once, row by row. Each group keeps a fixed-accuracy quantile sketch
+(log-spaced price buckets, like DDSketch) instead of its prices, so memory grows with
+the number of groups and the price range, not the number of rows — tens of millions
+of comps fit in a few MB. Reported percentiles are within 0.5% of the exact values.
+
+Group keys are normalized: lower-case, punctuation and filler words dropped, word
+order ignored ("Wireless Earbuds, Bluetooth" and "bluetooth wireless earbuds" are one
+group). --costs keys are normalized the same way.
+
+Input columns (names configurable):
+    keyword      Group key (--group-by, e.g. product_key or title)
+    sold_price   Sold price ("$24.99" and "1,299.00" are fine)
+    sold         Optional: true/false or sold/unsold. Unsold rows only count toward
+                 listings, for the sell-through rate. Without it every row is a sale.
+    quantity     Optional: units sold by a multi-quantity listing (default 1)
+    sold_date    Optional: ISO date (2025-03-14), for sales per month
+
+Usage:
+    python sold_comps.py --input terapeak_export.csv
+    python sold_comps.py --input comps.jsonl --percentile 25 --cogs 8.50 --set category=electronics
+    python sold_comps.py --input comps.csv --group-by product_key --costs landed.csv --output prices.csv
+"""
+
+import argparse
+import datetime
+import functools
+import json
+import math
+import re
+import sys
+
+import batch_io
+from margin_calculator import MARGIN_FIELDS, calculate_margin_record, get_assessment
+
+
+DEFAULT_GROUP_BY = "keyword"
+DEFAULT_PERCENTILE = 50.0
+DEFAULT_MIN_COMPS = 5
+RELATIVE_ACCURACY = 0.005  # Sketch percentiles are within 0.5% of the exact value
+MAX_BUCKETS = 2048  # Per-group cap; covers $0.01 to $1M at 0.5% accuracy
+MAX_ERRORS = 20  # Bad rows echoed to stderr; the rest are only counted
+
+# Dropped from group keys
+FILLER_WORDS = frozenset(("a", "an", "and", "the", "for", "with", "of", "in", "on", "to"))
+
+SOLD_VALUES = frozenset(("1", "true", "yes", "y", "sold"))
+
+# Result columns, one row per group
+COMPS_FIELDS = [
+    "key", "sold", "units_sold", "listings", "sell_through_pct", "monthly_sales",
+    "min_price", "p25_price", "median_price", "p75_price", "max_price", "mean_price",
+    "sale_price", "cogs", "net_profit", "net_margin_pct", "roi_pct", "assessment", "rate_table_version",
+]
+
+# --set / --costs inputs for the margin calculation (sale_price comes from the comps)
+COST_FIELDS = {name: kind for name, kind in MARGIN_FIELDS.items() if name != "sale_price"}
+
+
+@functools.lru_cache(maxsize=65536)
+def normalize_keyword(text: str) -> str:
+    """Group key: sorted, de-duplicated lower-case words without filler words."""
+    words = set(re.findall(r"[a-z0-9]+", str(text).lower())) - FILLER_WORDS
+    return " ".join(sorted(words))
+
+
+def parse_price(value) -> float:
+    """Sold price from a number or a "$1,299.00"-style string."""
+    if isinstance(value, str):
+        value = value.strip().lstrip("$").replace(",", "")
+    price = float(value)
+    if not price > 0 or price == math.inf:
+        raise ValueError(f"Sold price must be positive, got {value!r}")
+    return price
+
+
+class QuantileSketch:
+    """
+    Streaming quantile sketch with relative accuracy.
+
+    Prices are counted in log-spaced buckets: bucket k holds (gamma^(k-1), gamma^k]
+    with gamma = (1 + accuracy) / (1 - accuracy), and reports the value that is within
+    `accuracy` of everything in it. Memory is one count per occupied bucket, capped at
+    max_buckets by folding the cheapest buckets together.
+    """
+
+    __slots__ = ("accuracy", "gamma", "_inv_log_gamma", "max_buckets", "buckets", "count", "total",
+                 "min", "max")
+
+    def __init__(self, accuracy: float = RELATIVE_ACCURACY, max_buckets: int = MAX_BUCKETS):
+        self.accuracy = accuracy
+        self.gamma = (1 + accuracy) / (1 - accuracy)
+        self._inv_log_gamma = 1 / math.log(self.gamma)
+        self.max_buckets = max_buckets
+        self.buckets = {}
+        self.count = 0
+        self.total = 0.0
+        self.min = math.inf
+        self.max = -math.inf
+
+    def add(self, value: float, weight: int = 1):
+        """Count a positive value weight times."""
+        key = math.ceil(math.log(value) * self._inv_log_gamma)
+        buckets = self.buckets
+        if key in buckets:
+            buckets[key] += weight
+        else:
+            buckets[key] = weight
+            if len(buckets) > self.max_buckets:
+                self._collapse()
+        self.count += weight
+        self.total += value * weight
+        if value < self.min:
+            self.min = value
+        if value > self.max:
+            self.max = value
+
+    def _collapse(self):
+        lowest, second = sorted(self.buckets)[:2]
+        self.buckets[second] += self.buckets.pop(lowest)
+
+    def quantiles(self, qs) -> list:
+        """Values at the fractions qs (each 0-1), in one pass over the buckets; None if empty."""
+        if not self.count:
+            return [None] * len(qs)
+        order = sorted(range(len(qs)), key=lambda i: qs[i])
+        out = [None] * len(qs)
+        keys = iter(sorted(self.buckets.items()))
+        seen = 0
+        key = None
+        for i in order:
+            rank = qs[i] * (self.count - 1)
+            while seen <= rank:
+                key, count = next(keys)
+                seen += count
+            value = 2 * self.gamma ** key / (self.gamma + 1)
+            out[i] = min(max(value, self.min), self.max)
+        return out
+
+    def quantile(self, q: float) -> float:
+        """Value at the fraction q (0-1); None if empty."""
+        return self.quantiles([q])[0]
+
+
+class CompGroup:
+    """Running statistics for one group of comps."""
+
+    __slots__ = ("sketch", "sold", "listings", "first_sold", "last_sold")
+
+    def __init__(self):
+        self.sketch = QuantileSketch()
+        self.sold = 0
+        self.listings = 0
+        self.first_sold = None
+        self.last_sold = None
+
+    def add_sale(self, price: float, quantity: int, sold_date: datetime.date = None):
+        self.sketch.add(price, quantity)
+        self.sold += 1
+        if sold_date is not None:
+            if self.first_sold is None or sold_date < self.first_sold:
+                self.first_sold = sold_date
+            if self.last_sold is None or sold_date > self.last_sold:
+                self.last_sold = sold_date
+
+    @property
+    def monthly_sales(self) -> float:
+        """Units sold per 30 days over the sold-date span; None without dates."""
+        if self.first_sold is None:
+            return None
+        days = (self.last_sold - self.first_sold).days + 1
+        return self.sketch.count * 30 / max(days, 30)
+
+
+def ingest(
+    rows,
+    group_by: str = DEFAULT_GROUP_BY,
+    price_column: str = "sold_price",
+    sold_column: str = "sold",
+    quantity_column: str = "quantity",
+    date_column: str = "sold_date",
+) -> dict:
+    """
+    Stream comp rows into per-group statistics.
+
+    Returns:
+        dict with "groups" (normalized key -> CompGroup), "rows" (rows read),
+        "skipped" (count of rows that could not be used) and "errors" (the first
+        MAX_ERRORS of those, as {"row", "error"})
+    """
+    groups = {}
+    skipped = 0
+    errors = []
+    n = 0
+    for n, row in enumerate(rows, start=1):
+        try:
+            raw_key = row.get(group_by)
+            if raw_key is None or raw_key == "":
+                raise ValueError(f"Row has no {group_by}")
+            key = normalize_keyword(raw_key)
+
+            sold = row.get(sold_column)
+            if isinstance(sold, str):
+                sold = sold.strip().lower() in SOLD_VALUES if sold.strip() else None
+            if sold is None or sold:
+                quantity = row.get(quantity_column)
+                quantity = 1 if quantity is None or quantity == "" else int(float(quantity))
+                if quantity < 1:
+                    raise ValueError(f"Quantity must be at least 1, got {quantity}")
+                sold_date = row.get(date_column)
+                sold_date = datetime.date.fromisoformat(sold_date[:10]) if sold_date else None
+                price = parse_price(row[price_column])
+            else:
+                price = None
+
+            group = groups.get(key)
+            if group is None:
+                group = groups[key] = CompGroup()
+            group.listings += 1
+            if price is not None:
+                group.add_sale(price, quantity, sold_date)
+        except batch_io.ROW_ERRORS as e:
+            skipped += 1
+            if len(errors) < MAX_ERRORS:
+                errors.append({"row": n, "error": str(e) if not isinstance(e, KeyError) else f"Row has no {e}"})
+    return {"groups": groups, "rows": n, "skipped": skipped, "errors": errors}
+
+
+def read_costs(rows, group_by: str = DEFAULT_GROUP_BY) -> dict:
+    """Per-group margin inputs (cogs, shipping_cost, category, ...) keyed by normalized key or group_by."""
+    costs = {}
+    for n, row in enumerate(rows, start=1):
+        raw_key = row.get("key") or row.get(group_by)
+        if not raw_key:
+            raise ValueError(f"Costs row {n} has no key or {group_by}")
+        costs[normalize_keyword(raw_key)] = batch_io.calculator_kwargs(row, COST_FIELDS)
+    return costs
+
+
+def summarize(
+    groups: dict,
+    percentile: float = DEFAULT_PERCENTILE,
+    min_comps: int = DEFAULT_MIN_COMPS,
+    margin_args: dict = None,
+    costs: dict = None,
+) -> list:
+    """
+    One result row per group with at least min_comps sold listings, most sold first.
+
+    sale_price is the chosen percentile of the sold prices. Groups with a cogs (from
+    margin_args or their costs entry) also get the margin at that price; the rest have
+    None in the margin columns.
+    """
+    if not 0 <= percentile <= 100:
+        raise ValueError(f"Percentile must be between 0 and 100, got {percentile:g}")
+    margin_args = margin_args or {}
+    costs = costs or {}
+    out = []
+    for key, group in groups.items():
+        if group.sold < max(min_comps, 1):
+            continue
+        sketch = group.sketch
+        p25, median, p75, price = sketch.quantiles([0.25, 0.5, 0.75, percentile / 100])
+        monthly_sales = group.monthly_sales
+        row = {
+            "key": key,
+            "sold": group.sold,
+            "units_sold": sketch.count,
+            "listings": group.listings,
+            "sell_through_pct": round(group.sold / group.listings * 100, 1),
+            "monthly_sales": None if monthly_sales is None else round(monthly_sales, 1),
+            "min_price": round(sketch.min, 2),
+            "p25_price": round(p25, 2),
+            "median_price": round(median, 2),
+            "p75_price": round(p75, 2),
+            "max_price": round(sketch.max, 2),
+            "mean_price": round(sketch.total / sketch.count, 2),
+            "sale_price": round(price, 2),
+        }
+        kwargs = {**margin_args, **costs.get(key, {})}
+        if "cogs" in kwargs:
+            r = calculate_margin_record(sale_price=row["sale_price"], **kwargs)
+            net_margin = r.net_margin
+            roi = r.roi
+            row.update({
+                "cogs": kwargs["cogs"],
+                "net_profit": round(r.net_profit, 2),
+                "net_margin_pct": round(net_margin, 1),
+                "roi_pct": round(roi, 1),
+                "assessment": get_assessment(net_margin, roi),
+                "rate_table_version": r.rate_table_version,
+            })
+        else:
+            row.update(dict.fromkeys(COMPS_FIELDS[COMPS_FIELDS.index("cogs"):]))
+        out.append(row)
+    out.sort(key=lambda row: (-row["sold"], row["key"]))
+    return out
+
+
+def print_report(results: list, ingested: dict, percentile: float, min_comps: int, top: int):
+    """Print a human-readable table of the busiest groups."""
+    print("\n" + "=" * 78)
+    print("  SOLD COMPS PRICE DISTRIBUTION")
+    print("=" * 78)
+
+    groups = len(ingested["groups"])
+    print(f"\n  Rows Read:            {ingested['rows']:,}")
+    print(f"  Rows Skipped:         {ingested['skipped']:,}")
+    print(f"  Groups:               {groups:,} ({groups - len(results):,} with fewer than {min_comps} sold comps "
+          f"left out)")
+    print(f"  Sale Price:           P{percentile:g} of sold prices")
+
+    if not results:
+        print("\n  No group has enough sold comps.")
+        print("=" * 78 + "\n")
+        return
+
+    print(f"\n--- Top {min(top, len(results))} Groups by Sold Listings ---")
+    print(f"  {'Key':<28} {'Sold':>7} {'STR%':>6} {'P25':>8} {'Median':>8} {'P75':>8} {'Sale':>8}")
+    for row in results[:top]:
+        key = row["key"] if len(row["key"]) <= 28 else row["key"][:27] + "…"
+        print(f"  {key:<28} {row['sold']:>7,} {row['sell_through_pct']:>6.1f} {row['p25_price']:>8.2f} "
+              f"{row['median_price']:>8.2f} {row['p75_price']:>8.2f} {row['sale_price']:>8.2f}")
+
+    priced = [row for row in results[:top] if row["net_profit"] is not None]
+    if priced:
+        print(f"\n--- Margin at the P{percentile:g} Price ---")
+        print(f"  {'Key':<28} {'Sale':>8} {'COGS':>8} {'Profit':>8} {'Margin%':>8} {'ROI%':>8}")
+        for row in priced:
+            key = row["key"] if len(row["key"]) <= 28 else row["key"][:27] + "…"
+            print(f"  {key:<28} {row['sale_price']:>8.2f} {row['cogs']:>8.2f} {row['net_profit']:>8.2f} "
+                  f"{row['net_margin_pct']:>8.1f} {row['roi_pct']:>8.1f}")
+        print(f"\n  Rate Tables: {priced[0]['rate_table_version']}")
+    print("=" * 78 + "\n")
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Price distributions and planning prices from exported sold comps",
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        epilog="""
+Examples:
+  Median, quartiles and sell-through per keyword:
+    %(prog)s --input terapeak_export.csv
+
+  Plan on the 25th percentile and check the margin at a $8.50 landed cost:
+    %(prog)s --input comps.jsonl --percentile 25 --cogs 8.50 --set category=electronics
+
+  Per-product costs, grouped by product key, written for deal_pipeline.py:
+    %(prog)s --input comps.csv --group-by product_key --costs landed.csv --output prices.csv
+        """,
+    )
+
+    parser.add_argument("--input", type=str, required=True, help="Sold comps file (CSV/JSONL, - for stdin)")
+    parser.add_argument("--input-format", type=str, choices=batch_io.FORMATS, default=None,
+                       help="Input format (default: from file extension, else csv)")
+    parser.add_argument("--group-by", type=str, default=DEFAULT_GROUP_BY,
+                       help=f"Column to group comps by (default: {DEFAULT_GROUP_BY})")
+    parser.add_argument("--price-column", type=str, default="sold_price", help="Sold price column (default: sold_price)")
+    parser.add_argument("--sold-column", type=str, default="sold",
+                       help="Sold/unsold flag column, if any (default: sold)")
+    parser.add_argument("--quantity-column", type=str, default="quantity",
+                       help="Units sold column, if any (default: quantity)")
+    parser.add_argument("--date-column", type=str, default="sold_date", help="Sold date column, if any (default: sold_date)")
+    parser.add_argument("--percentile", type=float, default=DEFAULT_PERCENTILE,
+                       help=f"Percentile of sold prices to use as the sale price (default: {DEFAULT_PERCENTILE:g})")
+    parser.add_argument("--min-comps", type=int, default=DEFAULT_MIN_COMPS,
+                       help=f"Leave out groups with fewer sold listings (default: {DEFAULT_MIN_COMPS})")
+    parser.add_argument("--cogs", type=float, default=None, help="Landed cost per unit for every group")
+    parser.add_argument("--costs", type=str, default=None,
+                       help="Per-group margin inputs (CSV/JSONL with key or the --group-by column, cogs and "
+                       "any margin columns)")
+    parser.add_argument("--set", type=str, action="append", default=[], metavar="NAME=VALUE",
+                       help="Margin input for every group, e.g. category=electronics (repeatable)")
+    parser.add_argument("--top", type=int, default=20, help="Groups shown in the report (default: 20)")
+    parser.add_argument("--output", type=str, default=None, help="Write every group to this file (CSV/JSONL)")
+    parser.add_argument("--output-format", type=str, choices=batch_io.FORMATS, default=None,
+                       help="Output format (default: from file extension, else csv)")
+    parser.add_argument("--json", action="store_true", help="Output as JSON")
+
+    args = parser.parse_args()
+
+    try:
+        margin_args = dict(s.split("=", 1) for s in args.set)
+        unknown = [name for name in margin_args if name not in COST_FIELDS]
+        if unknown:
+            raise ValueError(f"Unknown argument for --set: {unknown[0]}. Options: {', '.join(COST_FIELDS)}")
+        margin_args = batch_io.calculator_kwargs(margin_args, COST_FIELDS)
+        if args.cogs is not None:
+            margin_args["cogs"] = args.cogs
+        costs = None
+        if args.costs:
+            with open(args.costs, newline="", encoding="utf-8") as f:
+                costs = read_costs(batch_io.read_rows(f, batch_io.infer_format(args.costs, "csv")), args.group_by)
+
+        input_format = args.input_format or batch_io.infer_format(args.input, "csv")
+        infile = sys.stdin if args.input == "-" else open(args.input, newline="", encoding="utf-8")
+        try:
+            ingested = ingest(batch_io.read_rows(infile, input_format), args.group_by, args.price_column,
+                              args.sold_column, args.quantity_column, args.date_column)
+        finally:
+            if infile is not sys.stdin:
+                infile.close()
+        results = summarize(ingested["groups"], args.percentile, args.min_comps, margin_args, costs)
+    except batch_io.ROW_ERRORS as e:
+        parser.error(str(e))
+
+    for item in ingested["errors"]:
+        print(f"Row {item['row']}: {item['error']}", file=sys.stderr)
+    if ingested["skipped"] > len(ingested["errors"]):
+        print(f"... and {ingested['skipped'] - len(ingested['errors'])} more skipped rows", file=sys.stderr)
+
+    if args.output:
+        output_format = args.output_format or batch_io.infer_format(args.output, "csv")
+        with open(args.output, "w", newline="", encoding="utf-8") as f:
+            batch_io.write_rows(results, f, output_format, fieldnames=COMPS_FIELDS)
+        print(f"Wrote {len(results)} groups to {args.output}", file=sys.stderr)
+
+    if args.json:
+        print(json.dumps({
+            "rows": ingested["rows"],
+            "skipped": ingested["skipped"],
+            "groups": len(ingested["groups"]),
+            "percentile": args.percentile,
+            "results": results,
+        }, indent=2))
+    else:
+        print_report(results, ingested, args.percentile, args.min_comps, args.top)
+
+
+if __name__ == "__main__":
+    main()
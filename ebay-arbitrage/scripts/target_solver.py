@@ -0,0 +1,367 @@
+#!/usr/bin/env python3
+"""
+Target Margin Solver
+
+Works the deal calculators backwards. Instead of "what margin do I make at this
+supplier price?" it answers:
+
+    --solve-for product_cost   the most you can pay the supplier per unit and still hit
+                               the target, through the full landed cost stack (freight,
+                               duties, FX, fees, defects) and the eBay margin model
+    --solve-for sale_price     the lowest eBay price that hits the target for a given
+                               supplier price, including fees and the returns drag
+
+The target is a net margin (% of sale price, default 20) or an ROI (% of total COGS).
+Landed cost per unit and net profit are linear in both product_cost and sale_price, so
+each row is solved in closed form from two probe evaluations of the batch calculators,
+then checked with a third at the rounded answer. Rows that fail the check (a model that
+isn't linear for them) fall back to vectorized bisection. 100k rows solve in well under
+a second.
+
+Answers are rounded to the cent in the safe direction: the supplier price down, the
+sale price up. COGS is the per-unit landed cost (per sellable unit with
+--defect-adjusted), as in deal_pipeline.py. A row is infeasible when no price hits the
+target, e.g. the landed cost of free goods already eats the margin, or fees plus
+the target margin reach 100% of the sale price.
+
+Requires NumPy.
+
+Usage:
+    python target_solver.py --solve-for product_cost --target-pct 20 \
+        --set sale_price=29.99 --set quantity=200 --set weight_per_unit_kg=0.5
+    python target_solver.py --solve-for sale_price --target roi --target-pct 50 \
+        --set product_cost=4.20 --set quantity=200 --set weight_per_unit_kg=0.5
+    python target_solver.py --solve-for product_cost --input comps.csv --output max_prices.csv
+"""
+
+import argparse
+import json
+import math
+import sys
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+import batch_io
+from deal_pipeline import DEAL_MARGIN_FIELDS
+from landed_cost import LANDED_COST_FIELDS, calculate_landed_cost_batch
+from margin_calculator import calculate_margin_batch
+from price_tiers import resolve_product_cost
+
+
+SOLVE_FOR = ("product_cost", "sale_price")
+TARGETS = ("margin", "roi")
+DEFAULT_TARGET_PCT = 20.0
+BISECT_ITERATIONS = 60
+RESIDUAL_TOLERANCE = 1e-6  # Dollars of net profit per unit
+
+# Solution columns appended to each input row
+SOLUTION_FIELDS = {
+    "product_cost": ["max_product_cost", "feasible", "per_unit_landed", "net_profit", "net_margin_pct", "roi_pct",
+                     "rate_table_version"],
+    "sale_price": ["min_sale_price", "feasible", "per_unit_landed", "net_profit", "net_margin_pct", "roi_pct",
+                   "rate_table_version"],
+}
+
+DEAL_FIELDS = {**LANDED_COST_FIELDS, **DEAL_MARGIN_FIELDS}
+
+
+def _evaluate(solve_for: str, value, landed_args: dict, margin_args: dict, defect_adjusted: bool) -> tuple:
+    """(landed, margin) batch results with the solved-for input set to value."""
+    if solve_for == "product_cost":
+        landed_args = {**landed_args, "product_cost": value}
+    else:
+        margin_args = {**margin_args, "sale_price": value}
+    landed = calculate_landed_cost_batch(**landed_args)
+    cogs = landed["per_unit_landed_defect_adjusted" if defect_adjusted else "per_unit_landed"]
+    return landed, calculate_margin_batch(cogs=cogs, **margin_args)
+
+
+def _residual(target: str, target_pct: float, landed: dict, margin: dict, sale_price):
+    """Net profit above (+) or below (-) what the target needs; linear in either price."""
+    base = sale_price if target == "margin" else margin["total_cogs"]
+    return margin["net_profit"] - (target_pct / 100) * base
+
+
+def _take(args: dict, rows) -> dict:
+    """The given rows of every array argument; scalars pass through."""
+    return {name: value if np.ndim(value) == 0 else np.asarray(value)[rows] for name, value in args.items()}
+
+
+def _bisect(residual, lo, hi, increasing: bool, iterations: int = BISECT_ITERATIONS):
+    """Vectorized bisection for residual(x) == 0 on [lo, hi]; returns the safe-side end."""
+    for _ in range(iterations):
+        mid = (lo + hi) / 2
+        ok = residual(mid) >= 0
+        if increasing:  # Smallest x with residual >= 0
+            hi, lo = np.where(ok, mid, hi), np.where(ok, lo, mid)
+        else:  # Largest x with residual >= 0
+            lo, hi = np.where(ok, mid, lo), np.where(ok, hi, mid)
+    return hi if increasing else lo
+
+
+def solve_batch(solve_for: str = "product_cost", target: str = "margin", target_pct: float = DEFAULT_TARGET_PCT,
+                defect_adjusted: bool = False, **inputs) -> dict:
+    """
+    Solve every row for the price that hits the target. Requires NumPy.
+
+    Args:
+        solve_for: "product_cost" (maximum supplier price) or "sale_price" (minimum eBay price)
+        target: "margin" (net margin % of sale price) or "roi" (% of total COGS)
+        target_pct: Target in percent
+        defect_adjusted: Use per_unit_landed_defect_adjusted as COGS
+        inputs: calculate_landed_cost_batch() and calculate_margin_batch() arguments
+            (scalars or 1-D arrays), minus cogs and the solved-for input
+
+    Returns:
+        dict of arrays: the solution (max_product_cost or min_sale_price, NaN where
+        infeasible), feasible, and per_unit_landed, net_profit, net_margin_pct and
+        roi_pct at the rounded solution, plus rate_table_version
+    """
+    if np is None:
+        raise ImportError("solve_batch requires NumPy (pip install numpy)")
+    if solve_for not in SOLVE_FOR:
+        raise ValueError(f"Unknown solve_for: {solve_for}. Options: {', '.join(SOLVE_FOR)}")
+    if target not in TARGETS:
+        raise ValueError(f"Unknown target: {target}. Options: {', '.join(TARGETS)}")
+    if solve_for in inputs:
+        raise ValueError(f"{solve_for} is what's being solved for; don't pass it")
+    unknown = [name for name in inputs if name not in DEAL_FIELDS or name == "cogs"]
+    if unknown:
+        raise ValueError(f"Unknown deal input: {unknown[0]}. Options: {', '.join(DEAL_FIELDS)}")
+
+    landed_args = {name: value for name, value in inputs.items() if name in LANDED_COST_FIELDS}
+    margin_args = {name: value for name, value in inputs.items() if name in DEAL_MARGIN_FIELDS}
+    shape = np.broadcast_shapes(*(np.shape(value) for value in inputs.values()))
+    increasing = solve_for == "sale_price"  # Residual rises with sale price, falls with supplier price
+
+    def residual(value, landed_args=landed_args, margin_args=margin_args):
+        landed, margin = _evaluate(solve_for, value, landed_args, margin_args, defect_adjusted)
+        sale_price = value if solve_for == "sale_price" else margin_args["sale_price"]
+        return _residual(target, target_pct, landed, margin, sale_price)
+
+    # Closed form: two probes give the line, its root is the answer
+    r0 = np.broadcast_to(residual(np.zeros(shape)), shape)
+    slope = np.broadcast_to(residual(np.ones(shape)), shape) - r0
+    with np.errstate(divide="ignore", invalid="ignore"):
+        root = -r0 / slope
+    if increasing:
+        feasible = (slope > 0) & np.isfinite(root)
+        solution = np.ceil(np.maximum(root, 0.0) * 100 - 1e-6) / 100
+    else:
+        feasible = (slope < 0) & (root >= 0)
+        solution = np.floor(root * 100 + 1e-6) / 100
+    solution = np.where(feasible, solution, 0.0)
+
+    # Check: at the rounded answer the target is met, and a cent further would miss it
+    landed, margin = _evaluate(solve_for, solution, landed_args, margin_args, defect_adjusted)
+    sale_price = solution if increasing else margin_args["sale_price"]
+    r = np.broadcast_to(_residual(target, target_pct, landed, margin, sale_price), shape)
+    off = feasible & ((r < -RESIDUAL_TOLERANCE) | (r > np.abs(slope) * 0.01 + RESIDUAL_TOLERANCE))
+    if off.any():
+        rows = np.flatnonzero(off)
+        sub_landed, sub_margin = _take(landed_args, rows), _take(margin_args, rows)
+        lo, hi = np.zeros(rows.size), np.ones(rows.size)
+        # Grow the bracket until it holds the root
+        for _ in range(BISECT_ITERATIONS):
+            r_hi = residual(hi, sub_landed, sub_margin)
+            grow = r_hi < 0 if increasing else r_hi >= 0
+            if not grow.any():
+                break
+            hi = np.where(grow, hi * 2, hi)
+        found = _bisect(lambda x: residual(x, sub_landed, sub_margin), lo, hi, increasing)
+        solution = solution.copy()
+        solution[rows] = np.ceil(found * 100 - 1e-6) / 100 if increasing else np.floor(found * 100 + 1e-6) / 100
+        landed, margin = _evaluate(solve_for, solution, landed_args, margin_args, defect_adjusted)
+
+    name = "max_product_cost" if solve_for == "product_cost" else "min_sale_price"
+    return {
+        name: np.where(feasible, solution, np.nan),
+        "feasible": feasible,
+        "per_unit_landed": np.broadcast_to(landed["per_unit_landed_defect_adjusted" if defect_adjusted
+                                                  else "per_unit_landed"], shape),
+        "net_profit": np.broadcast_to(margin["net_profit"], shape),
+        "net_margin_pct": np.broadcast_to(margin["net_margin_pct"], shape),
+        "roi_pct": np.broadcast_to(margin["roi_pct"], shape),
+        "rate_table_version": np.char.add(
+            np.char.add(np.broadcast_to(margin["rate_table_version"], shape).astype(str), ","),
+            np.broadcast_to(landed["rate_table_version"], shape).astype(str)),
+    }
+
+
+def solve_rows(rows, solve_for: str = "product_cost", target: str = "margin",
+               target_pct: float = DEFAULT_TARGET_PCT, defect_adjusted: bool = False) -> dict:
+    """
+    Solve a file's worth of deal rows in one batch.
+
+    Returns:
+        dict with "rows" (each input row plus SOLUTION_FIELDS, rounded) and "skipped"
+        (rows that could not be solved, with their error)
+    """
+    if np is None:
+        raise ImportError("solve_rows requires NumPy (pip install numpy)")
+
+    fields = {name: kind for name, kind in DEAL_FIELDS.items() if name != solve_for}
+    kept, landed_rows, margin_rows, skipped = [], [], [], []
+    for n, row in enumerate(rows, start=1):
+        try:
+            if solve_for == "sale_price":
+                row = resolve_product_cost(row)
+            kwargs = batch_io.calculator_kwargs(row, fields)
+            landed_kwargs = {name: value for name, value in kwargs.items() if name in LANDED_COST_FIELDS}
+            margin_kwargs = {name: value for name, value in kwargs.items() if name in DEAL_MARGIN_FIELDS}
+            missing = (batch_io.missing_arguments({**landed_kwargs, solve_for: 0}, calculate_landed_cost_batch)
+                       + batch_io.missing_arguments({**margin_kwargs, solve_for: 0, "cogs": 0},
+                                                    calculate_margin_batch))
+            if missing:
+                raise ValueError(f"Row needs {', '.join(missing)}")
+        except batch_io.ROW_ERRORS as e:
+            skipped.append({"row": n, "sku": row.get("sku"), "error": str(e)})
+            continue
+        kept.append(row)
+        landed_rows.append(landed_kwargs)
+        margin_rows.append(margin_kwargs)
+
+    if not kept:
+        return {"rows": [], "skipped": skipped}
+
+    columns = {**batch_io.batch_columns(landed_rows, calculate_landed_cost_batch),
+               **batch_io.batch_columns(margin_rows, calculate_margin_batch)}
+    solution = solve_batch(solve_for, target, target_pct, defect_adjusted, **columns)
+
+    names = SOLUTION_FIELDS[solve_for]
+    lists = {}
+    for name in names:
+        column = solution[name]
+        if column.dtype == float:
+            column = np.round(column, 1 if name.endswith("_pct") else 2)
+            lists[name] = [None if math.isnan(v) else v for v in column.tolist()]
+        else:
+            lists[name] = column.tolist()
+    out = [{**row, **{name: lists[name][i] for name in names}} for i, row in enumerate(kept)]
+    return {"rows": out, "skipped": skipped}
+
+
+def print_report(row: dict, solve_for: str, target: str, target_pct: float):
+    """Print a human-readable solution for one deal."""
+    print("\n" + "=" * 60)
+    print("  TARGET MARGIN SOLVER")
+    print("=" * 60)
+
+    label = "net margin" if target == "margin" else "ROI"
+    print(f"\n  Target:               {target_pct:g}% {label}")
+    if not row["feasible"]:
+        if solve_for == "product_cost":
+            print("\n  Not reachable: even at a $0 supplier price, landed costs and fees")
+            print("  leave less than the target at this sale price.")
+        else:
+            print("\n  Not reachable: eBay fees plus the target take the whole sale price.")
+        print("=" * 60 + "\n")
+        return
+
+    if solve_for == "product_cost":
+        print(f"  Max Supplier Price:   ${row['max_product_cost']:.2f} per unit")
+    else:
+        print(f"  Min Sale Price:       ${row['min_sale_price']:.2f}")
+
+    print(f"\n--- At That Price ---")
+    print(f"  Landed Cost/Unit:     ${row['per_unit_landed']:.2f}")
+    print(f"  Net Profit/Unit:      ${row['net_profit']:.2f}")
+    print(f"  Net Margin:           {row['net_margin_pct']:.1f}%")
+    print(f"  ROI:                  {row['roi_pct']:.1f}%")
+
+    print(f"\n  Rate Tables: {row['rate_table_version']}")
+    print("=" * 60 + "\n")
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Solve for the max supplier price or min sale price that hits a target margin",
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        epilog="""
+Examples:
+  Most I can pay the supplier and still clear 20%% net margin at $29.99:
+    %(prog)s --solve-for product_cost --target-pct 20 \\
+        --set sale_price=29.99 --set quantity=200 --set weight_per_unit_kg=0.5
+
+  Lowest listing price for a 50%% ROI, electronics, with duties:
+    %(prog)s --solve-for sale_price --target roi --target-pct 50 \\
+        --set product_cost=4.20 --set quantity=200 --set weight_per_unit_kg=0.5 \\
+        --set category=electronics --set duty_rate=3.9
+
+  A whole file of sold comps (deal_pipeline.py columns, minus product_cost):
+    %(prog)s --solve-for product_cost --input comps.csv --output max_prices.csv
+        """,
+    )
+
+    parser.add_argument("--solve-for", type=str, choices=SOLVE_FOR, default="product_cost",
+                       help="Solve for the max product_cost or the min sale_price (default: product_cost)")
+    parser.add_argument("--target", type=str, choices=TARGETS, default="margin",
+                       help="Target net margin or ROI (default: margin)")
+    parser.add_argument("--target-pct", type=float, default=DEFAULT_TARGET_PCT,
+                       help=f"Target in percent (default: {DEFAULT_TARGET_PCT:g})")
+    parser.add_argument("--defect-adjusted", action="store_true",
+                       help="Use per-sellable-unit landed cost as COGS")
+    parser.add_argument("--set", type=str, action="append", default=[], metavar="NAME=VALUE",
+                       help="Deal input for a single solve (repeatable)")
+    parser.add_argument("--input", type=str, default=None, help="Deals file (CSV/JSONL, - for stdin)")
+    parser.add_argument("--output", type=str, default="-", help="Output file in --input mode (default: stdout)")
+    parser.add_argument("--input-format", type=str, choices=batch_io.FORMATS, default=None,
+                       help="Input format (default: from file extension, else csv)")
+    parser.add_argument("--output-format", type=str, choices=batch_io.FORMATS, default=None,
+                       help="Output format (default: from file extension, else same as input)")
+    parser.add_argument("--json", action="store_true", help="Output as JSON")
+
+    args = parser.parse_args()
+
+    if np is None:
+        parser.error("target_solver.py requires NumPy (pip install numpy)")
+
+    if args.input:
+        input_format = args.input_format or batch_io.infer_format(args.input, "csv")
+        output_format = args.output_format or ("jsonl" if args.json else batch_io.infer_format(args.output,
+                                                                                                input_format))
+        infile = sys.stdin if args.input == "-" else open(args.input, newline="", encoding="utf-8")
+        try:
+            result = solve_rows(batch_io.read_rows(infile, input_format), args.solve_for, args.target,
+                                args.target_pct, args.defect_adjusted)
+        except ValueError as e:
+            parser.error(str(e))
+        finally:
+            if infile is not sys.stdin:
+                infile.close()
+        outfile = sys.stdout if args.output == "-" else open(args.output, "w", newline="", encoding="utf-8")
+        try:
+            count = batch_io.write_rows(result["rows"], outfile, output_format)
+        finally:
+            if outfile is not sys.stdout:
+                outfile.close()
+        for item in result["skipped"]:
+            print(f"Row {item['row']}: {item['error']}", file=sys.stderr)
+        print(f"Solved {count} deals", file=sys.stderr)
+        return
+
+    try:
+        row = dict(s.split("=", 1) for s in args.set)
+        unknown = [name for name in row if name not in DEAL_FIELDS or name == args.solve_for]
+        if unknown:
+            raise ValueError(f"Unknown argument for --set: {unknown[0]}. "
+                             f"Options: {', '.join(name for name in DEAL_FIELDS if name != args.solve_for)}")
+        row = batch_io.calculator_kwargs(row, DEAL_FIELDS)
+        result = solve_rows([row], args.solve_for, args.target, args.target_pct, args.defect_adjusted)
+    except ValueError as e:
+        parser.error(str(e))
+    if result["skipped"]:
+        parser.error(result["skipped"][0]["error"])
+    row = result["rows"][0]
+
+    if args.json:
+        print(json.dumps(row, indent=2))
+    else:
+        print_report(row, args.solve_for, args.target, args.target_pct)
+
+
+if __name__ == "__main__":
+    main()